@@ -0,0 +1,7 @@
+"""
+Benchmarks for the backend.
+
+Run from the backend directory, e.g. `python -m benchmarks.executor_concurrency`.
+Every benchmark works against a temporary database file and never touches
+enterprise.db.
+"""
@@ -0,0 +1,337 @@
+"""
+Benchmark suite for the database.py data-access layer.
+
+Builds a synthetic database per scale in a temporary directory (with
+generate_data.generate), then times
+the public read functions (lists, lookups, reports, ledger queries) followed
+by the write paths (order entry, edits, deletes, batch and bulk loads).
+Every benchmark runs up to --repeat times or until its --budget is used up
+and records min/median/mean/max milliseconds; results are written as JSON
+so two runs (e.g. two commits) can be compared with --compare.
+
+Scales (override any field with --products/--sales/--lines/--years):
+    small   200 products,   5k sales, 3 lines, 1 year
+    medium  2k products,   50k sales, 3 lines, 2 years
+    large   5k products,  500k sales, 3 lines, 3 years
+
+Usage (from backend/):
+    python -m benchmarks.database_suite [--scale small,medium] [--output results.json]
+    python -m benchmarks.database_suite --scale small --compare baseline.json [--threshold 1.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from generate_data import generate
+
+SCALES = {
+    "small": {"products": 200, "sales": 5_000, "lines": 3, "years": 1},
+    "medium": {"products": 2_000, "sales": 50_000, "lines": 3, "years": 2},
+    "large": {"products": 5_000, "sales": 500_000, "lines": 3, "years": 3},
+}
+
+# Public database.py functions deliberately not benchmarked
+NOT_BENCHMARKED = {
+    # Connection, cache and schema plumbing
+    "get_data_generation", "get_table_versions", "add_change_listener", "close_db_pools", "get_pool_stats",
+    "get_db_connection", "init_db", "get_schema_version", "run_migrations", "migrate_db",
+    "encode_cursor", "decode_cursor", "rebuild_ledger_balances",
+    # Employees do not grow with the data set
+    "create_employee", "get_employee_by_email", "update_employee", "delete_employee", "list_all_employees",
+}
+
+
+class Benchmark:
+    """One timed call; `make_args(i)` builds the arguments of call i outside the timing."""
+
+    def __init__(self, name: str, func: Callable[..., Any],
+                 make_args: Optional[Callable[[int], Tuple[tuple, dict]]] = None, *args: Any, **kwargs: Any):
+        self.name = name
+        self.func = func
+        self.make_args = make_args or (lambda i: (args, kwargs))
+
+    def run(self, repeat: int, budget: float) -> Dict[str, Any]:
+        timings, rows = [], None
+        spent = 0.0
+        for i in range(repeat):
+            args, kwargs = self.make_args(i)
+            started = time.perf_counter()
+            result = self.func(*args, **kwargs)
+            elapsed = time.perf_counter() - started
+            timings.append(elapsed * 1000)
+            spent += elapsed
+            rows = result_rows(result)
+            if spent >= budget:
+                break
+        return {
+            "runs": len(timings),
+            "min_ms": round(min(timings), 3),
+            "median_ms": round(statistics.median(timings), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "rows": rows,
+        }
+
+
+def result_rows(result: Any) -> Optional[int]:
+    """Size of a benchmark's result, so runs at different scales can be told apart."""
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    if isinstance(result, (list, set)):
+        return len(result)
+    if isinstance(result, dict):
+        for key in ("items", "report", "rows"):
+            if isinstance(result.get(key), list):
+                return len(result[key])
+    return None
+
+
+def drain(query: Callable[..., Tuple[str, tuple]], *args: Any) -> int:
+    """Stream a query the way the CSV export does and return the row count."""
+    import database
+    return sum(len(batch) for batch in database.iter_query(*query(*args)))
+
+
+def read_benchmarks(db, params: Dict[str, int], counts: Dict[str, Any]) -> List[Benchmark]:
+    today = date.today()
+    mid = today - timedelta(days=params["years"] * 365 // 2)
+    month_ago = (today - timedelta(days=30)).isoformat()
+    pid = 1  # the most popular product
+    sale_id = counts["sales"] // 2
+    purchase_id = counts["purchases"] // 2
+    return [
+        Benchmark("list_all_products", db.list_all_products),
+        Benchmark("get_product_by_id", db.get_product_by_id, None, pid),
+        Benchmark("list_all_purchases", db.list_all_purchases),
+        Benchmark("list_purchases_page", db.list_purchases_page, None, limit=50),
+        Benchmark("get_purchase_by_id", db.get_purchase_by_id, None, purchase_id),
+        Benchmark("list_all_sales", db.list_all_sales),
+        Benchmark("list_sales_page", db.list_sales_page, None, limit=50),
+        Benchmark("list_sales_page[last 30 days]", db.list_sales_page, None, limit=50, start_date=month_ago),
+        Benchmark("get_sale_by_id", db.get_sale_by_id, None, sale_id),
+        Benchmark("get_invoice_numbers", db.get_invoice_numbers, None, "sale"),
+        Benchmark("get_stock", db.get_stock, None, pid),
+        Benchmark("list_all_stock", db.list_all_stock),
+        Benchmark("get_low_stock_alerts", db.get_low_stock_alerts),
+        Benchmark("get_stock_as_of", db.get_stock_as_of, None, mid.isoformat()),
+        Benchmark("get_current_stock_report", db.get_current_stock_report),
+        Benchmark("get_current_stock_report[limit 20]", db.get_current_stock_report, None, limit=20),
+        Benchmark("get_current_stock_report[last 30 days]", db.get_current_stock_report, None, start_date=month_ago),
+        Benchmark("count_report_rows", db.count_report_rows, None, db.current_stock_report_query),
+        Benchmark("fetch_report_columns", db.fetch_report_columns, None, db.product_wise_sales_query),
+        Benchmark("get_monthly_opening_closing", db.get_monthly_opening_closing, None, today.year, today.month),
+        Benchmark("get_kpis", db.get_kpis),
+        Benchmark("get_monthly_sales_summary", db.get_monthly_sales_summary),
+        Benchmark("get_yearly_sales_summary", db.get_yearly_sales_summary),
+        Benchmark("get_product_wise_sales", db.get_product_wise_sales),
+        Benchmark("get_top_selling_products", db.get_top_selling_products),
+        Benchmark("get_monthly_purchase_summary", db.get_monthly_purchase_summary),
+        Benchmark("get_vendor_wise_purchases", db.get_vendor_wise_purchases),
+        Benchmark("get_price_variation_per_product", db.get_price_variation_per_product),
+        Benchmark("get_dead_stock", db.get_dead_stock),
+        Benchmark("list_ledger_entries", db.list_ledger_entries, None, limit=100),
+        Benchmark("list_ledger_page", db.list_ledger_page, None, limit=100),
+        Benchmark("list_ledger_page[product]", db.list_ledger_page, None, product_id=pid, limit=100),
+        Benchmark("iter_query[ledger export]", drain, None, db.ledger_export_query),
+        Benchmark("get_current_balance", db.get_current_balance, None, pid),
+        Benchmark("get_opening_stock", db.get_opening_stock, None, pid, mid.year, mid.month),
+        Benchmark("get_closing_stock", db.get_closing_stock, None, pid, mid.year, mid.month),
+    ]
+
+
+def write_benchmarks(db, params: Dict[str, int], counts: Dict[str, Any]) -> List[Benchmark]:
+    today = date.today().isoformat()
+    back_dated = (date.today() - timedelta(days=params["years"] * 365 // 2)).isoformat()
+    products = params["products"]
+    sales = counts["sales"]
+    purchases = counts["purchases"]
+
+    def items(i: int, count: int = 3) -> List[Dict[str, Any]]:
+        return [{"product_id": (i * 7 + n) % products + 1, "product_name": f"Product {(i * 7 + n) % products + 1:05d}",
+                 "quantity": 1, "unit_price": 15.0} for n in range(count)]
+
+    def sale_documents(prefix: str, i: int, count: int, on: str) -> List[Dict[str, Any]]:
+        return [{"customer_name": "Bench", "invoice_number": f"{prefix}{i}-{n}", "sale_date": on,
+                 "notes": None, "items": items(i + n)} for n in range(count)]
+
+    def new_product(i: int):
+        return (f"Bench product {i}", "1kg", 10.0, 13.0), {"reorder_point": 5}
+
+    def unused_product(i: int):
+        return (db.create_product(f"Unused product {i}", "1kg", 10.0, 13.0)["id"],), {}
+
+    return [
+        Benchmark("create_sale", db.create_sale,
+                  lambda i: (("Bench", f"CS{i}", today, items(i)), {})),
+        Benchmark("create_purchase", db.create_purchase,
+                  lambda i: (("Bench", f"CP{i}", today, items(i)), {})),
+        Benchmark("update_sale", db.update_sale,
+                  lambda i: ((sales - i, {"notes": "edited", "items": items(i, 2)}), {})),
+        Benchmark("update_purchase", db.update_purchase,
+                  lambda i: ((purchases - i, {"notes": "edited"}), {})),
+        Benchmark("delete_sale", db.delete_sale, lambda i: ((1 + i,), {})),
+        Benchmark("delete_purchase", db.delete_purchase, lambda i: ((1 + i,), {})),
+        Benchmark("update_stock", db.update_stock, lambda i: ((1 + i % products, 1, "adjustment"), {})),
+        Benchmark("apply_stock_movements[back-dated]", db.apply_stock_movements,
+                  lambda i: (([{"product_id": item["product_id"], "quantity_change": 1, "transaction_type": "adjustment"}
+                               for item in items(i, 10)],), {"transaction_date": back_dated})),
+        Benchmark("create_product", db.create_product, new_product),
+        Benchmark("update_product", db.update_product, lambda i: ((1 + i % products, {"reorder_point": 10 + i}), {})),
+        Benchmark("delete_product", db.delete_product, unused_product),
+        Benchmark("get_invoice_numbers[after writes]", db.get_invoice_numbers, None, "sale"),
+        Benchmark("create_documents_batch[100 sales]", db.create_documents_batch,
+                  lambda i: (("sale", sale_documents("BB", i * 100, 100, today)), {})),
+        Benchmark("import_documents[1000 back-dated sales]", db.import_documents,
+                  lambda i: (("sale", sale_documents("BI", i * 1000, 1000, back_dated)), {})),
+        Benchmark("import_products[1000]", db.import_products,
+                  lambda i: (([{"name": f"Imported {i}-{n}", "quantity_with_unit": "1kg", "purchase_unit_price": 1.0,
+                                "sales_unit_price": 2.0} for n in range(1000)],), {})),
+        Benchmark("refresh_ledger_balances[10 products]", db.refresh_ledger_balances, None, list(range(1, 11))),
+        Benchmark("rebuild_rollup_tables", db.rebuild_rollup_tables),
+    ]
+
+
+def uncovered_functions(db, benchmarks: List[Benchmark]) -> List[str]:
+    """Public database.py functions that are neither benchmarked nor listed in NOT_BENCHMARKED."""
+    names = {b.name.split("[")[0] for b in benchmarks}
+    public = [name for name, value in vars(db).items()
+              if callable(value) and not name.startswith("_") and getattr(value, "__module__", None) == db.__name__
+              and not isinstance(value, type)]
+    # Query builders are timed through the get_* function that runs them
+    return sorted(name for name in public
+                  if name not in names and name not in NOT_BENCHMARKED and not name.endswith("_query"))
+
+
+def run_scale(name: str, params: Dict[str, int], tmpdir: str, repeat: int, budget: float,
+              only: Optional[re.Pattern]) -> Dict[str, Any]:
+    import database
+    database.close_db_pools()
+    database.DB_PATH = os.path.join(tmpdir, f"{name}.db")
+    database.init_db()
+    started = time.perf_counter()
+    counts = generate(database.DB_PATH, seed=42, **params)
+    seed_s = time.perf_counter() - started
+    print(f"[{name}] seeded {params} in {seed_s:.1f}s ({os.path.getsize(database.DB_PATH) / 1e6:.0f} MB)",
+          file=sys.stderr)
+
+    results = {}
+    benchmarks = read_benchmarks(database, params, counts) + write_benchmarks(database, params, counts)
+    for bench in benchmarks:
+        if only and not only.search(bench.name):
+            continue
+        results[bench.name] = bench.run(repeat, budget)
+        print(f"[{name}] {bench.name:42s} {results[bench.name]['median_ms']:10.2f} ms", file=sys.stderr)
+    database.close_db_pools()
+    return {
+        "params": params,
+        "seed_s": round(seed_s, 2),
+        "rows": {table: counts[table] for table in ("purchases", "sales", "sale_items", "stock_ledger")},
+        "db_bytes": os.path.getsize(database.DB_PATH),
+        "results": results,
+        "not_covered": uncovered_functions(database, benchmarks),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> int:
+    """Print median ratios against a baseline run and return the number of regressions."""
+    regressions = 0
+    print(f"{'scale':8s} {'benchmark':42s} {'base ms':>10s} {'now ms':>10s} {'ratio':>7s}")
+    for scale, data in current["scales"].items():
+        base = baseline.get("scales", {}).get(scale)
+        if base is None:
+            continue
+        if base["params"] != data["params"]:
+            print(f"{scale}: parameters differ from the baseline, skipped")
+            continue
+        for bench, result in data["results"].items():
+            before = base["results"].get(bench)
+            if not before or not before["median_ms"]:
+                continue
+            ratio = result["median_ms"] / before["median_ms"]
+            flag = ""
+            if ratio > threshold:
+                regressions += 1
+                flag = "  REGRESSION"
+            print(f"{scale:8s} {bench:42s} {before['median_ms']:10.2f} {result['median_ms']:10.2f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except Exception:
+        return None
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="small", help="comma-separated: " + ", ".join(SCALES))
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--sales", type=int, help="sale invoices")
+    parser.add_argument("--lines", type=int, help="average lines per invoice")
+    parser.add_argument("--years", type=int)
+    parser.add_argument("--repeat", type=int, default=5, help="maximum runs per benchmark")
+    parser.add_argument("--budget", type=float, default=3.0, help="seconds per benchmark before stopping early")
+    parser.add_argument("--only", help="regex; run only the benchmarks whose name matches")
+    parser.add_argument("--output", help="write the JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="median ratio above which --compare reports a regression")
+    args = parser.parse_args()
+
+    scales = [s.strip() for s in args.scale.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+    overrides = {k: getattr(args, k) for k in ("products", "sales", "lines", "years") if getattr(args, k)}
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_db_")
+    os.environ["ENTERPRISE_DB_PATH"] = os.path.join(tmpdir, "import.db")
+    only = re.compile(args.only) if args.only else None
+
+    report = {
+        "suite": "database",
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "budget_s": args.budget,
+        },
+        "scales": {},
+    }
+    for scale in scales:
+        params = {**SCALES[scale], **overrides}
+        report["scales"][scale] = run_scale(scale, params, tmpdir, args.repeat, args.budget, only)
+
+    body = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    elif not args.compare:
+        print(body)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 1 if compare(report, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,128 @@
+"""
+Concurrent report + order entry benchmark.
+
+Fires slow report requests and sale creations at the endpoint coroutines in
+main.py at the same time and measures sale latency and event loop lag, once
+with the database executor and once with database calls made inline on the
+event loop (the behaviour before the executor existed).
+
+Usage (from backend/):
+    python -m benchmarks.executor_concurrency [--products 500] [--ledger-rows 1000000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Seconds between sale arrivals
+SALE_INTERVAL = 0.025
+
+
+def seed(path: str, products: int, ledger_rows: int) -> None:
+    """Fill the schema created by init_db() with enough history to make reports slow."""
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO products (id, name, quantity_with_unit, purchase_unit_price, sales_unit_price, reorder_point) VALUES (?, ?, '1kg', 10, 15, 5)",
+        [(i, f"Product {i:05d}") for i in range(1, products + 1)]
+    )
+    conn.executemany("INSERT INTO stock (product_id, available_stock) VALUES (?, 1000000)",
+                     [(i,) for i in range(1, products + 1)])
+    start = date.today() - timedelta(days=3 * 365)
+    conn.executemany(
+        "INSERT INTO stock_ledger (product_id, transaction_type, quantity, reference_type, transaction_date) VALUES (?, 'purchase', ?, 'purchase', ?)",
+        ((rng.randint(1, products), rng.randint(1, 20),
+          (start + timedelta(days=rng.randint(0, 3 * 365))).isoformat()) for _ in range(ledger_rows))
+    )
+    from database import rebuild_ledger_balances
+    rebuild_ledger_balances(conn)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+async def run_scenario(main, models, products: int, reports: int, sales: int) -> dict:
+    """Run reports and sales concurrently; return latency and loop-lag figures."""
+    lags = []
+    stop = asyncio.Event()
+
+    async def probe():
+        # Measures how late a 5 ms timer fires; large values mean the loop was blocked
+        while not stop.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - t - 0.005)
+
+    today = date.today()
+
+    async def report():
+        await main.report_monthly(year=today.year, month=today.month, format='json', limit=20, offset=0)
+
+    sale_latencies = []
+
+    async def sale(i: int):
+        # Latency is measured from the scheduled arrival time, so time spent
+        # waiting for a blocked event loop to wake the request up is included
+        arrival = started + i * SALE_INTERVAL
+        await asyncio.sleep(i * SALE_INTERVAL)
+        payload = models.SaleCreate(
+            customer_name="Bench", invoice_number=f"B{i}", sale_date=date.today(),
+            items=[models.SaleItemCreate(product_id=random.randint(1, products), quantity=1)]
+        )
+        await main.create_sale_order(payload)
+        sale_latencies.append(time.perf_counter() - arrival)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*[report() for _ in range(reports)], *[sale(i) for i in range(sales)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+
+    sale_latencies.sort()
+    return {
+        "wall_s": elapsed,
+        "sale_p50_ms": statistics.median(sale_latencies) * 1000,
+        "sale_max_ms": sale_latencies[-1] * 1000,
+        "loop_lag_max_ms": max(lags, default=0) * 1000,
+    }
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--ledger-rows", type=int, default=1000000)
+    parser.add_argument("--reports", type=int, default=4)
+    parser.add_argument("--sales", type=int, default=20)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_executor_")
+    os.environ["ENTERPRISE_DB_PATH"] = os.path.join(tmpdir, "bench.db")
+    import database
+    seed(database.DB_PATH, args.products, args.ledger_rows)
+    import main
+    import models
+
+    results = {"executor": asyncio.run(run_scenario(main, models, args.products, args.reports, args.sales))}
+
+    # Baseline: call the database functions directly on the event loop
+    async def inline(func, *a, **kw):
+        return func(*a, **kw)
+    main.run_read = main.run_write = inline
+    results["inline"] = asyncio.run(run_scenario(main, models, args.products, args.reports, args.sales))
+
+    print(f"{'mode':10s} {'wall s':>8s} {'sale p50 ms':>12s} {'sale max ms':>12s} {'loop lag max ms':>16s}")
+    for mode, r in results.items():
+        print(f"{mode:10s} {r['wall_s']:8.2f} {r['sale_p50_ms']:12.1f} {r['sale_max_ms']:12.1f} {r['loop_lag_max_ms']:16.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,108 @@
+"""
+JSON serialization benchmark for large list responses.
+
+Reads stock ledger rows from a temporary database and measures the CPU time
+needed to turn them into a response body per 10k rows:
+
+  default       sqlite3.Row -> dict, then FastAPI's jsonable_encoder + json.dumps
+  fast objects  sqlite3.Row -> dict, then FastJSONResponse (orjson if installed)
+  fast columns  plain tuples + column header, FastJSONResponse (layout=columns)
+
+Usage (from backend/):
+    python -m benchmarks.json_serialization [--rows 10000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+def seed(path: str, rows: int) -> None:
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO products (id, name, quantity_with_unit, purchase_unit_price, sales_unit_price, reorder_point) VALUES (?, ?, '1kg', 10, 15, 5)",
+        [(i, f"Product {i:05d}") for i in range(1, 201)]
+    )
+    start = date.today() - timedelta(days=365)
+    conn.executemany(
+        "INSERT INTO stock_ledger (product_id, transaction_type, quantity, reference_id, reference_type, notes, transaction_date) VALUES (?, 'sale', ?, ?, 'sale', 'Sale created', ?)",
+        ((rng.randint(1, 200), -rng.randint(1, 20), str(i),
+          (start + timedelta(days=rng.randint(0, 365))).isoformat()) for i in range(rows))
+    )
+    from database import rebuild_ledger_balances
+    rebuild_ledger_balances(conn)
+    conn.commit()
+    conn.close()
+
+
+def cpu_ms(func, repeat: int) -> float:
+    """Best-of-`repeat` CPU time of `func()` in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        func()
+        best = min(best, time.process_time() - started)
+    return best * 1000
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_json_")
+    os.environ["ENTERPRISE_DB_PATH"] = os.path.join(tmpdir, "bench.db")
+    import database
+    seed(database.DB_PATH, args.rows)
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    import fast_json
+    from fast_json import FastJSONResponse, columns_payload
+
+    sql = "SELECT * FROM stock_ledger ORDER BY transaction_date DESC, id DESC"
+    conn = sqlite3.connect(database.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    row_objects = conn.execute(sql).fetchall()
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    tuples = cursor.execute(sql).fetchall()
+    columns = [d[0] for d in cursor.description]
+    conn.close()
+
+    def default():
+        return JSONResponse(jsonable_encoder([dict(r) for r in row_objects])).body
+
+    def fast_objects():
+        return FastJSONResponse([dict(r) for r in row_objects]).body
+
+    def fast_columns():
+        return FastJSONResponse(columns_payload(columns, tuples)).body
+
+    scale = 10000 / args.rows
+    results = [("default", default), ("fast objects", fast_objects), ("fast columns", fast_columns)]
+    if fast_json.orjson is not None:
+        orjson, fast_json.orjson = fast_json.orjson, None
+        stdlib = {"fast objects (stdlib json)": cpu_ms(fast_objects, args.repeat) * scale}
+        fast_json.orjson = orjson
+    else:
+        stdlib = {}
+
+    print(f"{len(tuples)} ledger rows, encoder: {'orjson' if fast_json.orjson else 'stdlib json'}")
+    print(f"{'path':28s} {'CPU ms/10k rows':>16s} {'bytes':>10s}")
+    for name, func in results:
+        print(f"{name:28s} {cpu_ms(func, args.repeat) * scale:16.1f} {len(func()):10d}")
+    for name, ms in stdlib.items():
+        print(f"{name:28s} {ms:16.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
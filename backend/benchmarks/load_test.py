@@ -0,0 +1,365 @@
+"""
+HTTP load test with mixed, realistic traffic.
+
+Virtual users loop over weighted scenarios until --duration is up:
+
+  order         POST /sales/ (1-5 lines, popular products favoured), 1 in 10 a POST /purchases/
+  kpi           GET /reports/kpis and GET /stock/alerts/low-stock (dashboard polling)
+  report        CSV downloads: current stock, product-wise sales, last month's ledger export
+  browse        GET /sales/?limit=50, GET /products/, GET /stock/
+  product_edit  PUT /products/{id} with a new sales price
+
+Latency is recorded per route and reported as p50/p95/p99/max, together with
+throughput, bytes and error rate (status >= 400 or a failed request).
+
+By default the app is driven in-process through httpx's ASGI transport
+against a temporary database filled by generate_data; --uvicorn runs the
+same app in a local uvicorn subprocess instead, and --url targets a server
+that is already running. Google Drive is replaced by a stub, so no network
+access is needed. Requires httpx (the client behind FastAPI's TestClient).
+
+Usage (from backend/):
+    python -m benchmarks.load_test [--duration 30] [--users 16] [--mix order=40,kpi=30,report=5,browse=20,product_edit=5]
+    python -m benchmarks.load_test --uvicorn --output run.json
+    python -m benchmarks.load_test --compare run.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MIX = {"order": 40, "kpi": 30, "report": 5, "browse": 20, "product_edit": 5}
+
+
+def stub_drive() -> None:
+    """Replace the Google Drive module so importing main never needs Google credentials."""
+    drive = types.ModuleType("drive")
+
+    def upload_photo(file, max_retries: int = 3) -> str:
+        return "load-test-photo"
+
+    drive.upload_photo = upload_photo
+    sys.modules["drive"] = drive
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Collects (latency, status, bytes) per route label after the warm-up period."""
+
+    def __init__(self, warmup_until: float):
+        self.warmup_until = warmup_until
+        self.samples: Dict[str, List[tuple]] = {}
+        self.started: Optional[float] = None
+
+    def add(self, route: str, started: float, status: int, size: int) -> None:
+        if started < self.warmup_until:
+            return
+        if self.started is None:
+            self.started = started
+        self.samples.setdefault(route, []).append((time.perf_counter() - started, status, size))
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        def stats(samples: List[tuple]) -> Dict[str, Any]:
+            latencies = sorted(s[0] * 1000 for s in samples)
+            errors = sum(1 for s in samples if s[1] == 0 or s[1] >= 400)
+            return {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "errors": errors,
+                "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+                "p50_ms": round(percentile(latencies, 0.50), 2),
+                "p95_ms": round(percentile(latencies, 0.95), 2),
+                "p99_ms": round(percentile(latencies, 0.99), 2),
+                "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+                "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+                "bytes": sum(s[2] for s in samples),
+            }
+
+        routes = {route: stats(samples) for route, samples in sorted(self.samples.items())}
+        return {"routes": routes, "total": stats([s for samples in self.samples.values() for s in samples])}
+
+
+class Traffic:
+    """The scenarios; every request goes through `request` so it is timed and labelled."""
+
+    def __init__(self, client, recorder: Recorder, products: List[Dict[str, Any]], rng: random.Random, name: str):
+        self.client = client
+        self.name = name  # keeps invoice numbers unique across users and runs
+        self.recorder = recorder
+        self.products = products
+        # Low ids are the popular products in a generate_data database
+        self.cum_weights = list(accumulate(1 / rank ** 1.1 for rank in range(1, len(products) + 1)))
+        self.rng = rng
+        self.counter = 0
+
+    async def request(self, route: str, method: str, url: str, **kwargs: Any):
+        started = time.perf_counter()
+        status, size = 0, 0
+        try:
+            async with self.client.stream(method, url, **kwargs) as response:
+                async for chunk in response.aiter_raw():
+                    size += len(chunk)
+                status = response.status_code
+        except Exception:
+            status = 0
+        self.recorder.add(route, started, status, size)
+        return status
+
+    def pick_products(self, count: int) -> List[Dict[str, Any]]:
+        return self.rng.choices(self.products, cum_weights=self.cum_weights, k=count)
+
+    async def order(self) -> None:
+        self.counter += 1
+        items = [{"product_id": p["id"], "quantity": self.rng.randint(1, 3)}
+                 for p in self.pick_products(self.rng.randint(1, 5))]
+        today = date.today().isoformat()
+        if self.rng.random() < 0.1:
+            await self.request("POST /purchases/", "POST", "/purchases/", json={
+                "vendor_name": "Load vendor", "invoice_number": f"LP{self.name}-{self.counter}",
+                "purchase_date": today, "items": [dict(item, quantity=50) for item in items]})
+        else:
+            await self.request("POST /sales/", "POST", "/sales/", json={
+                "customer_name": "Load customer", "invoice_number": f"LS{self.name}-{self.counter}",
+                "sale_date": today, "items": items})
+
+    async def kpi(self) -> None:
+        await self.request("GET /reports/kpis", "GET", "/reports/kpis")
+        await self.request("GET /stock/alerts/low-stock", "GET", "/stock/alerts/low-stock")
+
+    async def report(self) -> None:
+        choice = self.rng.randrange(3)
+        if choice == 0:
+            await self.request("GET /reports/current-stock?format=csv", "GET", "/reports/current-stock",
+                               params={"format": "csv"})
+        elif choice == 1:
+            await self.request("GET /reports/sales/product-wise?format=csv", "GET", "/reports/sales/product-wise",
+                               params={"format": "csv"})
+        else:
+            await self.request("GET /stock-ledger/export", "GET", "/stock-ledger/export",
+                               params={"start_date": (date.today() - timedelta(days=30)).isoformat()})
+
+    async def browse(self) -> None:
+        choice = self.rng.randrange(3)
+        if choice == 0:
+            await self.request("GET /sales/?limit=50", "GET", "/sales/", params={"limit": 50})
+        elif choice == 1:
+            await self.request("GET /products/", "GET", "/products/")
+        else:
+            await self.request("GET /stock/", "GET", "/stock/")
+
+    async def product_edit(self) -> None:
+        product = self.rng.choice(self.products)
+        price = round(float(product.get("sales_unit_price") or 10) * self.rng.uniform(0.95, 1.05), 2)
+        await self.request("PUT /products/{id}", "PUT", f"/products/{product['id']}",
+                           json={"sales_unit_price": price})
+
+
+async def run_load(client, duration: float, users: int, mix: Dict[str, int], warmup: float,
+                   think: float, seed: int) -> Dict[str, Any]:
+    response = await client.get("/products/")
+    response.raise_for_status()
+    products = sorted(response.json(), key=lambda p: p["id"])
+    if not products:
+        raise SystemExit("The target has no products; load a data set first")
+
+    started = time.perf_counter()
+    recorder = Recorder(started + warmup)
+    deadline = started + warmup + duration
+    scenarios = list(mix)
+    cum_mix = list(accumulate(mix[name] for name in scenarios))
+
+    async def user(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        traffic = Traffic(client, recorder, products, rng, f"{int(started)}-{index}")
+        while time.perf_counter() < deadline:
+            await getattr(traffic, rng.choices(scenarios, cum_weights=cum_mix)[0])()
+            if think:
+                await asyncio.sleep(rng.expovariate(1 / think))
+
+    await asyncio.gather(*(user(i) for i in range(users)))
+    measured = time.perf_counter() - max(started + warmup, recorder.started or deadline)
+    return recorder.summary(max(measured, 1e-9))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(url: str, timeout: float = 30) -> None:
+    import httpx
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while True:
+            try:
+                if (await client.get("/products/")).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.perf_counter() > deadline:
+                raise SystemExit(f"Server at {url} did not come up within {timeout:.0f}s")
+            await asyncio.sleep(0.2)
+
+
+def prepare_database(args: argparse.Namespace) -> str:
+    """Path of the database to load-test, generating a temporary one unless --db is given."""
+    if args.db:
+        return os.path.abspath(args.db)
+    path = os.path.join(tempfile.mkdtemp(prefix="load_test_"), "load.db")
+    os.environ["ENTERPRISE_DB_PATH"] = path
+    import database
+    from generate_data import generate
+    database.close_db_pools()
+    generate(path, products=args.products, sales=args.sales, years=1)
+    return path
+
+
+def serve(port: int) -> None:
+    """--serve: run main.app under uvicorn with Drive stubbed (used by --uvicorn)."""
+    stub_drive()
+    import uvicorn
+    import main
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def run(args: argparse.Namespace, mix: Dict[str, int]) -> Dict[str, Any]:
+    import httpx
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    timeout = httpx.Timeout(args.timeout)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+            return await run_load(client, args.duration, args.users, mix, args.warmup, args.think, args.seed)
+
+    db_path = prepare_database(args)
+    if args.uvicorn:
+        port = free_port()
+        env = dict(os.environ, ENTERPRISE_DB_PATH=db_path)
+        server = subprocess.Popen([sys.executable, "-m", "benchmarks.load_test", "--serve", str(port)], env=env,
+                                  cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        url = f"http://127.0.0.1:{port}"
+        try:
+            await wait_until_up(url)
+            async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+                return await run_load(client, args.duration, args.users, mix, args.warmup, args.think, args.seed)
+        finally:
+            server.terminate()
+            server.wait(10)
+
+    os.environ["ENTERPRISE_DB_PATH"] = db_path
+    stub_drive()
+    import database
+    database.DB_PATH = db_path
+    import main
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=timeout) as client:
+            return await run_load(client, args.duration, args.users, mix, args.warmup, args.think, args.seed)
+    finally:
+        database.close_db_pools()
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown scenario '{name}', expected one of: {', '.join(DEFAULT_MIX)}")
+        mix[name] = int(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("the mix needs at least one scenario with a positive weight")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def print_table(result: Dict[str, Any]) -> None:
+    print(f"{'route':42s} {'reqs':>7s} {'rps':>8s} {'err%':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}")
+    for route, s in [*result["routes"].items(), ("TOTAL", result["total"])]:
+        print(f"{route:42s} {s['requests']:7d} {s['throughput_rps']:8.1f} {s['error_rate'] * 100:6.2f} "
+              f"{s['p50_ms']:8.1f} {s['p95_ms']:8.1f} {s['p99_ms']:8.1f} {s['max_ms']:8.1f}")
+
+
+def print_comparison(result: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print(f"\n{'route':42s} {'p95 base':>9s} {'p95 now':>9s} {'ratio':>6s} {'rps base':>9s} {'rps now':>9s}")
+    routes = {**result["routes"], "TOTAL": result["total"]}
+    base_routes = {**baseline["routes"], "TOTAL": baseline["total"]}
+    for route, now in routes.items():
+        before = base_routes.get(route)
+        if not before:
+            continue
+        ratio = now["p95_ms"] / before["p95_ms"] if before["p95_ms"] else 0.0
+        print(f"{route:42s} {before['p95_ms']:9.1f} {now['p95_ms']:9.1f} {ratio:6.2f} "
+              f"{before['throughput_rps']:9.1f} {now['throughput_rps']:9.1f}")
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="load-test a running server instead of the app in-process")
+    target.add_argument("--uvicorn", action="store_true", help="run the app in a local uvicorn subprocess")
+    target.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help="database to use (it is written to); default: a generated temporary one")
+    parser.add_argument("--products", type=int, default=500, help="products in the generated database")
+    parser.add_argument("--sales", type=int, default=20_000, help="sales in the generated database")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds before measuring starts")
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--think", type=float, default=0, help="mean think time between scenarios (s)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="scenario weights, e.g. order=40,kpi=30")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="results JSON of an earlier run to compare against")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return 0
+
+    result = asyncio.run(run(args, args.mix))
+    result = {
+        "meta": {
+            "mode": "url" if args.url else "uvicorn" if args.uvicorn else "in-process",
+            "url": args.url,
+            "duration_s": args.duration,
+            "users": args.users,
+            "think_s": args.think,
+            "mix": args.mix,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+        },
+        **result,
+    }
+    print_table(result)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(result, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
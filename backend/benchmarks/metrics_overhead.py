@@ -0,0 +1,142 @@
+"""
+Request metrics overhead micro-benchmark.
+
+Measures what metrics.MetricsMiddleware and the per-statement query counter
+add to a request, with everything else held equal:
+
+  middleware   the same trivial FastAPI endpoint with and without the
+               middleware, called directly through ASGI (no HTTP client)
+  statements   a primary-key SELECT on a pooled-style connection with and
+               without database.py's statement hook counting it
+  app          a real GET /products/{id} on main.app, for scale
+  scrape       rendering GET /metrics once every route above has samples
+
+Usage (from backend/):
+    python -m benchmarks.metrics_overhead [--requests 20000] [--statements 200000] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+
+def asgi_get(app, path: str):
+    """Coroutine factory that issues GET `path` against `app` and discards the response."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    return lambda: app(dict(scope), receive, send)
+
+
+def best_us(run, count: int, repeat: int) -> float:
+    """Best-of-`repeat` wall time of `run(count)` in microseconds per iteration."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run(count)
+        best = min(best, time.perf_counter() - started)
+    return best / count * 1e6
+
+
+def requests_us(loop, call, count: int, repeat: int) -> float:
+    async def run_requests(n):
+        for _ in range(n):
+            await call()
+
+    return best_us(lambda n: loop.run_until_complete(run_requests(n)), count, repeat)
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--statements", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_metrics_")
+    os.environ["ENTERPRISE_DB_PATH"] = os.path.join(tmpdir, "bench.db")
+    from benchmarks.load_test import stub_drive
+    stub_drive()
+
+    from fastapi import FastAPI
+    import database
+    import metrics
+
+    database.init_db()
+    loop = asyncio.new_event_loop()
+
+    # Middleware alone
+    def make_app(with_metrics: bool) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: int):
+            return {"id": item_id}
+
+        if with_metrics:
+            app.add_middleware(metrics.MetricsMiddleware, registry=metrics.Registry())
+        return app
+
+    plain = requests_us(loop, asgi_get(make_app(False), "/items/1"), args.requests, args.repeat)
+    measured = requests_us(loop, asgi_get(make_app(True), "/items/1"), args.requests, args.repeat)
+
+    # Statement counting
+    conn = sqlite3.connect(database.DB_PATH)
+    conn.execute("INSERT INTO products (id, name, quantity_with_unit, purchase_unit_price, sales_unit_price) "
+                 "VALUES (1, 'Bench', '1 pc', 1, 2)")
+    conn.commit()
+
+    def statements(n):
+        for _ in range(n):
+            conn.execute("SELECT * FROM products WHERE id = ?", (1,)).fetchone()
+
+    untraced = best_us(statements, args.statements, args.repeat)
+    conn.set_trace_callback(database._trace_statement)
+    database.add_statement_hook(metrics.count_statement)
+    token = metrics._current_request.set(metrics.RequestStats())
+    traced = best_us(statements, args.statements, args.repeat)
+    metrics._current_request.reset(token)
+    conn.close()
+
+    # Real endpoint on the full app, for scale
+    import main
+    app_us = requests_us(loop, asgi_get(main.app, "/products/1"), args.requests // 4 or 1, args.repeat)
+    render_started = time.perf_counter()
+    body = metrics.registry.render()
+    render_ms = (time.perf_counter() - render_started) * 1000
+    loop.close()
+
+    middleware = measured - plain
+    hook = traced - untraced
+    print(f"{'':34s} {'µs':>10s}")
+    print(f"{'trivial endpoint':34s} {plain:10.1f}")
+    print(f"{'trivial endpoint + middleware':34s} {measured:10.1f}")
+    print(f"{'  middleware overhead':34s} {middleware:10.1f}")
+    print(f"{'SELECT by primary key':34s} {untraced:10.2f}")
+    print(f"{'SELECT by primary key + counting':34s} {traced:10.2f}")
+    print(f"{'  per-statement overhead':34s} {hook:10.2f}")
+    print(f"{'GET /products/{id} (main.app)':34s} {app_us:10.1f}")
+    counts, queries = metrics.registry.db_queries.values.get(("GET", "/products/{product_id}"), ([0], 0))
+    per_request = queries / (sum(counts) or 1)
+    overhead = middleware + hook * per_request
+    print(f"metrics add {overhead:.1f} µs ({overhead / app_us * 100:.1f}%) to GET /products/{{id}} "
+          f"({per_request:.1f} statements per request); "
+          f"rendering /metrics: {render_ms:.2f} ms, {len(body)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,212 @@
+"""
+EXPLAIN QUERY PLAN regression guard for the report queries.
+
+Seeds a database with generate_data (fixed seed, so table sizes and
+ANALYZE statistics are the same on every run), then takes the query plan of
+every report query: the SQL of the *_query builders is explained directly,
+reports whose SQL lives inside the function (get_kpis, get_stock_as_of) are
+run once and the statements they execute are explained. Each plan is reduced
+to the number of SEARCHes and full SCANs per table and compared with the
+checked-in baseline (query_plans.json next to this file).
+
+The check fails when a query scans a large table (--large-rows rows or
+more in the seeded database) more often than in the baseline, e.g. because
+a schema change turned an index SEARCH into a full SCAN. Other plan changes
+are listed but do not fail. After an intended change, refresh the baseline
+with --update and commit it.
+
+Usage (from backend/):
+    python -m benchmarks.query_plans [--large-rows 10000] [--verbose]
+    python -m benchmarks.query_plans --update
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from generate_data import generate
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_plans.json")
+SEED = {"products": 1_000, "sales": 20_000, "lines": 3, "years": 2, "seed": 42}
+LARGE_ROWS = 10_000
+
+_ACCESS = re.compile(r"^(SCAN|SEARCH) (\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_KEYWORDS = {"on", "where", "left", "inner", "cross", "join", "group", "order", "limit", "using", "natural"}
+
+
+def report_cases(database) -> List[Tuple[str, Callable[[], List[Tuple[str, tuple]]]]]:
+    """(name, function returning the (sql, params) statements of the case) for every report query."""
+    today = date.today()
+
+    def query(builder, *args, **kwargs):
+        return lambda: [builder(*args, **kwargs)]
+
+    def run(func, *args):
+        return lambda: executed(database, func, *args)
+
+    return [
+        ("kpis", run(database.get_kpis)),
+        ("stock_as_of", run(database.get_stock_as_of, (today - timedelta(days=30)).isoformat())),
+        ("low_stock_alerts", query(database.low_stock_alerts_query)),
+        ("low_stock_alerts.count", query(database.low_stock_alerts_query, count=True)),
+        ("current_stock_report", query(database.current_stock_report_query)),
+        ("current_stock_report.page", query(database.current_stock_report_query, sort="product_name", limit=50)),
+        ("monthly_opening_closing", query(database.monthly_opening_closing_query, today.year, today.month)),
+        ("monthly_sales_summary", query(database.monthly_sales_summary_query)),
+        ("yearly_sales_summary", query(database.yearly_sales_summary_query)),
+        ("product_wise_sales", query(database.product_wise_sales_query)),
+        ("product_wise_sales.count", query(database.product_wise_sales_query, count=True)),
+        ("top_selling_products", query(database.top_selling_products_query)),
+        ("monthly_purchase_summary", query(database.monthly_purchase_summary_query)),
+        ("vendor_wise_purchases", query(database.vendor_wise_purchases_query)),
+        ("price_variation_per_product", query(database.price_variation_per_product_query)),
+        ("dead_stock", query(database.dead_stock_query)),
+        ("dead_stock.count", query(database.dead_stock_query, count=True)),
+        ("ledger_export", query(database.ledger_export_query)),
+        ("ledger_export.product", query(database.ledger_export_query, product_id=1,
+                                        start_date=(today - timedelta(days=90)).isoformat())),
+    ]
+
+
+_collected: Optional[List[str]] = None
+
+
+def _collect(sql: str) -> None:
+    if _collected is not None:
+        _collected.append(sql)
+
+
+def executed(database, func: Callable[..., Any], *args: Any) -> List[Tuple[str, tuple]]:
+    """The SELECT statements `func(*args)` runs, with their parameters inlined by SQLite."""
+    global _collected
+    _collected = []
+    try:
+        func(*args)
+        statements = _collected
+    finally:
+        _collected = None
+    return [(sql, ()) for sql in statements if sql.lstrip().upper().startswith(("SELECT", "WITH"))]
+
+
+def table_aliases(sql: str, tables: Dict[str, int]) -> Dict[str, str]:
+    """alias -> table for the FROM/JOIN clauses of `sql` (tables map to themselves)."""
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        if table not in tables:
+            continue
+        aliases.setdefault(table, table)
+        if alias and alias.lower() not in _KEYWORDS:
+            aliases.setdefault(alias, table)
+    return aliases
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: tuple, tables: Dict[str, int],
+            indexes: Dict[str, str]) -> Dict[str, Any]:
+    """Plan lines of one statement and its SEARCH/SCAN count per table."""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    depth: Dict[int, int] = {0: -1}
+    lines, access = [], {}
+    aliases = table_aliases(sql, tables)
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+        match = _ACCESS.match(detail)
+        if match is None:
+            continue
+        kind, name, index = match.groups()
+        table = indexes.get(index) or aliases.get(name) or (name if name in tables else None)
+        if table is None:
+            continue  # a subquery or CTE
+        counts = access.setdefault(table, {"search": 0, "scan": 0})
+        counts[kind.lower()] += 1
+    return {"sql": " ".join(sql.split()), "plan": lines, "tables": dict(sorted(access.items()))}
+
+
+def collect_plans(database) -> Dict[str, Any]:
+    """Plans of every report case against the current database.DB_PATH."""
+    conn = sqlite3.connect(database.DB_PATH)
+    tables = {name: conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+              for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                          "AND name NOT LIKE 'sqlite_%'")}
+    indexes = dict(conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index'").fetchall())
+    queries = {}
+    for name, statements in report_cases(database):
+        queries[name] = [explain(conn, sql, params, tables, indexes) for sql, params in statements()]
+    conn.close()
+    return {"tables": dict(sorted(tables.items())), "queries": queries}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], large_rows: int,
+            verbose: bool = False) -> List[str]:
+    """Print the differences from the baseline and return the regressions."""
+    large = {table for table, rows in current["tables"].items() if rows >= large_rows}
+    regressions = []
+    for name, statements in current["queries"].items():
+        base_statements = baseline["queries"].get(name)
+        if base_statements is None:
+            print(f"{name}: not in the baseline")
+            continue
+        if len(base_statements) != len(statements):
+            print(f"{name}: runs {len(statements)} statements, baseline {len(base_statements)}")
+        for i, (now, base) in enumerate(zip(statements, base_statements)):
+            label = name if len(statements) == 1 else f"{name}[{i}]"
+            for table in sorted(large & set(now["tables"])):
+                counts = now["tables"][table]
+                before = base["tables"].get(table, {"search": 0, "scan": 0})
+                if counts["scan"] > before["scan"]:
+                    what = "SEARCH replaced by SCAN" if counts["search"] < before["search"] else "new full SCAN"
+                    regressions.append(f"{label}: {what} on {table} ({current['tables'][table]} rows)")
+            if now["plan"] != base["plan"]:
+                print(f"{label}: plan changed")
+                if verbose:
+                    print("  baseline:\n" + "\n".join(f"    {line}" for line in base["plan"]))
+                    print("  now:\n" + "\n".join(f"    {line}" for line in now["plan"]))
+    for name in baseline["queries"].keys() - current["queries"].keys():
+        print(f"{name}: in the baseline but no longer checked")
+    return regressions
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON (default: %(default)s)")
+    parser.add_argument("--update", action="store_true", help="write the current plans as the new baseline")
+    parser.add_argument("--large-rows", type=int, default=LARGE_ROWS,
+                        help="tables with at least this many seeded rows count as large")
+    parser.add_argument("--verbose", action="store_true", help="print changed plans in full")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="query_plans_")
+    os.environ["ENTERPRISE_DB_PATH"] = os.path.join(tmpdir, "plans.db")
+    import database
+    database.init_db()
+    generate(database.DB_PATH, **SEED)
+    database.add_statement_hook(_collect)
+    current = {"seed": SEED, "sqlite": sqlite3.sqlite_version, **collect_plans(database)}
+    database.close_db_pools()
+
+    if args.update:
+        with open(args.baseline, "w") as f:
+            f.write(json.dumps(current, indent=2) + "\n")
+        print(f"Baseline with {len(current['queries'])} report queries written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("seed") != SEED:
+        print(f"Baseline was taken with a different seed ({baseline.get('seed')}); refresh it with --update")
+    regressions = compare(current, baseline, args.large_rows, args.verbose)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(current['queries'])} report queries checked, {len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
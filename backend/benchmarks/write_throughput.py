@@ -0,0 +1,126 @@
+"""
+Concurrent order entry throughput benchmark.
+
+Creates sales from many threads at once, first with every caller opening its
+own write transaction (the behaviour before the write queue existed) and then
+through the single-writer queue, and reports sales/s, lock errors and the
+average number of sales committed per transaction.
+
+Usage (from backend/):
+    python -m benchmarks.write_throughput [--threads 16] [--sales 2000]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+
+def seed(path: str, products: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO products (id, name, quantity_with_unit, purchase_unit_price, sales_unit_price, reorder_point) VALUES (?, ?, '1kg', 10, 15, 5)",
+        [(i, f"Product {i:05d}") for i in range(1, products + 1)]
+    )
+    conn.executemany("INSERT INTO stock (product_id, available_stock) VALUES (?, 1000000)",
+                     [(i,) for i in range(1, products + 1)])
+    conn.commit()
+    conn.close()
+
+
+def run_threads(create, threads: int, sales: int, products: int) -> dict:
+    """Call `create(i, product_id)` `sales` times spread over `threads` threads."""
+    errors = {"locked": 0, "other": 0}
+    lock = threading.Lock()
+    counter = iter(range(sales))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            try:
+                create(i, i % products + 1)
+            except sqlite3.OperationalError as e:
+                with lock:
+                    errors["locked" if "locked" in str(e) else "other"] += 1
+            except Exception:
+                with lock:
+                    errors["other"] += 1
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return {"wall_s": elapsed, "per_s": sales / elapsed, **errors}
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--sales", type=int, default=2000)
+    parser.add_argument("--busy-timeout", type=float, default=1.0,
+                        help="SQLite busy timeout (s) for the per-connection baseline")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_writes_")
+    os.environ["ENTERPRISE_DB_PATH"] = os.path.join(tmpdir, "bench.db")
+    import database
+    seed(database.DB_PATH, args.products)
+    today = date.today().isoformat()
+
+    def items(product_id):
+        return [{"product_id": product_id, "product_name": f"Product {product_id:05d}",
+                 "quantity": 1, "unit_price": 15.0}]
+
+    # Baseline: each caller opens its own connection and commits its own transaction
+    def direct(i, product_id):
+        conn = sqlite3.connect(database.DB_PATH, timeout=args.busy_timeout)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO sales (customer_name, invoice_number, sale_date, total_amount) VALUES (?, ?, ?, ?)",
+                    ("Bench", f"D{i}", today, 15.0)
+                )
+                sale_id = cursor.lastrowid
+                for item in items(product_id):
+                    cursor.execute(
+                        "INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price, total_price) VALUES (?, ?, ?, ?, ?, ?)",
+                        (sale_id, item["product_id"], item["product_name"], item["quantity"], item["unit_price"], 15.0)
+                    )
+                    database.update_stock(item["product_id"], -item["quantity"], "sale",
+                                          reference_id=str(sale_id), conn=conn)
+        finally:
+            conn.close()
+
+    def queued(i, product_id):
+        database.create_sale("Bench", f"Q{i}", today, items(product_id))
+
+    results = {
+        "per-connection": run_threads(direct, args.threads, args.sales, args.products),
+        "write queue": run_threads(queued, args.threads, args.sales, args.products),
+    }
+    writer = database.get_pool_stats()["writer"]
+    database.close_db_pools()
+
+    print(f"{'mode':16s} {'wall s':>8s} {'sales/s':>9s} {'locked':>7s} {'other':>6s}")
+    for mode, r in results.items():
+        print(f"{mode:16s} {r['wall_s']:8.2f} {r['per_s']:9.0f} {r['locked']:7d} {r['other']:6d}")
+    print(f"write queue: {writer['batches']} transactions, avg {writer['avg_batch_size']} sales each, "
+          f"max {writer['max_batch_size']}, commit avg {writer['commit_time_avg_ms']} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,179 @@
+"""
+Streaming CSV Export
+
+Turns a report query into a CSV download that is produced while the rows are
+being fetched: rows are read with fetchmany, encoded (and gzip-compressed
+when the client accepts it) one batch at a time on the read executor, and
+each chunk is sent as soon as it is ready.
+
+Reading does not wait for the client. Encoded chunks go into a spool (in
+memory up to CSV_SPOOL_MEMORY, then a temporary file) that the response
+drains at the client's pace, so the pooled read connection and its WAL
+snapshot are held only as long as the query takes to read, however slowly
+the download proceeds. Slow downloads therefore neither starve the read
+pool nor hold back WAL checkpoints.
+"""
+
+import asyncio
+import csv
+import io
+import tempfile
+import threading
+import zlib
+from typing import Optional, Sequence
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from database import iter_query
+from db_executor import run_read
+
+# Rows fetched, encoded and sent per chunk
+CSV_BATCH_SIZE = 1000
+# Encoded output an export keeps in memory before spilling to a temporary file
+CSV_SPOOL_MEMORY = 4 * 1024 * 1024
+# Largest piece of spooled output sent at once
+CSV_SEND_SIZE = 256 * 1024
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """True if an Accept-Encoding header allows gzip (q=0 means refused)."""
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            q = params.strip().replace(" ", "")
+            return not (q.startswith("q=") and float(q[2:] or 0) == 0)
+    return False
+
+
+class CsvChunks:
+    """Iterator of encoded CSV chunks for one query.
+
+    Advancing and closing are serialized by a lock, so the iterator can be
+    driven from executor threads and closed from the event loop.
+    """
+
+    def __init__(self, sql: str, params: tuple, columns: Sequence[str], compress: bool = False,
+                 batch_size: int = CSV_BATCH_SIZE):
+        self.columns = list(columns)
+        self._batches = iter_query(sql, params, batch_size)
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        self._lock = threading.Lock()
+        self._header_sent = False
+        self._done = False
+
+    def next_chunk(self) -> Optional[bytes]:
+        """Return the next chunk, b"" if compression produced no output yet, or None at the end."""
+        with self._lock:
+            if self._done:
+                return None
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if not self._header_sent:
+                writer.writerow(self.columns)
+                self._header_sent = True
+            batch = next(self._batches, None)
+            if batch is None:
+                self._done = True
+                self._batches.close()
+            else:
+                writer.writerows([row[column] for column in self.columns] for row in batch)
+
+            data = buffer.getvalue().encode("utf-8")
+            if self._compressor is not None:
+                data = self._compressor.compress(data)
+                if self._done:
+                    data += self._compressor.flush()
+            if self._done and not data:
+                return None
+            return data
+
+    def close(self) -> None:
+        """Stop early and return the database connection to the pool."""
+        with self._lock:
+            self._done = True
+            self._batches.close()
+
+
+class _Spool:
+    """Output written by the reader task and read back by the response; event loop only."""
+
+    def __init__(self):
+        self._file = tempfile.SpooledTemporaryFile(max_size=CSV_SPOOL_MEMORY)
+        self._written = 0
+        self._finished = False
+        self._error: Optional[BaseException] = None
+        self._ready = asyncio.Event()
+
+    def write(self, data: bytes) -> None:
+        self._file.seek(self._written)
+        self._file.write(data)
+        self._written += len(data)
+        self._ready.set()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self._finished = True
+        self._error = error
+        self._ready.set()
+
+    async def read(self, position: int) -> Optional[bytes]:
+        """Output after `position` once there is some, or None when everything was read."""
+        while position >= self._written:
+            if self._finished:
+                if self._error is not None:
+                    raise self._error
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        self._file.seek(position)
+        return self._file.read(min(self._written - position, CSV_SEND_SIZE))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+async def _read_all(chunks: CsvChunks, spool: _Spool) -> None:
+    """Read and encode the whole export into `spool`, then return the connection."""
+    error = None
+    try:
+        while True:
+            chunk = await run_read(chunks.next_chunk)
+            if chunk is None:
+                break
+            if chunk:
+                spool.write(chunk)
+    except Exception as e:
+        error = e
+    finally:
+        chunks.close()
+        spool.finish(error)
+
+
+def csv_response(request: Request, sql: str, params: tuple, columns: Sequence[str],
+                 filename: str) -> StreamingResponse:
+    """Stream the result of `sql` as a CSV attachment with the given columns."""
+    compress = accepts_gzip(request.headers.get("accept-encoding"))
+    chunks = CsvChunks(sql, params, columns, compress=compress)
+
+    async def body():
+        spool = _Spool()
+        reader = asyncio.create_task(_read_all(chunks, spool))
+        position = 0
+        try:
+            while True:
+                data = await spool.read(position)
+                if data is None:
+                    break
+                position += len(data)
+                yield data
+        finally:
+            # Runs on normal completion and when the client disconnects
+            reader.cancel()
+            chunks.close()
+            spool.close()
+
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(body(), media_type="text/csv", headers=headers)
@@ -12,40 +12,387 @@ Provides all database operations for:
 
 import sqlite3
 import os
+import base64
+import json
 import logging
+import threading
 from datetime import date, datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Iterator, Set, Tuple
 from contextlib import contextmanager
 from pathlib import Path
 
+from db_pool import ConnectionPool
+from write_queue import WriteQueue
+from sql_profiler import profiler
+from rollups import (
+    record_document, record_document_range, document_range_contributions, rebuild_rollups, ROLLUP_TABLES,
+)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Database file path
-DB_PATH = os.path.join(os.path.dirname(__file__), "enterprise.db")
+# Database file path (ENTERPRISE_DB_PATH points tools and benchmarks at another file)
+DB_PATH = os.environ.get("ENTERPRISE_DB_PATH") or os.path.join(os.path.dirname(__file__), "enterprise.db")
+
+# Connection pool sizing. SQLite allows a single writer at a time, so the write
+# lane is kept small; readers can run concurrently under WAL.
+DB_READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", "8"))
+DB_WRITE_POOL_SIZE = int(os.environ.get("DB_WRITE_POOL_SIZE", "1"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+# Maximum number of queued write jobs committed together in one transaction
+DB_WRITE_QUEUE_BATCH = int(os.environ.get("DB_WRITE_QUEUE_BATCH", "64"))
+
+_pools: Dict[str, ConnectionPool] = {}
+_writer: Optional[WriteQueue] = None
+_pools_path: Optional[str] = None
+_pools_lock = threading.Lock()
+_local = threading.local()
+
+
+def _connect(readonly: bool) -> sqlite3.Connection:
+    """Open a connection configured for use from the pool."""
+    # Increase timeout to allow SQLite to wait for locked connections.
+    # Pooled connections move between threads, but only one holds them at a time.
+    conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False, cached_statements=256)
+    conn.row_factory = sqlite3.Row  # Access columns by name
+    conn.set_trace_callback(_trace_statement)
+    # Ensure foreign keys are enforced for each connection
+    conn.execute("PRAGMA foreign_keys = ON")
+    if readonly:
+        # Guard against accidental writes through the read lane
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        # Let readers proceed while a write transaction is open
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+        except Exception:
+            pass
+    return conn
+
 
+_statement_hooks: List[Callable[[str], None]] = []
 
-@contextmanager
-def get_db_connection():
-    """Context manager for database connections.
 
-    Uses a longer timeout to reduce "database is locked" errors under concurrent
-    access. Ensures foreign keys are enabled for each connection.
+def add_statement_hook(hook: Callable[[str], None]) -> None:
+    """Call `hook(sql)` for every statement executed on a pooled or writer connection.
+
+    Hooks run synchronously on the executing thread (in the caller's context
+    for write jobs), so they must be quick and must not use the database.
+    executemany() reports its statement once per parameter row.
     """
-    # Increase timeout to allow SQLite to wait for locked connections
-    conn = sqlite3.connect(DB_PATH, timeout=30)
-    conn.row_factory = sqlite3.Row  # Access columns by name
-    # Ensure foreign keys are enforced for each connection
-    conn.execute("PRAGMA foreign_keys = ON")
+    _statement_hooks.append(hook)
+
+
+def _trace_statement(sql: str) -> None:
+    for hook in _statement_hooks:
+        try:
+            hook(sql)
+        except Exception:
+            logger.exception("Statement hook failed")
+
+
+# Idle unless SQL profiling is enabled or a query count assertion is active
+add_statement_hook(profiler.on_statement)
+
+
+def _close_resources() -> None:
+    """Close pools and the writer; caller must hold _pools_lock."""
+    global _writer, _pools_path, _watch_conn
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+    for pool in _pools.values():
+        pool.close()
+    _pools.clear()
+    with _watch_lock:
+        if _watch_conn is not None:
+            _watch_conn.close()
+            _watch_conn = None
+    _pools_path = None
+
+
+def _ensure_resources() -> None:
+    """Create the pools and the writer, rebuilding them if DB_PATH has changed."""
+    global _writer, _pools_path
+    with _pools_lock:
+        if _pools_path != DB_PATH:
+            _close_resources()
+            _pools["read"] = ConnectionPool("read", lambda: _connect(True),
+                                            size=DB_READ_POOL_SIZE, timeout=DB_POOL_TIMEOUT)
+            _pools["write"] = ConnectionPool("write", lambda: _connect(False),
+                                             size=DB_WRITE_POOL_SIZE, timeout=DB_POOL_TIMEOUT)
+            _writer = WriteQueue(lambda: _connect(False), max_batch=DB_WRITE_QUEUE_BATCH,
+                                 on_commit=_notify_changes, around_commit=_watch_commit)
+            _open_watch()
+            _pools_path = DB_PATH
+
+
+def _get_pool(readonly: bool) -> ConnectionPool:
+    """Return the read or write pool."""
+    _ensure_resources()
+    return _pools["read" if readonly else "write"]
+
+
+def _get_writer() -> WriteQueue:
+    """Return the single-writer queue that applies all mutations."""
+    _ensure_resources()
+    return _writer
+
+
+_change_listeners: List[Callable[[Set[str]], None]] = []
+_event_listeners: List[Callable[[List[Tuple[str, Dict[str, Any]]]], None]] = []
+# Incremented after every committed write; cached derived data records the
+# generation it was computed at and is stale once this moves on
+_data_generation = 0
+# Per-table count of committed writes that touched the table
+_table_versions: Dict[str, int] = {}
+
+
+# Commits made outside this process's writer (other uvicorn workers, CLI tools
+# such as `python rollups.py rebuild` or generate_data.py) are noticed through
+# PRAGMA data_version on a dedicated connection: its value changes whenever
+# another connection has committed. The writer reads it just before each
+# COMMIT, while it holds the write lock, and adopts the value right after, so
+# its own commits are not mistaken for outside ones.
+_watch_lock = threading.Lock()
+_watch_conn: Optional[sqlite3.Connection] = None
+_watch_version: Optional[int] = None
+# Times a commit from outside this process's writer was noticed; every table
+# is treated as changed then
+_external_changes = 0
+
+
+def _open_watch() -> None:
+    """Open the data_version connection for DB_PATH; caller must hold _pools_lock."""
+    global _watch_conn, _watch_version, _external_changes
+    with _watch_lock:
+        _watch_conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        _watch_version = _watch_conn.execute("PRAGMA data_version").fetchone()[0]
+        # Anything derived before the watch existed (or from another file) is stale
+        _external_changes += 1
+
+
+def _check_external(own_commit: bool = False) -> int:
+    """Compare data_version with the last value seen and return _external_changes."""
+    global _watch_version, _external_changes
+    with _watch_lock:
+        if _watch_conn is not None:
+            version = _watch_conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != _watch_version:
+                _watch_version = version
+                if not own_commit:
+                    _external_changes += 1
+        return _external_changes
+
+
+def _watch_commit(committed: bool) -> None:
+    """Writer hook around COMMIT; see _watch_lock."""
+    _check_external(own_commit=committed)
+
+
+def get_data_generation() -> int:
+    """Return a number that changes whenever the database does.
+
+    Counts the write commits seen by this process plus the commits noticed
+    from other processes and connections (PRAGMA data_version).
+    """
+    _ensure_resources()
+    return _data_generation + _check_external()
+
+
+def get_table_versions(tables) -> tuple:
+    """Return the change version of each table in `tables`, in order.
+
+    The last element counts outside commits, which may have changed any table.
+    """
+    _ensure_resources()
+    external = _check_external()
+    return (*(_table_versions.get(table, 0) for table in tables), external)
+
+
+def add_change_listener(listener: Callable[[Set[str]], None]) -> None:
+    """Call `listener(tables)` with the set of changed tables after every write commit.
+
+    Listeners run on the writer thread before the writing callers are
+    released, so they must be quick and must not write to the database.
+    """
+    _change_listeners.append(listener)
+
+
+def add_event_listener(listener: Callable[[List[Tuple[str, Dict[str, Any]]]], None]) -> None:
+    """Call `listener(events)` with the (type, data) events of every write commit, in commit order.
+
+    Event types:
+        document    a sale or purchase contribution, as rollups.record_document
+                    returns it (negative when a document is removed or edited)
+        stock       {"balances": {product_id: new available_stock},
+                     "deltas": {product_id: change}, "date": ledger date,
+                     "products": {product_id: (name, reorder_point)}}
+        products    products were created, changed or deleted
+        rollups     the rollup tables were rebuilt from scratch
+        kpi_state   a snapshot read by load_kpi_state()
+
+    Same rules as change listeners: quick, and no database access.
+    """
+    _event_listeners.append(listener)
+
+
+def _notify_changes(tables: Set[str], events: List[Tuple[str, Dict[str, Any]]]) -> None:
+    global _data_generation
+    if tables:
+        for table in tables:
+            _table_versions[table] = _table_versions.get(table, 0) + 1
+        _data_generation += 1
+        for listener in list(_change_listeners):
+            try:
+                listener(tables)
+            except Exception:
+                logger.exception("Change listener failed")
+    if events:
+        for listener in list(_event_listeners):
+            try:
+                listener(events)
+            except Exception:
+                logger.exception("Event listener failed")
+
+
+def _touch(*tables: str) -> None:
+    """Mark `tables` as changed by the current write job."""
+    writer = _writer
+    if writer is not None and writer.in_writer_thread():
+        writer.touch(*tables)
+
+
+def _emit(event_type: str, data: Dict[str, Any]) -> None:
+    """Publish an event to the event listeners once the current write job commits."""
+    writer = _writer
+    if writer is not None and writer.in_writer_thread():
+        writer.emit((event_type, data))
+
+
+def _record_document(conn: sqlite3.Connection, kind: str, document_id: int, sign: int) -> None:
+    """rollups.record_document() plus its "document" event."""
+    contribution = record_document(conn, kind, document_id, sign)
+    if contribution is not None:
+        _emit("document", contribution)
+
+
+def _record_document_range(conn: sqlite3.Connection, kind: str, first_id: int, last_id: int) -> None:
+    """rollups.record_document_range() plus one "document" event per day."""
+    record_document_range(conn, kind, first_id, last_id)
+    if _event_listeners:
+        for contribution in document_range_contributions(conn, kind, first_id, last_id):
+            _emit("document", contribution)
+
+
+def _run_write(func):
+    """Run `func(conn)` as a write job on the writer thread and return its result.
+
+    Jobs are group-committed with whatever else is queued; the call returns
+    once the transaction containing this job has been committed, and raises
+    the job's own exception if it failed.
+    """
+    if profiler.enabled:
+        job = func
+
+        def func(conn):
+            profiler.attach(conn)
+            try:
+                return job(conn)
+            finally:
+                profiler.detach(conn)
+
+    return _get_writer().run(func)
+
+
+def close_db_pools() -> None:
+    """Close pooled connections and stop the writer (e.g. on shutdown or before swapping DB_PATH)."""
+    with _pools_lock:
+        _close_resources()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Return usage statistics for the connection pools and the write queue."""
+    return {
+        "db_path": DB_PATH,
+        "read": _get_pool(True).stats(),
+        "write": _get_pool(False).stats(),
+        "writer": _get_writer().stats(),
+    }
+
+
+@contextmanager
+def get_db_connection(readonly: bool = False):
+    """Context manager for pooled database connections.
+
+    Connections are checked out from a bounded pool (read or write lane) and
+    returned afterwards instead of being closed. Write connections commit on
+    success and roll back on error. Nested use within the same thread reuses
+    the outer connection so related work shares one transaction. The
+    functions in this module route their writes through the single-writer
+    queue instead (see _run_write).
+    """
+    writer = _writer
+    if writer is not None and writer.in_writer_thread():
+        # Inside a write job: share its connection and transaction
+        yield writer.connection
+        return
+
+    held = getattr(_local, "conn", None)
+    if held is not None and (_local.readonly is False or readonly):
+        yield held
+        return
+
+    pool = _get_pool(readonly)
+    conn = pool.acquire()
+    outer = (held, getattr(_local, "readonly", None))
+    _local.conn, _local.readonly = conn, readonly
+    profiled = profiler.enabled
+    if profiled:
+        profiler.attach(conn)
+    broken = False
     try:
         yield conn
-        conn.commit()
+        if not readonly:
+            conn.commit()
     except Exception as e:
-        conn.rollback()
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            broken = True
         logger.error(f"Database error: {e}")
         raise
     finally:
-        conn.close()
+        _local.conn, _local.readonly = outer
+        if profiled:
+            profiler.detach(conn)
+        pool.release(conn, discard=broken)
+
+
+def iter_query(sql: str, params: tuple = (), batch_size: int = 1000) -> Iterator[List[sqlite3.Row]]:
+    """Yield the rows of a read query in batches of up to `batch_size`.
+
+    The pooled read connection is held for the lifetime of the generator
+    rather than bound to the calling thread, so the generator may be advanced
+    from different worker threads (one at a time). Close it to return the
+    connection early. Read it to the end without waiting on anything slow
+    (e.g. a client download, see csv_stream): the connection is one of the
+    read pool's and its read snapshot holds back WAL checkpoints meanwhile.
+    """
+    pool = _get_pool(True)
+    conn = pool.acquire()
+    cursor = None
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        if cursor is not None:
+            cursor.close()
+        pool.release(conn)
 
 
 def init_db():
@@ -204,10 +551,135 @@ def init_db():
     """)
     
     conn.commit()
+    run_migrations(conn)
     conn.close()
     logger.info(f"Database initialized at {DB_PATH}")
 
 
+# ============================================================================
+# SCHEMA MIGRATIONS
+# ============================================================================
+
+# Versioned schema changes applied on top of the tables created by init_db().
+# Each entry is (version, description, statements); the highest applied
+# version is stored in PRAGMA user_version so existing databases are upgraded
+# in place and every migration runs exactly once.
+MIGRATIONS = [
+    (1, "Indexes for transactional joins and date filters", [
+        # Date-range filters and (date, id) ordering on document headers
+        "CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales(sale_date)",
+        "CREATE INDEX IF NOT EXISTS idx_purchases_purchase_date ON purchases(purchase_date)",
+        # Item lookups by document, covering the quantity/amount aggregates
+        "CREATE INDEX IF NOT EXISTS idx_sale_items_sale ON sale_items(sale_id, product_id, quantity, total_price)",
+        "CREATE INDEX IF NOT EXISTS idx_purchase_items_purchase ON purchase_items(purchase_id, product_id, quantity, unit_price)",
+        # Per-product aggregates joined back to the document date
+        "CREATE INDEX IF NOT EXISTS idx_sale_items_product ON sale_items(product_id, sale_id, quantity, total_price)",
+        "CREATE INDEX IF NOT EXISTS idx_purchase_items_product ON purchase_items(product_id, purchase_id, quantity, unit_price)",
+        # Opening/closing balances and ledger listing
+        "CREATE INDEX IF NOT EXISTS idx_stock_ledger_product_date ON stock_ledger(product_id, transaction_date, quantity)",
+        "CREATE INDEX IF NOT EXISTS idx_stock_ledger_date ON stock_ledger(transaction_date)",
+        "CREATE INDEX IF NOT EXISTS idx_products_name ON products(name)",
+        "ANALYZE",
+    ]),
+    (2, "Running balance on stock_ledger", [
+        "ALTER TABLE stock_ledger ADD COLUMN balance_after REAL",
+        lambda conn: rebuild_ledger_balances(conn),
+        # Point-in-time balance lookups: latest entry per product on or before a date
+        "DROP INDEX IF EXISTS idx_stock_ledger_product_date",
+        "CREATE INDEX IF NOT EXISTS idx_stock_ledger_product_balance ON stock_ledger(product_id, transaction_date, id, balance_after)",
+        "ANALYZE",
+    ]),
+    (3, "Daily sales/purchase rollup tables", [
+        lambda conn: rebuild_rollups(conn),
+        "ANALYZE",
+    ]),
+]
+
+
+def rebuild_ledger_balances(conn: sqlite3.Connection, product_ids: Optional[List[int]] = None) -> None:
+    """Recompute stock_ledger.balance_after for every entry (or every entry of `product_ids`).
+
+    balance_after is the product's running total of `quantity` ordered by
+    (transaction_date, id). Bulk loaders that insert ledger rows directly
+    should call this afterwards; the application maintains it on every write.
+    """
+    where, params = "", ()
+    if product_ids is not None:
+        where, params = "WHERE product_id IN (SELECT value FROM json_each(?))", (json.dumps(list(product_ids)),)
+    conn.execute("DROP TABLE IF EXISTS temp.ledger_balances")
+    conn.execute(f"""
+        CREATE TEMP TABLE ledger_balances AS
+        SELECT id, SUM(quantity) OVER (PARTITION BY product_id ORDER BY transaction_date, id) AS balance
+        FROM stock_ledger {where}
+    """, params)
+    conn.execute("CREATE UNIQUE INDEX temp.idx_ledger_balances_id ON ledger_balances(id)")
+    conn.execute(f"""
+        UPDATE stock_ledger
+        SET balance_after = (SELECT balance FROM temp.ledger_balances b WHERE b.id = stock_ledger.id)
+        {where}
+    """, params)
+    conn.execute("DROP TABLE temp.ledger_balances")
+
+
+def refresh_ledger_balances(product_ids: List[int]) -> None:
+    """Recompute the ledger running balances of `product_ids` in one transaction."""
+    def _apply(conn):
+        if product_ids:
+            _touch("stock_ledger")
+            rebuild_ledger_balances(conn, product_ids)
+
+    _run_write(_apply)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the schema version recorded in the database file."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations in order and return the resulting schema version."""
+    version = get_schema_version(conn)
+    for target, description, statements in MIGRATIONS:
+        if target <= version:
+            continue
+        logger.info(f"Applying migration {target}: {description}")
+        try:
+            conn.execute("BEGIN")
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            # PRAGMA does not accept bound parameters
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception(f"Migration {target} failed")
+            raise
+        version = target
+    return version
+
+
+def rebuild_rollup_tables() -> None:
+    """Regenerate the daily rollup tables from raw sales and purchases."""
+    def _apply(conn):
+        _touch(*ROLLUP_TABLES)
+        rebuild_rollups(conn)
+        _emit("rollups", {})
+
+    _run_write(_apply)
+
+
+def migrate_db() -> int:
+    """Bring an existing database file up to the latest schema version."""
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        return run_migrations(conn)
+    finally:
+        conn.close()
+
+
 # ============================================================================
 # EMPLOYEE OPERATIONS
 # ============================================================================
@@ -215,7 +687,8 @@ def init_db():
 def create_employee(email: str, name: str, position: str, department: str, 
                    contact: str, joining_date: str) -> Dict[str, Any]:
     """Create a new employee"""
-    with get_db_connection() as conn:
+    def _apply(conn):
+        _touch("employees")
         cursor = conn.cursor()
         cursor.execute("""
             INSERT INTO employees (email, name, position, department, contact, joining_date)
@@ -225,10 +698,12 @@ def create_employee(email: str, name: str, position: str, department: str,
         employee_id = cursor.lastrowid
         return {"id": employee_id, "email": email}
 
+    return _run_write(_apply)
+
 
 def get_employee_by_email(email: str) -> Optional[Dict[str, Any]]:
     """Get employee by email"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM employees WHERE LOWER(email) = LOWER(?)", (email,))
         row = cursor.fetchone()
@@ -237,7 +712,8 @@ def get_employee_by_email(email: str) -> Optional[Dict[str, Any]]:
 
 def update_employee(email: str, updates: Dict[str, Any]) -> bool:
     """Update employee information"""
-    with get_db_connection() as conn:
+    def _apply(conn):
+        _touch("employees")
         cursor = conn.cursor()
         set_clause = ", ".join([f"{k} = ?" for k in updates.keys()])
         cursor.execute(
@@ -246,18 +722,23 @@ def update_employee(email: str, updates: Dict[str, Any]) -> bool:
         )
         return cursor.rowcount > 0
 
+    return _run_write(_apply)
+
 
 def delete_employee(email: str) -> int:
     """Delete employee and return number of rows deleted"""
-    with get_db_connection() as conn:
+    def _apply(conn):
+        _touch("employees")
         cursor = conn.cursor()
         cursor.execute("DELETE FROM employees WHERE LOWER(email) = LOWER(?)", (email,))
         return cursor.rowcount
 
+    return _run_write(_apply)
+
 
 def list_all_employees() -> List[Dict[str, Any]]:
     """List all employees"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM employees ORDER BY name")
         return [dict(row) for row in cursor.fetchall()]
@@ -272,7 +753,9 @@ def list_all_employees() -> List[Dict[str, Any]]:
 def create_product(name: str, quantity_with_unit: str, purchase_unit_price: float,
                    sales_unit_price: float, reorder_point: Optional[int] = None) -> Dict[str, Any]:
     """Create a new product"""
-    with get_db_connection() as conn:
+    def _apply(conn):
+        _touch("products", "stock")
+        _emit("products", {})
         cursor = conn.cursor()
         cursor.execute("""
             INSERT INTO products (name, quantity_with_unit, purchase_unit_price, sales_unit_price, reorder_point)
@@ -289,10 +772,12 @@ def create_product(name: str, quantity_with_unit: str, purchase_unit_price: floa
         
         return {"id": product_id, "name": name}
 
+    return _run_write(_apply)
+
 
 def get_product_by_id(product_id: int) -> Optional[Dict[str, Any]]:
     """Get product by ID"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
         row = cursor.fetchone()
@@ -301,7 +786,9 @@ def get_product_by_id(product_id: int) -> Optional[Dict[str, Any]]:
 
 def update_product(product_id: int, updates: Dict[str, Any]) -> bool:
     """Update product information"""
-    with get_db_connection() as conn:
+    def _apply(conn):
+        _touch("products")
+        _emit("products", {})
         cursor = conn.cursor()
         set_clause = ", ".join([f"{k} = ?" for k in updates.keys()])
         cursor.execute(
@@ -310,10 +797,14 @@ def update_product(product_id: int, updates: Dict[str, Any]) -> bool:
         )
         return cursor.rowcount > 0
 
+    return _run_write(_apply)
+
 
 def delete_product(product_id: int) -> bool:
     """Delete product"""
-    with get_db_connection() as conn:
+    def _apply(conn):
+        _touch("products", "stock")
+        _emit("products", {})
         cursor = conn.cursor()
         # Delete stock entries first
         cursor.execute("DELETE FROM stock WHERE product_id = ?", (product_id,))
@@ -321,10 +812,12 @@ def delete_product(product_id: int) -> bool:
         cursor.execute("DELETE FROM products WHERE id = ?", (product_id,))
         return cursor.rowcount > 0
 
+    return _run_write(_apply)
+
 
 def list_all_products() -> List[Dict[str, Any]]:
     """List all products"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM products ORDER BY name")
         return [dict(row) for row in cursor.fetchall()]
@@ -334,10 +827,120 @@ def list_all_products() -> List[Dict[str, Any]]:
 # PURCHASE OPERATIONS
 # ============================================================================
 
+def _attach_items(documents: List[Dict[str, Any]], item_rows, parent_key: str) -> List[Dict[str, Any]]:
+    """Group item rows under their parent documents in a single pass.
+
+    Each document gets an `items` list; item rows whose parent is not among
+    `documents` are skipped.
+    """
+    items_by_parent: Dict[int, List[Dict[str, Any]]] = {}
+    for document in documents:
+        document["items"] = items_by_parent[document["id"]] = []
+    for row in item_rows:
+        items = items_by_parent.get(row[parent_key])
+        if items is not None:
+            items.append(dict(row))
+    return documents
+
+
+# Largest page a keyset-paginated listing will return
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(date_value: str, row_id: int) -> str:
+    """Encode a (date, id) position as an opaque pagination cursor."""
+    raw = f"{date_value}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """Decode a pagination cursor into its (date, id) position.
+
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date_value, row_id = base64.urlsafe_b64decode(padded.encode()).decode().rsplit("|", 1)
+        return date_value, int(row_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def _keyset_page(cursor, table: str, date_column: str, filters: List[str], params: List[Any],
+                 limit: int, after: Optional[str], before: Optional[str], as_columns: bool = False) -> Dict[str, Any]:
+    """Fetch one page of `table` ordered newest first by (date_column, id).
+
+    `after` continues towards older rows, `before` goes back towards newer
+    rows. The cursor position is compared in SQL so deep pages cost the same
+    as the first one. With `as_columns` the page holds "columns" and tuple
+    "rows" instead of "items".
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    conditions, args = list(filters), list(params)
+    if after:
+        conditions.append(f"({date_column}, id) < (?, ?)")
+        args.extend(decode_cursor(after))
+    elif before:
+        conditions.append(f"({date_column}, id) > (?, ?)")
+        args.extend(decode_cursor(before))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    direction = "ASC" if before and not after else "DESC"
+
+    # Plain tuples: a separate cursor so the caller's keeps its row factory
+    page_cursor = cursor.connection.cursor()
+    page_cursor.row_factory = None
+    page_cursor.execute(
+        f"SELECT * FROM {table} {where} ORDER BY {date_column} {direction}, id {direction} LIMIT ?",
+        (*args, limit + 1)
+    )
+    columns = [d[0] for d in page_cursor.description]
+    rows = page_cursor.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == "ASC":
+        rows.reverse()
+
+    date_index, id_index = columns.index(date_column), columns.index("id")
+    first = encode_cursor(rows[0][date_index], rows[0][id_index]) if rows else None
+    last = encode_cursor(rows[-1][date_index], rows[-1][id_index]) if rows else None
+    if direction == "ASC":
+        next_cursor, prev_cursor = last, (first if has_more else None)
+    else:
+        next_cursor, prev_cursor = (last if has_more else None), (first if after else None)
+    if as_columns:
+        return {"columns": columns, "rows": rows, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+    items = [dict(zip(columns, row)) for row in rows]
+    return {"items": items, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+
+def _date_range_filters(date_column: str, start_date: Optional[str],
+                        end_date: Optional[str]) -> tuple[List[str], List[Any]]:
+    """Build inclusive date range conditions for a paginated listing."""
+    filters, params = [], []
+    if start_date:
+        filters.append(f"{date_column} >= ?")
+        params.append(start_date)
+    if end_date:
+        filters.append(f"{date_column} <= ?")
+        params.append(end_date)
+    return filters, params
+
+
+def _fetch_items_for(cursor, table: str, parent_key: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Attach items to a bounded page of documents with a single IN (...) query."""
+    if not documents:
+        return documents
+    ids = [document["id"] for document in documents]
+    placeholders = ", ".join("?" for _ in ids)
+    cursor.execute(f"SELECT * FROM {table} WHERE {parent_key} IN ({placeholders}) ORDER BY id", ids)
+    return _attach_items(documents, cursor, parent_key)
+
+
 def create_purchase(vendor_name: str, invoice_number: str, purchase_date: str, 
                    items_data: List[Dict[str, Any]], notes: Optional[str] = None) -> Dict[str, Any]:
     """Create a new purchase order with items"""
-    with get_db_connection() as conn:
+    def _apply(conn):
+        _touch("purchases", "purchase_items", "daily_purchases", "daily_product_purchases")
         cursor = conn.cursor()
         
         # Calculate total
@@ -351,24 +954,29 @@ def create_purchase(vendor_name: str, invoice_number: str, purchase_date: str,
         purchase_id = cursor.lastrowid
         
         # Insert items and update stock
-        for item in items_data:
-            item_total = item["quantity"] * item["unit_price"]
-            cursor.execute("""
-                INSERT INTO purchase_items (purchase_id, product_id, product_name, quantity, unit_price, total_price)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (purchase_id, item["product_id"], item["product_name"], item["quantity"], 
-                  item["unit_price"], item_total))
-            
-            # Update stock (use same DB connection to avoid nested transactions locking the DB)
-            update_stock(item["product_id"], item["quantity"], "purchase", 
-                        reference_id=str(purchase_id), notes=f"Purchase {invoice_number}", conn=conn)
+        cursor.executemany("""
+            INSERT INTO purchase_items (purchase_id, product_id, product_name, quantity, unit_price, total_price)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(purchase_id, item["product_id"], item["product_name"], item["quantity"],
+               item["unit_price"], item["quantity"] * item["unit_price"]) for item in items_data])
+
+        # Update stock (use same DB connection to avoid nested transactions locking the DB)
+        apply_stock_movements([
+            {"product_id": item["product_id"], "quantity_change": item["quantity"],
+             "transaction_type": "purchase", "reference_id": str(purchase_id),
+             "notes": f"Purchase {invoice_number}"}
+            for item in items_data
+        ], conn=conn)
+        _record_document(conn, "purchase", purchase_id, 1)
         
         return {"id": purchase_id, "total_amount": total_amount}
 
+    return _run_write(_apply)
+
 
 def get_purchase_by_id(purchase_id: int) -> Optional[Dict[str, Any]]:
     """Get purchase with items by ID"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         
         # Get purchase header
@@ -388,52 +996,70 @@ def get_purchase_by_id(purchase_id: int) -> Optional[Dict[str, Any]]:
 
 def list_all_purchases() -> List[Dict[str, Any]]:
     """List all purchases"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM purchases ORDER BY purchase_date DESC")
         purchases = [dict(row) for row in cursor.fetchall()]
-        
-        # Get items for each purchase
-        for purchase in purchases:
-            cursor.execute("SELECT * FROM purchase_items WHERE purchase_id = ?", (purchase["id"],))
-            purchase["items"] = [dict(item_row) for item_row in cursor.fetchall()]
-        
-        return purchases
+
+        # Fetch all items in one query instead of one query per purchase
+        cursor.execute("SELECT * FROM purchase_items ORDER BY id")
+        return _attach_items(purchases, cursor, "purchase_id")
+
+
+def list_purchases_page(limit: int = 50, after: Optional[str] = None, before: Optional[str] = None,
+                        start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+    """List purchases newest first, one keyset page at a time, with their items."""
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        filters, params = _date_range_filters("purchase_date", start_date, end_date)
+        page = _keyset_page(cursor, "purchases", "purchase_date", filters, params, limit, after, before)
+        _fetch_items_for(cursor, "purchase_items", "purchase_id", page["items"])
+        return page
 
 
 def update_purchase(purchase_id: int, updates: Dict[str, Any]) -> bool:
     """Update purchase information"""
-    with get_db_connection() as conn:
+    def _apply(conn):
+        _touch("purchases", "daily_purchases", "daily_product_purchases")
         cursor = conn.cursor()
+        _record_document(conn, "purchase", purchase_id, -1)
         set_clause = ", ".join([f"{k} = ?" for k in updates.keys()])
         cursor.execute(
             f"UPDATE purchases SET {set_clause}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
             (*updates.values(), purchase_id)
         )
+        _record_document(conn, "purchase", purchase_id, 1)
         return cursor.rowcount > 0
 
+    return _run_write(_apply)
+
 
 def delete_purchase(purchase_id: int) -> bool:
     """Delete purchase and associated stock movements"""
-    with get_db_connection() as conn:
+    def _apply(conn):
+        _touch("purchases", "purchase_items", "daily_purchases", "daily_product_purchases")
         cursor = conn.cursor()
         
         # Get items to reverse stock
         cursor.execute("SELECT product_id, quantity FROM purchase_items WHERE purchase_id = ?", (purchase_id,))
         items = cursor.fetchall()
         
-        for item in items:
-            product_id, quantity = item[0], item[1]
-            # Reverse the stock addition (use same DB connection)
-            update_stock(product_id, -quantity, "purchase_return", 
-                        reference_id=str(purchase_id), notes="Purchase deleted", conn=conn)
+        # Reverse the stock addition (use same DB connection)
+        apply_stock_movements([
+            {"product_id": item[0], "quantity_change": -item[1], "transaction_type": "purchase_return",
+             "reference_id": str(purchase_id), "notes": "Purchase deleted"}
+            for item in items
+        ], conn=conn)
         
         # Delete purchase items and purchase
+        _record_document(conn, "purchase", purchase_id, -1)
         cursor.execute("DELETE FROM purchase_items WHERE purchase_id = ?", (purchase_id,))
         cursor.execute("DELETE FROM purchases WHERE id = ?", (purchase_id,))
         
         return cursor.rowcount > 0
 
+    return _run_write(_apply)
+
 
 # ============================================================================
 # SALES OPERATIONS
@@ -442,7 +1068,8 @@ def delete_purchase(purchase_id: int) -> bool:
 def create_sale(customer_name: str, invoice_number: str, sale_date: str, 
                items_data: List[Dict[str, Any]], notes: Optional[str] = None) -> Dict[str, Any]:
     """Create a new sale order with items"""
-    with get_db_connection() as conn:
+    def _apply(conn):
+        _touch("sales", "sale_items", "daily_sales", "daily_product_sales")
         cursor = conn.cursor()
         
         # Calculate total
@@ -456,24 +1083,29 @@ def create_sale(customer_name: str, invoice_number: str, sale_date: str,
         sale_id = cursor.lastrowid
         
         # Insert items and update stock
-        for item in items_data:
-            item_total = item["quantity"] * item["unit_price"]
-            cursor.execute("""
-                INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price, total_price)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (sale_id, item["product_id"], item["product_name"], item["quantity"], 
-                  item["unit_price"], item_total))
-            
-            # Update stock (decrease) using same DB connection
-            update_stock(item["product_id"], -item["quantity"], "sale", 
-                        reference_id=str(sale_id), notes=f"Sale {invoice_number}", conn=conn)
+        cursor.executemany("""
+            INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price, total_price)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(sale_id, item["product_id"], item["product_name"], item["quantity"],
+               item["unit_price"], item["quantity"] * item["unit_price"]) for item in items_data])
+
+        # Update stock (decrease) using same DB connection
+        apply_stock_movements([
+            {"product_id": item["product_id"], "quantity_change": -item["quantity"],
+             "transaction_type": "sale", "reference_id": str(sale_id),
+             "notes": f"Sale {invoice_number}"}
+            for item in items_data
+        ], conn=conn)
+        _record_document(conn, "sale", sale_id, 1)
         
         return {"id": sale_id, "total_amount": total_amount}
 
+    return _run_write(_apply)
+
 
 def get_sale_by_id(sale_id: int) -> Optional[Dict[str, Any]]:
     """Get sale with items by ID"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         
         # Get sale header
@@ -493,40 +1125,53 @@ def get_sale_by_id(sale_id: int) -> Optional[Dict[str, Any]]:
 
 def list_all_sales() -> List[Dict[str, Any]]:
     """List all sales"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM sales ORDER BY sale_date DESC")
         sales = [dict(row) for row in cursor.fetchall()]
-        
-        # Get items for each sale
-        for sale in sales:
-            cursor.execute("SELECT * FROM sale_items WHERE sale_id = ?", (sale["id"],))
-            sale["items"] = [dict(item_row) for item_row in cursor.fetchall()]
-        
-        return sales
+
+        # Fetch all items in one query instead of one query per sale
+        cursor.execute("SELECT * FROM sale_items ORDER BY id")
+        return _attach_items(sales, cursor, "sale_id")
+
+
+def list_sales_page(limit: int = 50, after: Optional[str] = None, before: Optional[str] = None,
+                    start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+    """List sales newest first, one keyset page at a time, with their items."""
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        filters, params = _date_range_filters("sale_date", start_date, end_date)
+        page = _keyset_page(cursor, "sales", "sale_date", filters, params, limit, after, before)
+        _fetch_items_for(cursor, "sale_items", "sale_id", page["items"])
+        return page
 
 
 def delete_sale(sale_id: int) -> bool:
     """Delete sale and reverse stock movements"""
-    with get_db_connection() as conn:
+    def _apply(conn):
+        _touch("sales", "sale_items", "daily_sales", "daily_product_sales")
         cursor = conn.cursor()
         
         # Get items to reverse stock
         cursor.execute("SELECT product_id, quantity FROM sale_items WHERE sale_id = ?", (sale_id,))
         items = cursor.fetchall()
         
-        for item in items:
-            product_id, quantity = item[0], item[1]
-            # Reverse the stock deduction (use same DB connection)
-            update_stock(product_id, quantity, "sale_return", 
-                        reference_id=str(sale_id), notes="Sale deleted", conn=conn)
+        # Reverse the stock deduction (use same DB connection)
+        apply_stock_movements([
+            {"product_id": item[0], "quantity_change": item[1], "transaction_type": "sale_return",
+             "reference_id": str(sale_id), "notes": "Sale deleted"}
+            for item in items
+        ], conn=conn)
         
         # Delete sale items and sale
+        _record_document(conn, "sale", sale_id, -1)
         cursor.execute("DELETE FROM sale_items WHERE sale_id = ?", (sale_id,))
         cursor.execute("DELETE FROM sales WHERE id = ?", (sale_id,))
         
         return cursor.rowcount > 0
 
+    return _run_write(_apply)
+
 
 def update_sale(sale_id: int, updates: Dict[str, Any]) -> bool:
     """Update a sale header and optionally its items.
@@ -536,8 +1181,10 @@ def update_sale(sale_id: int, updates: Dict[str, Any]) -> bool:
     When replacing items we reverse the stock effects of existing items and
     apply the new items' stock changes within the same transaction.
     """
-    with get_db_connection() as conn:
+    def _apply(conn):
+        _touch("sales", "sale_items", "daily_sales", "daily_product_sales")
         cursor = conn.cursor()
+        _record_document(conn, "sale", sale_id, -1)
 
         # If items provided, replace them and adjust stock
         items = updates.pop("items", None)
@@ -554,29 +1201,219 @@ def update_sale(sale_id: int, updates: Dict[str, Any]) -> bool:
             # Reverse stock for existing items
             cursor.execute("SELECT product_id, quantity FROM sale_items WHERE sale_id = ?", (sale_id,))
             old_items = cursor.fetchall()
-            for it in old_items:
-                pid, qty = it[0], it[1]
-                update_stock(pid, qty, "sale_update_revert", reference_id=str(sale_id), notes="Sale items replaced", conn=conn)
+            movements = [
+                {"product_id": it[0], "quantity_change": it[1], "transaction_type": "sale_update_revert",
+                 "reference_id": str(sale_id), "notes": "Sale items replaced"}
+                for it in old_items
+            ]
 
             # Delete old items
             cursor.execute("DELETE FROM sale_items WHERE sale_id = ?", (sale_id,))
 
             # Insert new items and apply stock changes
             total_amount = 0
+            rows = []
             for it in items:
                 item_total = it.get("quantity", 0) * it.get("unit_price", 0)
-                cursor.execute(
-                    "INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price, total_price) VALUES (?, ?, ?, ?, ?, ?)",
-                    (sale_id, it.get("product_id"), it.get("product_name"), it.get("quantity"), it.get("unit_price"), item_total)
-                )
-                update_stock(it.get("product_id"), -it.get("quantity", 0), "sale", reference_id=str(sale_id), notes=f"Sale updated", conn=conn)
+                rows.append((sale_id, it.get("product_id"), it.get("product_name"), it.get("quantity"), it.get("unit_price"), item_total))
+                movements.append({"product_id": it.get("product_id"), "quantity_change": -it.get("quantity", 0),
+                                  "transaction_type": "sale", "reference_id": str(sale_id), "notes": "Sale updated"})
                 total_amount += item_total
+            cursor.executemany(
+                "INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price, total_price) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            apply_stock_movements(movements, conn=conn)
 
             # Update total_amount on the sale
             cursor.execute("UPDATE sales SET total_amount = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (total_amount, sale_id))
 
+        _record_document(conn, "sale", sale_id, 1)
         return True
 
+    return _run_write(_apply)
+
+
+# ============================================================================
+# BULK IMPORT
+# ============================================================================
+
+# kind -> (header table, item table, item foreign key, party column, date column, stock direction, label)
+_DOCUMENT_KINDS = {
+    "sale": ("sales", "sale_items", "sale_id", "customer_name", "sale_date", -1, "Sale"),
+    "purchase": ("purchases", "purchase_items", "purchase_id", "vendor_name", "purchase_date", 1, "Purchase"),
+}
+
+
+def get_invoice_numbers(kind: str) -> Set[str]:
+    """All invoice numbers already used by sales (kind "sale") or purchases ("purchase")."""
+    header = _DOCUMENT_KINDS[kind][0]
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(f"SELECT DISTINCT invoice_number FROM {header}")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def import_products(products: List[Dict[str, Any]]) -> int:
+    """Insert many products, each with an empty stock row, in one transaction."""
+    def _apply(conn):
+        if not products:
+            return 0
+        _touch("products", "stock")
+        _emit("products", {})
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM products")
+        last_id = cursor.fetchone()[0]
+        cursor.executemany("""
+            INSERT INTO products (name, quantity_with_unit, purchase_unit_price, sales_unit_price, reorder_point)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(p["name"], p["quantity_with_unit"], p["purchase_unit_price"], p["sales_unit_price"],
+               p.get("reorder_point")) for p in products])
+        cursor.execute("""
+            INSERT INTO stock (product_id, available_stock)
+            SELECT id, 0 FROM products WHERE id > ?
+        """, (last_id,))
+        return len(products)
+
+    return _run_write(_apply)
+
+
+def import_documents(kind: str, documents: List[Dict[str, Any]], refresh_balances: bool = True) -> List[int]:
+    """Insert many sales or purchases in one transaction and return their ids.
+
+    `kind` is "sale" or "purchase". Each document carries the party name
+    (customer_name / vendor_name), invoice_number, its date, notes and
+    `items` with product_id, product_name, quantity and unit_price. Unlike
+    create_sale()/create_purchase(), which record stock movements on the
+    day they are entered, ledger entries are dated with the document date so
+    imported history lines up with the stock reports. Stock, ledger and
+    rollups are updated with a handful of batched statements per date.
+
+    Ledger balances of the affected products are recomputed at the end of
+    the transaction. A loader importing many chunks can pass
+    refresh_balances=False and call refresh_ledger_balances() once at the
+    end instead; until then, balance_after of entries dated after the
+    imported documents is stale (available stock is always exact).
+    """
+    header, items_table, fk, party_column, date_column, direction, label = _DOCUMENT_KINDS[kind]
+
+    def _apply(conn):
+        if not documents:
+            return []
+        _touch(header, items_table, f"daily_{header}", f"daily_product_{header}")
+        cursor = conn.cursor()
+
+        ids, item_rows = [], []
+        movements_by_date: Dict[str, List[Dict[str, Any]]] = {}
+        for document in documents:
+            total_amount = sum(item["quantity"] * item["unit_price"] for item in document["items"])
+            cursor.execute(f"""
+                INSERT INTO {header} ({party_column}, invoice_number, {date_column}, notes, total_amount)
+                VALUES (?, ?, ?, ?, ?)
+            """, (document[party_column], document["invoice_number"], document[date_column],
+                  document.get("notes"), total_amount))
+            document_id = cursor.lastrowid
+            ids.append(document_id)
+            movements = movements_by_date.setdefault(document[date_column], [])
+            for item in document["items"]:
+                item_rows.append((document_id, item["product_id"], item["product_name"], item["quantity"],
+                                  item["unit_price"], item["quantity"] * item["unit_price"]))
+                movements.append({"product_id": item["product_id"], "quantity_change": direction * item["quantity"],
+                                  "transaction_type": kind, "reference_id": str(document_id),
+                                  "notes": f"{label} {document['invoice_number']}"})
+
+        cursor.executemany(f"""
+            INSERT INTO {items_table} ({fk}, product_id, product_name, quantity, unit_price, total_price)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, item_rows)
+
+        # Oldest first, so each day's running balances build on the previous day's
+        for entry_date in sorted(movements_by_date):
+            apply_stock_movements(movements_by_date[entry_date], conn=conn, transaction_date=entry_date,
+                                  shift_later=False)
+        if refresh_balances:
+            rebuild_ledger_balances(conn, sorted({row[1] for row in item_rows}))
+        # Ids are consecutive: nothing else writes while this job holds the writer
+        _record_document_range(conn, kind, ids[0], ids[-1])
+        return ids
+
+    return _run_write(_apply)
+
+
+# ============================================================================
+# BATCH ORDERS
+# ============================================================================
+
+def create_documents_batch(kind: str, documents: List[Dict[str, Any]], atomic: bool = True) -> List[Dict[str, Any]]:
+    """Create many sales or purchases in one write transaction.
+
+    `kind` is "sale" or "purchase"; documents have the same shape as for
+    import_documents(). This is the batch counterpart of create_sale() /
+    create_purchase(): stock movements are dated today and all headers,
+    items, ledger entries and rollups are written with a few batched
+    statements.
+
+    With atomic=True any failure rolls back the whole batch and is raised.
+    Otherwise a failing batch is retried one document at a time, each in
+    its own savepoint, so only the documents that fail are skipped.
+    Returns one {"id", "total_amount"} or {"error"} dict per document, in order.
+    """
+    header, items_table, fk, party_column, date_column, direction, label = _DOCUMENT_KINDS[kind]
+
+    def _insert(conn, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        cursor = conn.cursor()
+        results, item_rows, movements = [], [], []
+        for document in batch:
+            total_amount = sum(item["quantity"] * item["unit_price"] for item in document["items"])
+            cursor.execute(f"""
+                INSERT INTO {header} ({party_column}, invoice_number, {date_column}, notes, total_amount)
+                VALUES (?, ?, ?, ?, ?)
+            """, (document[party_column], document["invoice_number"], document[date_column],
+                  document.get("notes"), total_amount))
+            document_id = cursor.lastrowid
+            results.append({"id": document_id, "total_amount": total_amount})
+            for item in document["items"]:
+                item_rows.append((document_id, item["product_id"], item["product_name"], item["quantity"],
+                                  item["unit_price"], item["quantity"] * item["unit_price"]))
+                movements.append({"product_id": item["product_id"], "quantity_change": direction * item["quantity"],
+                                  "transaction_type": kind, "reference_id": str(document_id),
+                                  "notes": f"{label} {document['invoice_number']}"})
+        cursor.executemany(f"""
+            INSERT INTO {items_table} ({fk}, product_id, product_name, quantity, unit_price, total_price)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, item_rows)
+        apply_stock_movements(movements, conn=conn)
+        _record_document_range(conn, kind, results[0]["id"], results[-1]["id"])
+        return results
+
+    def _apply(conn):
+        if not documents:
+            return []
+        _touch(header, items_table, f"daily_{header}", f"daily_product_{header}")
+        if atomic:
+            return _insert(conn, documents)
+
+        # Savepoints of the write job: a rolled back attempt also drops the
+        # stock and rollup events it emitted
+        writer = _get_writer()
+        try:
+            with writer.savepoint("document_batch"):
+                return _insert(conn, documents)
+        except sqlite3.Error as e:
+            logger.warning(f"{label} batch failed ({e}), retrying document by document")
+
+        results = []
+        for document in documents:
+            try:
+                with writer.savepoint("batch_document"):
+                    results.extend(_insert(conn, [document]))
+            except sqlite3.Error as e:
+                results.append({"error": str(e)})
+        return results
+
+    return _run_write(_apply)
+
 
 # ============================================================================
 # STOCK OPERATIONS
@@ -588,50 +1425,101 @@ def update_stock(product_id: int, quantity_change: float, transaction_type: str,
 
     If a database connection is supplied via `conn`, use it so callers can perform
     multiple related writes within the same transaction (avoids nested connections
-    and potential "database is locked" errors). Otherwise a new connection is used.
+    and potential "database is locked" errors). Otherwise the change is queued as
+    its own write transaction.
     """
-    # Helper that performs the update using the provided cursor
-    def _do_update(cursor):
-        # Update or create stock entry
-        cursor.execute("SELECT available_stock FROM stock WHERE product_id = ?", (product_id,))
-        row = cursor.fetchone()
-
-        if row:
-            new_stock = row[0] + quantity_change
-            cursor.execute("""
-                UPDATE stock SET available_stock = ?, last_updated = CURRENT_TIMESTAMP 
-                WHERE product_id = ?
-            """, (new_stock, product_id))
-        else:
-            new_stock = quantity_change
-            cursor.execute("""
-                INSERT INTO stock (product_id, available_stock)
-                VALUES (?, ?)
-            """, (product_id, new_stock))
+    balances = apply_stock_movements([{
+        "product_id": product_id, "quantity_change": quantity_change,
+        "transaction_type": transaction_type, "reference_id": reference_id, "notes": notes,
+    }], conn=conn)
+    return {"product_id": product_id, "new_balance": balances[product_id]}
+
+
+def apply_stock_movements(movements: List[Dict[str, Any]],
+                          conn: Optional[sqlite3.Connection] = None,
+                          transaction_date: Optional[str] = None,
+                          shift_later: bool = True) -> Dict[int, float]:
+    """Apply several stock movements at once and return the new balance per product.
+
+    Each movement is a dict with `product_id`, `quantity_change`,
+    `transaction_type` and optional `reference_id` / `notes`. Changes are
+    summed per product and written with one UPSERT batch, and every movement
+    gets its own ledger entry from one INSERT batch, so the number of
+    statements does not grow with the number of invoice lines.
+
+    Ledger entries are dated `transaction_date` (default today) and carry the
+    product's running ledger balance in `balance_after`; entries dated later
+    than a back-dated movement have their balance shifted accordingly.
+    Bulk loaders may pass shift_later=False and call rebuild_ledger_balances()
+    for the affected products once they are done.
+    """
+    def _apply(conn):
+        if not movements:
+            return {}
+        _touch("stock", "stock_ledger")
+        cursor = conn.cursor()
 
-        # Add ledger entry
-        transaction_date = datetime.now().strftime("%Y-%m-%d")
-        cursor.execute("""
+        deltas: Dict[int, float] = {}
+        for m in movements:
+            deltas[m["product_id"]] = deltas.get(m["product_id"], 0) + m["quantity_change"]
+
+        cursor.executemany("""
+            INSERT INTO stock (product_id, available_stock) VALUES (?, ?)
+            ON CONFLICT(product_id) DO UPDATE SET
+                available_stock = available_stock + excluded.available_stock,
+                last_updated = CURRENT_TIMESTAMP
+        """, list(deltas.items()))
+
+        entry_date = transaction_date or datetime.now().strftime("%Y-%m-%d")
+        placeholders = ", ".join("?" * len(deltas))
+
+        # Ledger balance of each product as of the entry date; new entries get
+        # the highest ids, so they go after everything already on that date
+        cursor.execute(f"""
+            SELECT p.id, ({_LEDGER_BALANCE_AT.format(op="<=")}) FROM products p
+            WHERE p.id IN ({placeholders})
+        """, [entry_date, *deltas])
+        running = {row[0]: row[1] or 0 for row in cursor.fetchall()}
+
+        ledger_rows = []
+        for m in movements:
+            balance = running.get(m["product_id"], 0) + m["quantity_change"]
+            running[m["product_id"]] = balance
+            ledger_rows.append((m["product_id"], m["transaction_type"], m["quantity_change"], m.get("reference_id"),
+                                m["transaction_type"], m.get("notes"), entry_date, balance))
+        cursor.executemany("""
             INSERT INTO stock_ledger (product_id, transaction_type, quantity, reference_id, 
-                                     reference_type, notes, transaction_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (product_id, transaction_type, quantity_change, reference_id, 
-              transaction_type, notes, transaction_date))
-
-        return {"product_id": product_id, "new_balance": new_stock}
+                                     reference_type, notes, transaction_date, balance_after)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, ledger_rows)
+
+        # Back-dated movements shift the running balance of later entries
+        if shift_later:
+            cursor.executemany("""
+                UPDATE stock_ledger SET balance_after = balance_after + ?
+                WHERE product_id = ? AND transaction_date > ?
+            """, [(delta, product_id, entry_date) for product_id, delta in deltas.items()])
+
+        cursor.execute(f"""
+            SELECT s.product_id, s.available_stock, p.name, p.reorder_point
+            FROM stock s
+            LEFT JOIN products p ON p.id = s.product_id
+            WHERE s.product_id IN ({placeholders})
+        """, list(deltas))
+        rows = cursor.fetchall()
+        balances = {row[0]: row[1] for row in rows}
+        _emit("stock", {"balances": balances, "deltas": deltas, "date": entry_date,
+                        "products": {row[0]: (row[2], row[3]) for row in rows}})
+        return balances
 
     if conn is not None:
-        cursor = conn.cursor()
-        return _do_update(cursor)
-    else:
-        with get_db_connection() as _conn:
-            cursor = _conn.cursor()
-            return _do_update(cursor)
+        return _apply(conn)
+    return _run_write(_apply)
 
 
 def get_stock(product_id: int) -> float:
     """Get current stock for a product"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT available_stock FROM stock WHERE product_id = ?", (product_id,))
         row = cursor.fetchone()
@@ -640,7 +1528,7 @@ def get_stock(product_id: int) -> float:
 
 def list_all_stock() -> List[Dict[str, Any]]:
     """List all stock entries with product names"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT s.id, s.product_id, p.name as product_name, s.available_stock, s.last_updated
@@ -651,88 +1539,205 @@ def list_all_stock() -> List[Dict[str, Any]]:
         return [dict(row) for row in cursor.fetchall()]
 
 
-def get_low_stock_alerts() -> List[Dict[str, Any]]:
+_LOW_STOCK_SORTS = ("product_id", "product_name", "current_stock", "reorder_point", "shortage")
+
+
+def low_stock_alerts_query(sort: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                           count: bool = False) -> Tuple[str, tuple]:
+    """SQL and parameters for get_low_stock_alerts() (count=True: its row count)."""
+    sql = """
+        SELECT 
+            p.id as product_id,
+            p.name as product_name,
+            COALESCE(s.available_stock, 0) as current_stock,
+            p.reorder_point,
+            (p.reorder_point - COALESCE(s.available_stock, 0)) as shortage
+        FROM products p
+        LEFT JOIN stock s ON p.id = s.product_id
+        WHERE p.reorder_point IS NOT NULL 
+          AND (s.available_stock IS NULL OR s.available_stock < p.reorder_point)"""
+    if count:
+        return _count_query(sql, ())
+    return _paged_query(sql, (), sort, _LOW_STOCK_SORTS, "-shortage", "product_id", limit, offset)
+
+
+def get_low_stock_alerts(sort: Optional[str] = None, limit: Optional[int] = None,
+                         offset: int = 0) -> List[Dict[str, Any]]:
     """Get products below reorder point"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                p.id as product_id,
-                p.name as product_name,
-                COALESCE(s.available_stock, 0) as current_stock,
-                p.reorder_point,
-                (p.reorder_point - COALESCE(s.available_stock, 0)) as shortage
-            FROM products p
-            LEFT JOIN stock s ON p.id = s.product_id
-            WHERE p.reorder_point IS NOT NULL 
-              AND (s.available_stock IS NULL OR s.available_stock < p.reorder_point)
-            ORDER BY shortage DESC
-        """)
-        return [dict(row) for row in cursor.fetchall()]
+    return _fetch_all(*low_stock_alerts_query(sort, limit, offset))
 
 
 # ---------------------------------------------------------------------------
 # REPORTS
 # ---------------------------------------------------------------------------
 
-def get_current_stock_report(start_date: str | None = None, end_date: str | None = None) -> List[Dict[str, Any]]:
-    """Get current stock report per product.
+def _fetch_all(sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    """Run a report query on a read connection and return its rows as dicts."""
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        return [dict(r) for r in cursor.fetchall()]
 
-    If start_date/end_date are provided (YYYY-MM-DD), purchased and sold are
-    aggregated within that inclusive date range. Opening is calculated from
-    stock_ledger sums before the start_date. Closing = opening + purchased - sold.
+
+def _fetch_columns(sql: str, params: tuple = ()) -> Tuple[List[str], List[tuple]]:
+    """Run a report query and return (column names, rows as plain tuples)."""
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(sql, params)
+        return [d[0] for d in cursor.description], cursor.fetchall()
+
+
+def _paged_query(sql: str, params: tuple, sort: Optional[str], columns: Tuple[str, ...], default_sort: str,
+                 key: str, limit: Optional[int] = None, offset: int = 0) -> Tuple[str, tuple]:
+    """Append ORDER BY/LIMIT/OFFSET to a report's base query.
+
+    `sort` names one of the report's output `columns`, prefixed with "-" for
+    descending order; anything else raises ValueError. `key` is a unique
+    output column added as a tie-breaker so pages never overlap.
     """
+    sort = sort or default_sort
+    column = sort.lstrip("-")
+    if column not in columns:
+        raise ValueError(f"Invalid sort '{sort}', expected one of: {', '.join(columns)}")
+    direction = "DESC" if sort.startswith("-") else "ASC"
+    order = f"{column} {direction}" if column == key else f"{column} {direction}, {key} {direction}"
+    return (
+        f"{sql}\n        ORDER BY {order}\n        LIMIT ? OFFSET ?",
+        (*params, -1 if limit is None else max(limit, 0), max(offset, 0)),
+    )
+
+
+def _count_query(sql: str, params: tuple) -> Tuple[str, tuple]:
+    """Row count of a report's base query."""
+    return f"SELECT COUNT(*) FROM ({sql})", params
+
+
+# Reports with one row per product count the catalog instead of evaluating every row
+_PRODUCT_COUNT_QUERY = ("SELECT COUNT(*) FROM products", ())
+
+
+def count_report_rows(query: Callable[..., Tuple[str, tuple]], *args: Any, **kwargs: Any) -> int:
+    """Total rows of a report, e.g. count_report_rows(product_wise_sales_query, start_date, end_date).
+
+    Runs the builder's cheap count=True form, which ignores sorting and paging.
+    """
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(*query(*args, count=True, **kwargs))
+        return cursor.fetchone()[0]
+
+
+def fetch_report_columns(query: Callable[..., Tuple[str, tuple]], *args: Any,
+                         **kwargs: Any) -> Tuple[List[str], List[tuple]]:
+    """Rows of a report as (column names, tuples), e.g. fetch_report_columns(dead_stock_query, 30).
+
+    Same rows and order as the matching get_*() function, without building a
+    dict per row.
+    """
+    return _fetch_columns(*query(*args, **kwargs))
+
+
+# Running ledger balance of product `p.id` at the latest entry dated {op} the bound date
+_LEDGER_BALANCE_AT = """
+    SELECT sl.balance_after FROM stock_ledger sl
+    WHERE sl.product_id = p.id AND sl.transaction_date {op} ?
+    ORDER BY sl.transaction_date DESC, sl.id DESC LIMIT 1
+"""
+
+
+def get_stock_as_of(as_of_date: str) -> List[Dict[str, Any]]:
+    """Get every product's ledger balance at the end of `as_of_date` (YYYY-MM-DD)."""
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT
+                p.id as product_id,
+                p.name as product_name,
+                COALESCE(({_LEDGER_BALANCE_AT.format(op="<=")}), 0) as balance
+            FROM products p
+            ORDER BY p.name
+        """, (as_of_date,))
+        return [dict(r) for r in cursor.fetchall()]
+
+
+_CURRENT_STOCK_SORTS = ("product_id", "product_name", "opening", "purchased", "sold", "closing")
+
+
+def current_stock_report_query(start_date: str | None = None, end_date: str | None = None,
+                               sort: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                               count: bool = False) -> Tuple[str, tuple]:
+    """SQL and parameters for get_current_stock_report() (count=True: its row count)."""
+    if count:
+        return _PRODUCT_COUNT_QUERY
     # Default date window: from epoch to today
-    from datetime import datetime, date
     if end_date is None:
         end_date = date.today().strftime("%Y-%m-%d")
     if start_date is None:
         start_date = '1970-01-01'
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
+    # MATERIALIZED: a plain subquery is flattened into the outer SELECT and
+    # every correlated subquery then runs twice, once more for `closing`
+    sql = f"""
+        WITH r AS MATERIALIZED (
             SELECT
                 p.id as product_id,
                 p.name as product_name,
                 -- Opening stock from ledger before start_date
-                COALESCE((SELECT SUM(quantity) FROM stock_ledger sl WHERE sl.product_id = p.id AND sl.transaction_date < ?), 0) as opening,
+                COALESCE(({_LEDGER_BALANCE_AT.format(op="<")}), 0) as opening,
                 -- Purchased within range from purchase_items JOIN purchases
                 COALESCE((SELECT SUM(pi.quantity) FROM purchase_items pi JOIN purchases pu ON pi.purchase_id = pu.id WHERE pi.product_id = p.id AND pu.purchase_date BETWEEN ? AND ?), 0) as purchased,
                 -- Sold within range from sale_items JOIN sales
                 COALESCE((SELECT SUM(si.quantity) FROM sale_items si JOIN sales s ON si.sale_id = s.id WHERE si.product_id = p.id AND s.sale_date BETWEEN ? AND ?), 0) as sold
             FROM products p
-            ORDER BY p.name
-        """, (start_date, start_date, end_date, start_date, end_date))
+        )
+        SELECT r.*, r.opening + r.purchased - r.sold AS closing FROM r"""
+    params = (start_date, start_date, end_date, start_date, end_date)
+    return _paged_query(sql, params, sort, _CURRENT_STOCK_SORTS, "product_name", "product_id", limit, offset)
+
 
-        rows = [dict(r) for r in cursor.fetchall()]
-        # Compute closing
-        for r in rows:
-            r['closing'] = (r.get('opening', 0) or 0) + (r.get('purchased', 0) or 0) - (r.get('sold', 0) or 0)
-        return rows
+def get_current_stock_report(start_date: str | None = None, end_date: str | None = None,
+                             sort: Optional[str] = None, limit: Optional[int] = None,
+                             offset: int = 0) -> List[Dict[str, Any]]:
+    """Get current stock report per product.
 
+    If start_date/end_date are provided (YYYY-MM-DD), purchased and sold are
+    aggregated within that inclusive date range. Opening is calculated from
+    the running ledger balance before the start_date. Closing = opening + purchased - sold.
+    Sorting by product_id or product_name with a limit only computes the
+    requested page.
+    """
+    return _fetch_all(*current_stock_report_query(start_date, end_date, sort, limit, offset))
 
-def get_monthly_opening_closing(year: int, month: int) -> List[Dict[str, Any]]:
-    """Get opening and closing stock for each product for the given month."""
+
+_MONTHLY_STOCK_SORTS = ("product_id", "product_name", "opening", "closing")
+
+
+def monthly_opening_closing_query(year: int, month: int, sort: Optional[str] = None, limit: Optional[int] = None,
+                                  offset: int = 0, count: bool = False) -> Tuple[str, tuple]:
+    """SQL and parameters for get_monthly_opening_closing() (count=True: its row count)."""
+    if count:
+        return _PRODUCT_COUNT_QUERY
     from calendar import monthrange
     start_date = f"{year:04d}-{month:02d}-01"
     last_day = monthrange(year, month)[1]
     end_date = f"{year:04d}-{month:02d}-{last_day:02d}"
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                p.id as product_id,
-                p.name as product_name,
-                COALESCE((SELECT SUM(quantity) FROM stock_ledger sl WHERE sl.product_id = p.id AND sl.transaction_date < ?), 0) as opening,
-                COALESCE((SELECT SUM(quantity) FROM stock_ledger sl WHERE sl.product_id = p.id AND sl.transaction_date <= ?), 0) as closing
-            FROM products p
-            ORDER BY p.name
-        """, (start_date, end_date))
+    sql = f"""
+        SELECT
+            p.id as product_id,
+            p.name as product_name,
+            COALESCE(({_LEDGER_BALANCE_AT.format(op="<")}), 0) as opening,
+            COALESCE(({_LEDGER_BALANCE_AT.format(op="<=")}), 0) as closing
+        FROM products p"""
+    return _paged_query(sql, (start_date, end_date), sort, _MONTHLY_STOCK_SORTS, "product_name", "product_id",
+                        limit, offset)
 
-        rows = [dict(r) for r in cursor.fetchall()]
-        return rows
+
+def get_monthly_opening_closing(year: int, month: int, sort: Optional[str] = None, limit: Optional[int] = None,
+                                offset: int = 0) -> List[Dict[str, Any]]:
+    """Get opening and closing stock for each product for the given month."""
+    return _fetch_all(*monthly_opening_closing_query(year, month, sort, limit, offset))
 
 
 def get_kpis() -> Dict[str, Any]:
@@ -746,6 +1751,9 @@ def get_kpis() -> Dict[str, Any]:
         'best_selling_product': 'Name' | None,
         'profit_today': {'value': float|None, 'change_pct': float|None}
     }
+
+    Computed from scratch; GET /reports/kpis serves the same figures from the
+    incrementally maintained kpi_engine instead.
     """
     today = date.today().strftime("%Y-%m-%d")
     yesterday = (date.today() - timedelta(days=1)).strftime("%Y-%m-%d")
@@ -755,44 +1763,43 @@ def get_kpis() -> Dict[str, Any]:
     prev_month_date = first_of_month - timedelta(days=1)
     prev_month = prev_month_date.strftime("%Y-%m")
 
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
-        # Today's sales
-        cursor.execute("SELECT COALESCE(SUM(total_amount), 0) FROM sales WHERE sale_date = ?", (today,))
-        todays_sales = float(cursor.fetchone()[0] or 0)
-
-        # Yesterday's sales for comparison
-        cursor.execute("SELECT COALESCE(SUM(total_amount), 0) FROM sales WHERE sale_date = ?", (yesterday,))
-        yest_sales = float(cursor.fetchone()[0] or 0)
+        # Today's and yesterday's sales from the daily rollup
+        cursor.execute("SELECT day, amount FROM daily_sales WHERE day IN (?, ?)", (today, yesterday))
+        by_day = {row[0]: row[1] for row in cursor.fetchall()}
+        todays_sales = float(by_day.get(today) or 0)
+        yest_sales = float(by_day.get(yesterday) or 0)
         todays_change_pct = None
         if yest_sales != 0:
             todays_change_pct = (todays_sales - yest_sales) / yest_sales * 100
 
         # Month revenue
-        cursor.execute("SELECT COALESCE(SUM(total_amount), 0) FROM sales WHERE substr(sale_date,1,7) = ?", (current_month,))
+        month_revenue_sql = "SELECT COALESCE(SUM(amount), 0) FROM daily_sales WHERE day BETWEEN ? AND ?"
+        cursor.execute(month_revenue_sql, (current_month + "-01", current_month + "-31"))
         month_revenue = float(cursor.fetchone()[0] or 0)
-        cursor.execute("SELECT COALESCE(SUM(total_amount), 0) FROM sales WHERE substr(sale_date,1,7) = ?", (prev_month,))
+        cursor.execute(month_revenue_sql, (prev_month + "-01", prev_month + "-31"))
         prev_month_revenue = float(cursor.fetchone()[0] or 0)
         month_change_pct = None
         if prev_month_revenue != 0:
             month_change_pct = (month_revenue - prev_month_revenue) / prev_month_revenue * 100
 
         # Low stock count
-        low_alerts = get_low_stock_alerts()
-        low_stock_count = len(low_alerts)
+        cursor.execute(*low_stock_alerts_query(count=True))
+        low_stock_count = cursor.fetchone()[0]
 
-        # Best selling product this month (by quantity)
+        # Best selling product this month (by quantity), from the day x product rollup
         cursor.execute(
             """
-            SELECT si.product_name, COALESCE(SUM(si.quantity),0) as qty
-            FROM sale_items si
-            JOIN sales s ON si.sale_id = s.id
-            WHERE substr(s.sale_date,1,7) = ?
-            GROUP BY si.product_id
-            ORDER BY qty DESC
+            SELECT p.name, SUM(d.quantity) AS qty
+            FROM daily_product_sales d
+            LEFT JOIN products p ON p.id = d.product_id
+            WHERE d.day BETWEEN ? AND ?
+            GROUP BY d.product_id
+            ORDER BY qty DESC, d.product_id
             LIMIT 1
             """,
-            (current_month,)
+            (current_month + "-01", current_month + "-31")
         )
         row = cursor.fetchone()
         best_selling = row[0] if row else None
@@ -809,12 +1816,63 @@ def get_kpis() -> Dict[str, Any]:
         }
 
 
+KPI_STATE_PARTS = ("sales", "products")
+
+
+def load_kpi_state(today: Optional[date] = None, parts: Tuple[str, ...] = KPI_STATE_PARTS) -> Dict[str, Any]:
+    """Read the figures the in-memory KPI engine (kpi_engine.py) is built from.
+
+    parts:
+        sales     {day: [amount, invoice count]} of daily_sales for the
+                  previous and the current month of `today`, and this month's
+                  {product_id: [quantity, line count]}
+        products  {product_id: [name, reorder_point, available_stock]};
+                  available_stock is None without a stock row
+
+    Runs as a write job although it writes nothing, so that the snapshot is
+    published as a "kpi_state" event in commit order: after the events of
+    every write it already sees and before those of later writes.
+    """
+    today = today or date.today()
+    month = today.strftime("%Y-%m")
+    prev_month = (today.replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
+
+    def _apply(conn):
+        cursor = conn.cursor()
+        state: Dict[str, Any] = {"month": month, "prev_month": prev_month, "parts": tuple(parts)}
+        if "sales" in parts:
+            cursor.execute("SELECT day, amount, invoice_count FROM daily_sales WHERE day BETWEEN ? AND ?",
+                           (prev_month + "-01", month + "-31"))
+            state["days"] = {row[0]: [row[1], row[2]] for row in cursor.fetchall()}
+            cursor.execute("""
+                SELECT product_id, SUM(quantity), SUM(line_count) FROM daily_product_sales
+                WHERE day BETWEEN ? AND ? GROUP BY product_id
+            """, (month + "-01", month + "-31"))
+            state["month_products"] = {row[0]: [row[1], row[2]] for row in cursor.fetchall()}
+        if "products" in parts:
+            cursor.execute("""
+                SELECT p.id, p.name, p.reorder_point, s.available_stock
+                FROM products p
+                LEFT JOIN stock s ON s.product_id = p.id
+            """)
+            state["products"] = {row[0]: [row[1], row[2], row[3]] for row in cursor.fetchall()}
+        _emit("kpi_state", state)
+        return state
+
+    return _run_write(_apply)
+
+
 # ---------------------------------------------------------------------------
 # SALES REPORTS
 # ---------------------------------------------------------------------------
 
-def get_monthly_sales_summary(start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Return monthly summary rows: month (YYYY-MM), total_sales, total_quantity_sold, avg_sale_value."""
+_MONTHLY_SALES_SORTS = ("month", "total_sales", "total_quantity_sold", "avg_sale_value")
+
+
+def monthly_sales_summary_query(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                sort: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                                count: bool = False) -> Tuple[str, tuple]:
+    """SQL and parameters for get_monthly_sales_summary() (count=True: its row count)."""
     if end_date is None:
         end_date = date.today().strftime("%Y-%m-%d")
     if start_date is None:
@@ -822,25 +1880,34 @@ def get_monthly_sales_summary(start_date: Optional[str] = None, end_date: Option
         d = date.today() - timedelta(days=365)
         start_date = d.strftime("%Y-%m-%d")
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                substr(s.sale_date,1,7) AS month,
-                COALESCE(SUM(s.total_amount), 0) AS total_sales,
-                COALESCE(SUM(si.quantity), 0) AS total_quantity_sold,
-                CASE WHEN COUNT(DISTINCT s.id) = 0 THEN 0 ELSE ROUND(SUM(s.total_amount) / COUNT(DISTINCT s.id), 2) END AS avg_sale_value
-            FROM sales s
-            LEFT JOIN sale_items si ON si.sale_id = s.id
-            WHERE s.sale_date BETWEEN ? AND ?
-            GROUP BY month
-            ORDER BY month
-        """, (start_date, end_date))
-        return [dict(r) for r in cursor.fetchall()]
+    sql = """
+        SELECT
+            substr(day,1,7) AS month,
+            COALESCE(SUM(amount), 0) AS total_sales,
+            COALESCE(SUM(quantity), 0) AS total_quantity_sold,
+            CASE WHEN SUM(invoice_count) = 0 THEN 0 ELSE ROUND(SUM(amount) / SUM(invoice_count), 2) END AS avg_sale_value
+        FROM daily_sales
+        WHERE day BETWEEN ? AND ?
+        GROUP BY month"""
+    if count:
+        return _count_query(sql, (start_date, end_date))
+    return _paged_query(sql, (start_date, end_date), sort, _MONTHLY_SALES_SORTS, "month", "month", limit, offset)
+
+
+def get_monthly_sales_summary(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                              sort: Optional[str] = None, limit: Optional[int] = None,
+                              offset: int = 0) -> List[Dict[str, Any]]:
+    """Return monthly summary rows: month (YYYY-MM), total_sales, total_quantity_sold, avg_sale_value."""
+    return _fetch_all(*monthly_sales_summary_query(start_date, end_date, sort, limit, offset))
 
 
-def get_yearly_sales_summary(start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Return yearly summary rows: year (YYYY), total_sales, total_quantity_sold, avg_sale_value."""
+_YEARLY_SALES_SORTS = ("year", "total_sales", "total_quantity_sold", "avg_sale_value")
+
+
+def yearly_sales_summary_query(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                               sort: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                               count: bool = False) -> Tuple[str, tuple]:
+    """SQL and parameters for get_yearly_sales_summary() (count=True: its row count)."""
     if end_date is None:
         end_date = date.today().strftime("%Y-%m-%d")
     if start_date is None:
@@ -848,75 +1915,103 @@ def get_yearly_sales_summary(start_date: Optional[str] = None, end_date: Optiona
         d = date.today() - timedelta(days=365 * 3)
         start_date = d.strftime("%Y-%m-%d")
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                substr(s.sale_date,1,4) AS year,
-                COALESCE(SUM(s.total_amount), 0) AS total_sales,
-                COALESCE(SUM(si.quantity), 0) AS total_quantity_sold,
-                CASE WHEN COUNT(DISTINCT s.id) = 0 THEN 0 ELSE ROUND(SUM(s.total_amount) / COUNT(DISTINCT s.id), 2) END AS avg_sale_value
-            FROM sales s
-            LEFT JOIN sale_items si ON si.sale_id = s.id
-            WHERE s.sale_date BETWEEN ? AND ?
-            GROUP BY year
-            ORDER BY year
-        """, (start_date, end_date))
-        return [dict(r) for r in cursor.fetchall()]
+    sql = """
+        SELECT
+            substr(day,1,4) AS year,
+            COALESCE(SUM(amount), 0) AS total_sales,
+            COALESCE(SUM(quantity), 0) AS total_quantity_sold,
+            CASE WHEN SUM(invoice_count) = 0 THEN 0 ELSE ROUND(SUM(amount) / SUM(invoice_count), 2) END AS avg_sale_value
+        FROM daily_sales
+        WHERE day BETWEEN ? AND ?
+        GROUP BY year"""
+    if count:
+        return _count_query(sql, (start_date, end_date))
+    return _paged_query(sql, (start_date, end_date), sort, _YEARLY_SALES_SORTS, "year", "year", limit, offset)
+
+
+def get_yearly_sales_summary(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                             sort: Optional[str] = None, limit: Optional[int] = None,
+                             offset: int = 0) -> List[Dict[str, Any]]:
+    """Return yearly summary rows: year (YYYY), total_sales, total_quantity_sold, avg_sale_value."""
+    return _fetch_all(*yearly_sales_summary_query(start_date, end_date, sort, limit, offset))
 
 
-def get_product_wise_sales(start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Return product-wise sales: product_name, quantity_sold, revenue"""
+_PRODUCT_SALES_SORTS = ("product_id", "product_name", "quantity_sold", "revenue")
+
+
+def product_wise_sales_query(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                             sort: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                             count: bool = False) -> Tuple[str, tuple]:
+    """SQL and parameters for get_product_wise_sales() (count=True: its row count)."""
     if end_date is None:
         end_date = date.today().strftime("%Y-%m-%d")
     if start_date is None:
         d = date.today() - timedelta(days=365)
         start_date = d.strftime("%Y-%m-%d")
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                si.product_id as product_id,
-                si.product_name as product_name,
-                COALESCE(SUM(si.quantity), 0) AS quantity_sold,
-                COALESCE(SUM(si.total_price), 0) AS revenue
-            FROM sale_items si
-            JOIN sales s ON si.sale_id = s.id
-            WHERE s.sale_date BETWEEN ? AND ?
-            GROUP BY si.product_id
-            ORDER BY revenue DESC
-        """, (start_date, end_date))
-        return [dict(r) for r in cursor.fetchall()]
+    sql = """
+        SELECT
+            si.product_id as product_id,
+            si.product_name as product_name,
+            COALESCE(SUM(si.quantity), 0) AS quantity_sold,
+            COALESCE(SUM(si.total_price), 0) AS revenue
+        FROM sale_items si
+        JOIN sales s ON si.sale_id = s.id
+        WHERE s.sale_date BETWEEN ? AND ?
+        GROUP BY si.product_id"""
+    if count:
+        return _count_query(sql, (start_date, end_date))
+    return _paged_query(sql, (start_date, end_date), sort, _PRODUCT_SALES_SORTS, "-revenue", "product_id",
+                        limit, offset)
+
+
+def get_product_wise_sales(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                           sort: Optional[str] = None, limit: Optional[int] = None,
+                           offset: int = 0) -> List[Dict[str, Any]]:
+    """Return product-wise sales: product_name, quantity_sold, revenue"""
+    return _fetch_all(*product_wise_sales_query(start_date, end_date, sort, limit, offset))
+
+
+_TOP_SELLING_SORTS = ("product_id", "product_name", "qty_sold")
 
 
-def get_top_selling_products(start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
-    """Return top selling products by quantity sold (limit applies)."""
+def top_selling_products_query(start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 10,
+                               sort: Optional[str] = None, offset: int = 0,
+                               count: bool = False) -> Tuple[str, tuple]:
+    """SQL and parameters for get_top_selling_products() (count=True: products sold in the window)."""
     if end_date is None:
         end_date = date.today().strftime("%Y-%m-%d")
     if start_date is None:
         d = date.today() - timedelta(days=365)
         start_date = d.strftime("%Y-%m-%d")
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                si.product_id as product_id,
-                si.product_name as product_name,
-                COALESCE(SUM(si.quantity), 0) AS qty_sold
-            FROM sale_items si
-            JOIN sales s ON si.sale_id = s.id
-            WHERE s.sale_date BETWEEN ? AND ?
-            GROUP BY si.product_id
-            ORDER BY qty_sold DESC
-            LIMIT ?
-        """, (start_date, end_date, limit))
-        return [dict(r) for r in cursor.fetchall()]
+    sql = """
+        SELECT
+            si.product_id as product_id,
+            si.product_name as product_name,
+            COALESCE(SUM(si.quantity), 0) AS qty_sold
+        FROM sale_items si
+        JOIN sales s ON si.sale_id = s.id
+        WHERE s.sale_date BETWEEN ? AND ?
+        GROUP BY si.product_id"""
+    if count:
+        return _count_query(sql, (start_date, end_date))
+    return _paged_query(sql, (start_date, end_date), sort, _TOP_SELLING_SORTS, "-qty_sold", "product_id", limit, offset)
 
 
-def get_monthly_purchase_summary(start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Return monthly purchase summary: month (YYYY-MM), total_purchase, avg_cost."""
+def get_top_selling_products(start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 10,
+                             sort: Optional[str] = None, offset: int = 0) -> List[Dict[str, Any]]:
+    """Return top selling products by quantity sold (limit applies, offset pages further down the ranking)."""
+    return _fetch_all(*top_selling_products_query(start_date, end_date, limit, sort, offset))
+
+
+_MONTHLY_PURCHASE_SORTS = ("month", "total_purchase", "avg_cost")
+
+
+def monthly_purchase_summary_query(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                   sort: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                                   count: bool = False) -> Tuple[str, tuple]:
+    """SQL and parameters for get_monthly_purchase_summary() (count=True: its row count)."""
     if end_date is None:
         end_date = date.today().strftime("%Y-%m-%d")
     if start_date is None:
@@ -924,97 +2019,127 @@ def get_monthly_purchase_summary(start_date: Optional[str] = None, end_date: Opt
         d = date.today() - timedelta(days=365 * 3)
         start_date = d.strftime("%Y-%m-%d")
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                substr(p.purchase_date,1,7) AS month,
-                COALESCE(SUM(p.total_amount), 0) AS total_purchase,
-                CASE WHEN COUNT(DISTINCT p.id) = 0 THEN 0 ELSE ROUND(SUM(p.total_amount) / COUNT(DISTINCT p.id), 2) END AS avg_cost
-            FROM purchases p
-            LEFT JOIN purchase_items pi ON pi.purchase_id = p.id
-            WHERE p.purchase_date BETWEEN ? AND ?
-            GROUP BY month
-            ORDER BY month
-        """, (start_date, end_date))
-        return [dict(r) for r in cursor.fetchall()]
+    sql = """
+        SELECT
+            substr(day,1,7) AS month,
+            COALESCE(SUM(amount), 0) AS total_purchase,
+            CASE WHEN SUM(invoice_count) = 0 THEN 0 ELSE ROUND(SUM(amount) / SUM(invoice_count), 2) END AS avg_cost
+        FROM daily_purchases
+        WHERE day BETWEEN ? AND ?
+        GROUP BY month"""
+    if count:
+        return _count_query(sql, (start_date, end_date))
+    return _paged_query(sql, (start_date, end_date), sort, _MONTHLY_PURCHASE_SORTS, "month", "month", limit, offset)
+
+
+def get_monthly_purchase_summary(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                 sort: Optional[str] = None, limit: Optional[int] = None,
+                                 offset: int = 0) -> List[Dict[str, Any]]:
+    """Return monthly purchase summary: month (YYYY-MM), total_purchase, avg_cost."""
+    return _fetch_all(*monthly_purchase_summary_query(start_date, end_date, sort, limit, offset))
 
 
-def get_vendor_wise_purchases(start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Return vendor-wise purchase report: vendor, total_purchase_value, items_bought."""
+_VENDOR_PURCHASE_SORTS = ("vendor", "total_purchase_value", "items_bought")
+
+
+def vendor_wise_purchases_query(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                sort: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                                count: bool = False) -> Tuple[str, tuple]:
+    """SQL and parameters for get_vendor_wise_purchases() (count=True: its row count)."""
     if end_date is None:
         end_date = date.today().strftime("%Y-%m-%d")
     if start_date is None:
         d = date.today() - timedelta(days=365)
         start_date = d.strftime("%Y-%m-%d")
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                p.vendor_name AS vendor,
-                COALESCE(SUM(p.total_amount), 0) AS total_purchase_value,
-                COALESCE(SUM(pi.quantity), 0) AS items_bought
-            FROM purchases p
-            LEFT JOIN purchase_items pi ON pi.purchase_id = p.id
-            WHERE p.purchase_date BETWEEN ? AND ?
-            GROUP BY p.vendor_name
-            ORDER BY total_purchase_value DESC
-        """, (start_date, end_date))
-        return [dict(r) for r in cursor.fetchall()]
+    sql = """
+        SELECT
+            p.vendor_name AS vendor,
+            COALESCE(SUM(p.total_amount), 0) AS total_purchase_value,
+            COALESCE(SUM(pi.quantity), 0) AS items_bought
+        FROM purchases p
+        LEFT JOIN purchase_items pi ON pi.purchase_id = p.id
+        WHERE p.purchase_date BETWEEN ? AND ?
+        GROUP BY p.vendor_name"""
+    if count:
+        return _count_query(sql, (start_date, end_date))
+    return _paged_query(sql, (start_date, end_date), sort, _VENDOR_PURCHASE_SORTS, "-total_purchase_value", "vendor",
+                        limit, offset)
+
+
+def get_vendor_wise_purchases(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                              sort: Optional[str] = None, limit: Optional[int] = None,
+                              offset: int = 0) -> List[Dict[str, Any]]:
+    """Return vendor-wise purchase report: vendor, total_purchase_value, items_bought."""
+    return _fetch_all(*vendor_wise_purchases_query(start_date, end_date, sort, limit, offset))
 
 
-def get_price_variation_per_product(start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Return price variation per product: product_name, min_price, max_price, avg_price."""
+_PRICE_VARIATION_SORTS = ("product_id", "product_name", "min_price", "max_price", "avg_price")
+
+
+def price_variation_per_product_query(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                      sort: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                                      count: bool = False) -> Tuple[str, tuple]:
+    """SQL and parameters for get_price_variation_per_product() (count=True: its row count)."""
     if end_date is None:
         end_date = date.today().strftime("%Y-%m-%d")
     if start_date is None:
         d = date.today() - timedelta(days=365)
         start_date = d.strftime("%Y-%m-%d")
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                pi.product_id AS product_id,
-                pi.product_name AS product_name,
-                COALESCE(MIN(pi.unit_price),0) AS min_price,
-                COALESCE(MAX(pi.unit_price),0) AS max_price,
-                COALESCE(ROUND(AVG(pi.unit_price), 2),0) AS avg_price
-            FROM purchase_items pi
-            JOIN purchases p ON p.id = pi.purchase_id
-            WHERE p.purchase_date BETWEEN ? AND ?
-            GROUP BY pi.product_id
-            ORDER BY pi.product_name
-        """, (start_date, end_date))
-        return [dict(r) for r in cursor.fetchall()]
+    sql = """
+        SELECT
+            pi.product_id AS product_id,
+            pi.product_name AS product_name,
+            COALESCE(MIN(pi.unit_price),0) AS min_price,
+            COALESCE(MAX(pi.unit_price),0) AS max_price,
+            COALESCE(ROUND(AVG(pi.unit_price), 2),0) AS avg_price
+        FROM purchase_items pi
+        JOIN purchases p ON p.id = pi.purchase_id
+        WHERE p.purchase_date BETWEEN ? AND ?
+        GROUP BY pi.product_id"""
+    if count:
+        return _count_query(sql, (start_date, end_date))
+    return _paged_query(sql, (start_date, end_date), sort, _PRICE_VARIATION_SORTS, "product_name", "product_id",
+                        limit, offset)
+
+
+def get_price_variation_per_product(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                    sort: Optional[str] = None, limit: Optional[int] = None,
+                                    offset: int = 0) -> List[Dict[str, Any]]:
+    """Return price variation per product: product_name, min_price, max_price, avg_price."""
+    return _fetch_all(*price_variation_per_product_query(start_date, end_date, sort, limit, offset))
 
 
-def get_dead_stock(days: int = 60, limit: int | None = None) -> List[Dict[str, Any]]:
-    """Return products that have not been sold in the last `days` days. Includes last_sold_date and stock remaining."""
-    cutoff = (date.today() - timedelta(days=days)).strftime("%Y-%m-%d")
+_DEAD_STOCK_SORTS = ("product_id", "product_name", "last_sold_date", "stock_remaining")
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                p.id as product_id,
-                p.name as product_name,
-                MAX(s.sale_date) as last_sold_date,
-                COALESCE(st.available_stock, 0) as stock_remaining
-            FROM products p
-            LEFT JOIN sale_items si ON si.product_id = p.id
-            LEFT JOIN sales s ON s.id = si.sale_id
-            LEFT JOIN stock st ON st.product_id = p.id
-            GROUP BY p.id
-            HAVING (MAX(s.sale_date) IS NULL OR MAX(s.sale_date) <= ?)
-            ORDER BY last_sold_date ASC
-        """, (cutoff,))
 
-        rows = [dict(r) for r in cursor.fetchall()]
-        if limit is not None:
-            return rows[:limit]
-        return rows
+def dead_stock_query(days: int = 60, limit: int | None = None, sort: Optional[str] = None, offset: int = 0,
+                     count: bool = False) -> Tuple[str, tuple]:
+    """SQL and parameters for get_dead_stock() (count=True: its row count)."""
+    cutoff = (date.today() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    sql = """
+        SELECT
+            p.id as product_id,
+            p.name as product_name,
+            MAX(s.sale_date) as last_sold_date,
+            COALESCE(st.available_stock, 0) as stock_remaining
+        FROM products p
+        LEFT JOIN sale_items si ON si.product_id = p.id
+        LEFT JOIN sales s ON s.id = si.sale_id
+        LEFT JOIN stock st ON st.product_id = p.id
+        GROUP BY p.id
+        HAVING (MAX(s.sale_date) IS NULL OR MAX(s.sale_date) <= ?)"""
+    if count:
+        return _count_query(sql, (cutoff,))
+    return _paged_query(sql, (cutoff,), sort, _DEAD_STOCK_SORTS, "last_sold_date", "product_id", limit, offset)
+
+
+def get_dead_stock(days: int = 60, limit: int | None = None, sort: Optional[str] = None,
+                   offset: int = 0) -> List[Dict[str, Any]]:
+    """Return products that have not been sold in the last `days` days. Includes last_sold_date and stock remaining."""
+    return _fetch_all(*dead_stock_query(days, limit, sort, offset))
 
 
 # ============================================================================
@@ -1023,7 +2148,7 @@ def get_dead_stock(days: int = 60, limit: int | None = None) -> List[Dict[str, A
 
 def list_ledger_entries(product_id: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
     """List stock ledger entries"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         
         if product_id:
@@ -1043,6 +2168,38 @@ def list_ledger_entries(product_id: Optional[int] = None, limit: int = 100) -> L
         return [dict(row) for row in cursor.fetchall()]
 
 
+def ledger_export_query(product_id: Optional[int] = None, start_date: Optional[str] = None,
+                        end_date: Optional[str] = None) -> Tuple[str, tuple]:
+    """SQL and parameters for a full stock ledger export in (date, id) order."""
+    filters, params = _date_range_filters("l.transaction_date", start_date, end_date)
+    if product_id:
+        filters.insert(0, "l.product_id = ?")
+        params.insert(0, product_id)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    return f"""
+        SELECT l.id, l.product_id, p.name AS product_name, l.transaction_date, l.transaction_type,
+               l.quantity, l.balance_after, l.reference_type, l.reference_id, l.notes
+        FROM stock_ledger l
+        LEFT JOIN products p ON p.id = l.product_id
+        {where}
+        ORDER BY l.transaction_date, l.id
+    """, tuple(params)
+
+
+def list_ledger_page(product_id: Optional[int] = None, limit: int = 100, after: Optional[str] = None,
+                     before: Optional[str] = None, start_date: Optional[str] = None,
+                     end_date: Optional[str] = None, as_columns: bool = False) -> Dict[str, Any]:
+    """List stock ledger entries newest first, one keyset page at a time."""
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        filters, params = _date_range_filters("transaction_date", start_date, end_date)
+        if product_id:
+            filters.insert(0, "product_id = ?")
+            params.insert(0, product_id)
+        return _keyset_page(cursor, "stock_ledger", "transaction_date", filters, params, limit, after, before,
+                            as_columns)
+
+
 def get_current_balance(product_id: int) -> float:
     """Get current stock balance for product"""
     return get_stock(product_id)
@@ -1050,16 +2207,15 @@ def get_current_balance(product_id: int) -> float:
 
 def get_opening_stock(product_id: int, year: int, month: int) -> float:
     """Get opening stock for a month (first transaction or 0)"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         month_str = f"{year:04d}-{month:02d}"
         
         cursor.execute("""
-            SELECT 
-                COALESCE(SUM(quantity), 0) as opening_balance
-            FROM stock_ledger
+            SELECT balance_after FROM stock_ledger
             WHERE product_id = ? 
               AND transaction_date < ?
+            ORDER BY transaction_date DESC, id DESC LIMIT 1
         """, (product_id, month_str + "-01"))
         
         row = cursor.fetchone()
@@ -1068,18 +2224,17 @@ def get_opening_stock(product_id: int, year: int, month: int) -> float:
 
 def get_closing_stock(product_id: int, year: int, month: int) -> float:
     """Get closing stock for a month"""
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         month_str = f"{year:04d}-{month:02d}"
         next_month = month + 1 if month < 12 else 1
         next_year = year if month < 12 else year + 1
         
         cursor.execute("""
-            SELECT 
-                COALESCE(SUM(quantity), 0) as closing_balance
-            FROM stock_ledger
+            SELECT balance_after FROM stock_ledger
             WHERE product_id = ? 
               AND transaction_date < ?
+            ORDER BY transaction_date DESC, id DESC LIMIT 1
         """, (product_id, f"{next_year:04d}-{next_month:02d}-01"))
         
         row = cursor.fetchone()
@@ -1091,3 +2246,4 @@ if not os.path.exists(DB_PATH):
     init_db()
 else:
     logger.info(f"Using existing database at {DB_PATH}")
+    migrate_db()
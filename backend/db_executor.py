@@ -0,0 +1,135 @@
+"""
+Database Executor
+
+Runs the synchronous sqlite3 data-access functions on bounded thread pools so
+async endpoints can await them without blocking the event loop. Reads and
+writes use separate lanes: a slow report occupies a read worker but never
+delays order entry queued on the write lane.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+from database import DB_READ_POOL_SIZE
+from metrics import current_request
+
+# Write-lane threads mostly wait for the single writer to commit their job;
+# several in flight let the writer group-commit them together
+DB_WRITE_WORKERS = int(os.environ.get("DB_WRITE_WORKERS", "16"))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class DBExecutor:
+    """A bounded thread pool that tracks queue depth and queue wait time."""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._run_time_total = 0.0
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run `func(*args, **kwargs)` on this lane and await its result.
+
+        The caller's context variables are propagated to the worker thread,
+        and the time until the result is back, queue wait included, is added
+        to the current request's database time.
+        """
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, func, *args, **kwargs)
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+            self._submitted += 1
+
+        def task():
+            started = time.perf_counter()
+            waited = started - submitted
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._wait_time_total += waited
+                self._wait_time_max = max(self._wait_time_max, waited)
+            failed = False
+            try:
+                return call()
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+                    self._failed += failed
+                    self._run_time_total += time.perf_counter() - started
+
+        try:
+            return await loop.run_in_executor(self._pool, task)
+        finally:
+            request = current_request()
+            if request is not None:
+                request.db_time += time.perf_counter() - submitted
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of queue depth, throughput and wait times."""
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self._queued,
+                "active": self._active,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "wait_time_avg_ms": round(self._wait_time_total / completed * 1000, 3),
+                "wait_time_max_ms": round(self._wait_time_max * 1000, 3),
+                "run_time_avg_ms": round(self._run_time_total / completed * 1000, 3),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+# One worker per pooled connection so readers never wait on the pool itself
+read_executor = DBExecutor("db-read", DB_READ_POOL_SIZE)
+write_executor = DBExecutor("db-write", DB_WRITE_WORKERS)
+
+
+async def run_read(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a read-only database call on the read lane."""
+    return await read_executor.run(func, *args, **kwargs)
+
+
+async def run_write(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a mutating database call on the write lane."""
+    return await write_executor.run(func, *args, **kwargs)
+
+
+def get_executor_stats() -> Dict[str, Any]:
+    """Return statistics for both executor lanes."""
+    return {"read": read_executor.stats(), "write": write_executor.stats()}
+
+
+def shutdown_executors() -> None:
+    read_executor.shutdown()
+    write_executor.shutdown()
@@ -0,0 +1,126 @@
+"""
+SQLite Connection Pool
+
+Keeps a bounded set of long-lived sqlite3 connections so that PRAGMAs are
+applied once per connection and each connection's prepared statement cache
+stays warm between requests. Usage statistics (checkouts, waits, timeouts)
+are tracked so the pool can be tuned under load.
+"""
+
+import sqlite3
+import threading
+import time
+import logging
+from typing import Callable, Dict, Any, List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Raised when no pooled connection became available within the timeout."""
+
+
+class ConnectionPool:
+    """A bounded, thread-safe pool of sqlite3 connections.
+
+    Connections are created lazily by `connect` up to `size` and handed out
+    LIFO so the most recently used (warmest) connection is reused first.
+    """
+
+    def __init__(self, name: str, connect: Callable[[], sqlite3.Connection],
+                 size: int = 4, timeout: float = 30.0):
+        self.name = name
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._connect = connect
+        self._idle: List[sqlite3.Connection] = []
+        self._open = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Counters
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def acquire(self, timeout: float | None = None) -> sqlite3.Connection:
+        """Check out a connection, waiting up to `timeout` seconds for one to be released."""
+        timeout = self.timeout if timeout is None else timeout
+        with self._cond:
+            if self._closed:
+                raise sqlite3.ProgrammingError(f"Connection pool '{self.name}' is closed")
+
+            waited = 0.0
+            if not self._idle and self._open >= self.size:
+                started = time.perf_counter()
+                deadline = started + timeout
+                self._waits += 1
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {timeout}s waiting for a '{self.name}' connection"
+                        )
+                    self._cond.wait(remaining)
+                waited = time.perf_counter() - started
+                self._wait_time_total += waited
+                self._wait_time_max = max(self._wait_time_max, waited)
+
+            self._checkouts += 1
+            if self._idle:
+                return self._idle.pop()
+            # Reserve the slot before connecting outside of the lock
+            self._open += 1
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn: sqlite3.Connection, discard: bool = False) -> None:
+        """Return a connection to the pool, or close it if `discard` is set."""
+        with self._cond:
+            if discard or self._closed:
+                self._open -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Close all idle connections; checked-out ones are closed on release."""
+        with self._cond:
+            self._closed = True
+            for conn in self._idle:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                self._open -= 1
+            self._idle.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of pool size and usage counters."""
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "wait_time_total_ms": round(self._wait_time_total * 1000, 3),
+                "wait_time_max_ms": round(self._wait_time_max * 1000, 3),
+            }
@@ -0,0 +1,121 @@
+"""
+Conditional GET Support
+
+Adds strong ETags to list and report endpoints and answers a matching
+If-None-Match with 304 Not Modified before the endpoint runs, so an
+unchanged poll costs no query, no serialization and no body.
+
+An ETag is derived from the request path and query, the change versions of
+the tables the endpoint reads (database.get_table_versions), today's date
+(reports default their windows to "today") and a per-process boot id, since
+table versions restart from zero with the process. Table versions count this
+process's commits per table; a commit from anywhere else (another uvicorn
+worker, `python rollups.py rebuild`, generate_data.py) is noticed through
+PRAGMA data_version and changes every tag. A gzip-encoded body gets its own
+tag (suffix "-gzip") so it is never confused with the identity one.
+"""
+
+import hashlib
+import os
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from database import get_table_versions
+
+_SALES = ("sales", "sale_items", "daily_sales", "daily_product_sales", "products")
+_PURCHASES = ("purchases", "purchase_items", "daily_purchases", "daily_product_purchases", "products")
+
+# Exact request path -> tables whose changes alter the response
+ETAG_ROUTES: Dict[str, Tuple[str, ...]] = {
+    "/products/": ("products",),
+    "/stock/": ("stock", "products"),
+    "/stock/as-of": ("stock_ledger", "products"),
+    "/stock/alerts/low-stock": ("stock", "products"),
+    "/stock-ledger/": ("stock_ledger",),
+    "/stock-ledger/export": ("stock_ledger", "products"),
+    "/sales/": ("sales", "sale_items"),
+    "/purchases/": ("purchases", "purchase_items"),
+    "/reports/current-stock": ("stock_ledger", *_SALES, *_PURCHASES),
+    "/reports/low-stock": ("stock", "products"),
+    "/reports/monthly": ("stock_ledger", "products"),
+    "/reports/kpis": ("stock", *_SALES),
+    "/reports/sales/monthly-summary": _SALES,
+    "/reports/sales/yearly-summary": _SALES,
+    "/reports/sales/product-wise": _SALES,
+    "/reports/sales/top-selling": _SALES,
+    "/reports/sales/dead-stock": ("stock", *_SALES),
+    "/reports/purchases/monthly-summary": _PURCHASES,
+    "/reports/purchases/vendor-wise": _PURCHASES,
+    "/reports/purchases/price-variations": _PURCHASES,
+}
+
+_BOOT_ID = os.urandom(4).hex()
+
+
+def compute_etag(path: str, query: bytes, tables: Tuple[str, ...]) -> str:
+    versions = get_table_versions(tables)
+    digest = hashlib.blake2b(
+        b"%s?%s|%s|%s" % (path.encode(), query, repr(versions).encode(), date.today().isoformat().encode()),
+        digest_size=8,
+    ).hexdigest()
+    return f'"{_BOOT_ID}-{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison as required for If-None-Match (RFC 9110 13.1.2)."""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ConditionalGetMiddleware:
+    """ASGI middleware that tags GET responses and short-circuits 304s."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        tables = None
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            tables = ETAG_ROUTES.get(scope["path"])
+        if tables is None:
+            await self.app(scope, receive, send)
+            return
+
+        etag = compute_etag(scope["path"], scope.get("query_string", b""), tables)
+        gzip_etag = etag[:-1] + '-gzip"'
+
+        if_none_match = _header(scope, b"if-none-match")
+        if if_none_match is not None:
+            for candidate in (etag, gzip_etag):
+                if etag_matches(if_none_match, candidate):
+                    await send({"type": "http.response.start", "status": 304, "headers": _tag_headers(candidate)})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message = dict(message)
+                headers = list(message.get("headers", []))
+                gzipped = any(k.lower() == b"content-encoding" and v.lower() == b"gzip" for k, v in headers)
+                message["headers"] = headers + _tag_headers(gzip_etag if gzipped else etag)
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+def _tag_headers(etag: str):
+    return [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
@@ -0,0 +1,58 @@
+"""
+Fast JSON Responses
+
+FastAPI serializes a returned dict by first walking it with jsonable_encoder
+and then calling json.dumps, which is most of the CPU time of the large list
+and report responses. Endpoints that return plain rows from SQLite (strings,
+numbers and None only) can instead return a FastJSONResponse, which encodes
+the content in one pass with orjson when it is installed and falls back to
+the standard library otherwise.
+
+The "columns" layout goes one step further: rows stay as the tuples the
+cursor produced and are sent once with a column header, i.e.
+{"columns": ["id", "name"], "rows": [[1, "Rice"], [2, "Dal"]]}, so no
+per-row dict is ever built.
+"""
+
+import json
+from typing import Any, List, Sequence
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# Values of the `layout` query parameter
+LAYOUTS = ("objects", "columns")
+
+
+def _default(value: Any) -> Any:
+    # Anything SQLite cannot return (dates from Python code paths, Decimals...)
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Encode `content` as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that skips jsonable_encoder; content must be JSON-ready rows."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def check_layout(layout: str) -> None:
+    """Raise ValueError for an unknown `layout` query parameter."""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Invalid layout '{layout}', expected one of: {', '.join(LAYOUTS)}")
+
+
+def columns_payload(columns: Sequence[str], rows: List[tuple], **extra: Any) -> dict:
+    """Build a columns-layout body: {"columns": [...], "rows": [[...], ...], **extra}."""
+    return {"columns": list(columns), "rows": rows, **extra}
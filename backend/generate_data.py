@@ -0,0 +1,313 @@
+"""
+Synthetic Data Generator
+
+Writes a realistic, reproducible data set into a SQLite file with the schema
+from init_db(), for load tests, capacity planning and benchmarks:
+
+- products with purchase/sales prices and reorder points sized to demand
+- Zipf-like product popularity (product 1 sells most, then a long tail)
+- seasonal daily sales volume (weekday pattern, year-end peak, yearly growth)
+- repeat customers with skewed order frequency, one primary vendor per product
+- purchase orders raised whenever a product falls to its reorder point, so
+  stock never goes negative
+- matching stock_ledger rows with running balances, stock and rollup tables
+
+Days are generated in order and written in bulk (executemany, indexes
+rebuilt at the end), so ledger balances and rollups come out of the same
+pass without any re-aggregation. The same --seed and --end-date always
+produce the same data.
+
+Usage (from backend/):
+    python generate_data.py --db /tmp/load.db --products 5000 --sales 3000000 --years 3
+"""
+
+import argparse
+import logging
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import Any, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rows buffered before they are written
+FLUSH_ROWS = 200_000
+
+# Relative sales volume Monday..Sunday
+WEEKDAY_FACTORS = (0.9, 0.9, 0.95, 1.0, 1.15, 1.35, 0.75)
+# Seasonal swing around the yearly mean, peaking in late December
+SEASON_AMPLITUDE = 0.25
+SEASON_PEAK_DAY = 355
+# Year-over-year growth of sales volume
+YEARLY_GROWTH = 0.1
+
+# Units per sale line and their relative frequency
+LINE_QUANTITIES = (1, 2, 3, 4, 5, 6, 10, 12, 24)
+LINE_QUANTITY_WEIGHTS = (40, 22, 12, 8, 6, 4, 4, 2, 2)
+
+# Days a product waits for its vendor, and days of demand ordered per purchase
+LEAD_DAYS = (2, 7)
+ORDER_DAYS = 21
+
+_LOADED_TABLES = ("products", "stock", "purchases", "purchase_items", "sales", "sale_items", "stock_ledger",
+                  "daily_sales", "daily_product_sales", "daily_purchases", "daily_product_purchases")
+
+
+def _daily_sales_counts(rng: random.Random, start: date, days: int, sales: int) -> List[int]:
+    """Spread `sales` over `days` following the weekday, seasonal and growth pattern."""
+    weights = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        season = 1 + SEASON_AMPLITUDE * math.cos(2 * math.pi * (day.timetuple().tm_yday - SEASON_PEAK_DAY) / 365.25)
+        weights.append(season * WEEKDAY_FACTORS[day.weekday()] * (1 + YEARLY_GROWTH) ** (offset / 365.25))
+    scale = sales / sum(weights)
+    counts = []
+    for weight in weights:
+        expected = weight * scale
+        whole = int(expected)
+        counts.append(whole + (rng.random() < expected - whole))
+    return counts
+
+
+def generate(path: str, products: int = 2000, sales: int = 100_000, lines: int = 3, years: int = 2,
+             vendors: int = 50, customers: Optional[int] = None, zipf: float = 1.1, seed: int = 42,
+             end_date: Optional[date] = None) -> Dict[str, Any]:
+    """Fill the empty init_db() database at `path` and return row counts and timings.
+
+    `sales` is the number of sale invoices over `years` years ending on
+    `end_date` (default today) with on average `lines` lines each; purchase
+    orders follow from the restocking. The stock ledger ends up with roughly
+    sales * lines * 1.05 rows.
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    end = end_date or date.today()
+    days = years * 365
+    start = end - timedelta(days=days - 1)
+    customers = customers or max(100, sales // 10)
+
+    # --- Catalogue -----------------------------------------------------------
+    product_ids = list(range(1, products + 1))
+    popularity = [1 / rank ** zipf for rank in product_ids]
+    cum_popularity = list(accumulate(popularity))
+    total_popularity = cum_popularity[-1]
+    mean_quantity = sum(q * w for q, w in zip(LINE_QUANTITIES, LINE_QUANTITY_WEIGHTS)) / sum(LINE_QUANTITY_WEIGHTS)
+    units_per_day = sales / days * lines * mean_quantity
+
+    cost, price, reorder_point, order_quantity, vendor_of = {}, {}, {}, {}, {}
+    product_rows = []
+    for pid in product_ids:
+        cost[pid] = round(rng.lognormvariate(3, 0.8), 2)
+        price[pid] = round(cost[pid] * rng.uniform(1.15, 1.6), 2)
+        demand = units_per_day * popularity[pid - 1] / total_popularity
+        reorder_point[pid] = max(2, math.ceil(demand * rng.randint(*LEAD_DAYS)))
+        order_quantity[pid] = max(5, math.ceil(demand * ORDER_DAYS)) + reorder_point[pid]
+        vendor_of[pid] = rng.randrange(vendors)
+        product_rows.append((pid, f"Product {pid:05d}", rng.choice(("1kg", "500g", "1L", "2pack", "1pc")),
+                             cost[pid], price[pid], reorder_point[pid]))
+    vendor_names = [f"Vendor {v:03d}" for v in range(vendors)]
+    customer_names = [f"Customer {c:06d}" for c in range(customers)]
+    cum_customers = list(accumulate(1 / rank ** 0.8 for rank in range(1, customers + 1)))
+    counts = _daily_sales_counts(rng, start, days, sales)
+
+    conn = sqlite3.connect(path)
+    # A crash mid-run only loses a throw-away file
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    for table in _LOADED_TABLES:
+        if conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+            conn.close()
+            raise ValueError(f"{path} already contains {table}; generate into a fresh database")
+    # Secondary indexes are rebuilt once at the end instead of per row
+    indexes = conn.execute(f"""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({", ".join("?" * len(_LOADED_TABLES))})
+    """, _LOADED_TABLES).fetchall()
+    for name, _ in indexes:
+        conn.execute(f"DROP INDEX {name}")
+
+    conn.executemany("""
+        INSERT INTO products (id, name, quantity_with_unit, purchase_unit_price, sales_unit_price, reorder_point)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, product_rows)
+
+    buffers: Dict[str, List[tuple]] = {name: [] for name in (
+        "purchases", "purchase_items", "sales", "sale_items", "stock_ledger",
+        "daily_purchases", "daily_product_purchases", "daily_sales", "daily_product_sales")}
+    statements = {
+        "purchases": "INSERT INTO purchases (id, vendor_name, invoice_number, purchase_date, total_amount) VALUES (?, ?, ?, ?, ?)",
+        "purchase_items": "INSERT INTO purchase_items (purchase_id, product_id, product_name, quantity, unit_price, total_price) VALUES (?, ?, ?, ?, ?, ?)",
+        "sales": "INSERT INTO sales (id, customer_name, invoice_number, sale_date, total_amount) VALUES (?, ?, ?, ?, ?)",
+        "sale_items": "INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price, total_price) VALUES (?, ?, ?, ?, ?, ?)",
+        "stock_ledger": "INSERT INTO stock_ledger (product_id, transaction_type, quantity, reference_id, reference_type, notes, transaction_date, balance_after) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        "daily_purchases": "INSERT INTO daily_purchases (day, amount, quantity, invoice_count) VALUES (?, ?, ?, ?)",
+        "daily_product_purchases": "INSERT INTO daily_product_purchases (day, product_id, quantity, amount, line_count) VALUES (?, ?, ?, ?, ?)",
+        "daily_sales": "INSERT INTO daily_sales (day, amount, quantity, invoice_count) VALUES (?, ?, ?, ?)",
+        "daily_product_sales": "INSERT INTO daily_product_sales (day, product_id, quantity, amount, line_count) VALUES (?, ?, ?, ?, ?)",
+    }
+    totals = {name: 0 for name in buffers}
+
+    def flush() -> None:
+        for name, rows in buffers.items():
+            if rows:
+                conn.executemany(statements[name], rows)
+                totals[name] += len(rows)
+                rows.clear()
+        # Committing per flush lets WAL checkpoints keep the -wal file small
+        conn.commit()
+
+    names = {pid: row[1] for pid, row in zip(product_ids, product_rows)}
+    stock = dict.fromkeys(product_ids, 0)
+    to_reorder = set(product_ids)  # opening stock is bought on the first day
+    purchase_id = sale_id = 0
+    purchase_items, sale_items, ledger = buffers["purchase_items"], buffers["sale_items"], buffers["stock_ledger"]
+    choices, randint, random_ = rng.choices, rng.randint, rng.random
+
+    for offset, sale_count in enumerate(counts):
+        day = (start + timedelta(days=offset)).isoformat()
+
+        # Restock everything that reached its reorder point yesterday, one order per vendor
+        by_vendor: Dict[int, List[int]] = {}
+        for pid in sorted(to_reorder):
+            by_vendor.setdefault(vendor_of[pid], []).append(pid)
+        to_reorder.clear()
+        day_amount = day_quantity = 0.0
+        for vendor, pids in sorted(by_vendor.items()):
+            purchase_id += 1
+            invoice = f"PO{purchase_id:07d}"
+            total = 0.0
+            for pid in pids:
+                quantity = order_quantity[pid]
+                unit_price = round(cost[pid] * rng.uniform(0.95, 1.05), 2)
+                line_total = quantity * unit_price
+                total += line_total
+                stock[pid] += quantity
+                purchase_items.append((purchase_id, pid, names[pid], quantity, unit_price, line_total))
+                ledger.append((pid, "purchase", quantity, str(purchase_id), "purchase", f"Purchase {invoice}",
+                               day, stock[pid]))
+                buffers["daily_product_purchases"].append((day, pid, quantity, line_total, 1))
+                day_quantity += quantity
+            buffers["purchases"].append((purchase_id, vendor_names[vendor], invoice, day, total))
+            day_amount += total
+        if by_vendor:
+            buffers["daily_purchases"].append((day, day_amount, day_quantity, len(by_vendor)))
+
+        # Sales, drawn in bulk for the whole day
+        line_counts = [randint(1, 2 * lines - 1) for _ in range(sale_count)]
+        picks = choices(product_ids, cum_weights=cum_popularity, k=sum(line_counts))
+        quantities = choices(LINE_QUANTITIES, weights=LINE_QUANTITY_WEIGHTS, k=len(picks))
+        buyers = choices(customer_names, cum_weights=cum_customers, k=sale_count)
+        per_product: Dict[int, List[float]] = {}
+        day_amount = day_quantity = 0.0
+        day_invoices = 0
+        position = 0
+        for buyer, line_count in zip(buyers, line_counts):
+            first_line = position
+            position += line_count
+            sold = []
+            for pid, quantity in zip(picks[first_line:position], quantities[first_line:position]):
+                quantity = min(quantity, stock[pid])
+                if quantity > 0:
+                    stock[pid] -= quantity
+                    sold.append((pid, quantity, stock[pid]))
+            if not sold:
+                continue
+            sale_id += 1
+            invoice = f"S{sale_id:08d}"
+            total = 0.0
+            for pid, quantity, balance in sold:
+                # Occasional discounts make price-variation figures non-trivial
+                unit_price = price[pid] if random_() > 0.1 else round(price[pid] * 0.9, 2)
+                line_total = quantity * unit_price
+                total += line_total
+                sale_items.append((sale_id, pid, names[pid], quantity, unit_price, line_total))
+                ledger.append((pid, "sale", -quantity, str(sale_id), "sale", f"Sale {invoice}", day, balance))
+                entry = per_product.get(pid)
+                if entry is None:
+                    per_product[pid] = [quantity, line_total, 1]
+                else:
+                    entry[0] += quantity
+                    entry[1] += line_total
+                    entry[2] += 1
+                day_quantity += quantity
+                if balance <= reorder_point[pid]:
+                    to_reorder.add(pid)
+            buffers["sales"].append((sale_id, buyer, invoice, day, total))
+            day_amount += total
+            day_invoices += 1
+        if day_invoices:
+            buffers["daily_sales"].append((day, day_amount, day_quantity, day_invoices))
+            buffers["daily_product_sales"].extend((day, pid, q, a, n) for pid, (q, a, n) in per_product.items())
+
+        if len(ledger) >= FLUSH_ROWS:
+            flush()
+    flush()
+
+    conn.executemany("INSERT INTO stock (product_id, available_stock) VALUES (?, ?)", list(stock.items()))
+    conn.commit()
+    generated = time.perf_counter() - started
+
+    for _, sql in indexes:
+        conn.execute(sql)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+    summary = {
+        "products": products,
+        "purchases": totals["purchases"],
+        "purchase_items": totals["purchase_items"],
+        "sales": totals["sales"],
+        "sale_items": totals["sale_items"],
+        "stock_ledger": totals["stock_ledger"],
+        "first_day": start.isoformat(),
+        "last_day": end.isoformat(),
+        "generate_s": round(generated, 1),
+        "total_s": round(time.perf_counter() - started, 1),
+    }
+    logger.info(f"Generated {summary}")
+    return summary
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="SQLite file to create")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--sales", type=int, default=100_000, help="number of sale invoices")
+    parser.add_argument("--lines", type=int, default=3, help="average lines per sale")
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--vendors", type=int, default=50)
+    parser.add_argument("--customers", type=int, help="default: sales / 10")
+    parser.add_argument("--zipf", type=float, default=1.1, help="popularity skew; higher is more concentrated")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", type=date.fromisoformat, help="last generated day (default today)")
+    parser.add_argument("--force", action="store_true", help="replace the file if it exists")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        if not args.force:
+            parser.error(f"{args.db} exists; pass --force to replace it")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+
+    # Importing database creates the schema in ENTERPRISE_DB_PATH
+    os.environ["ENTERPRISE_DB_PATH"] = args.db
+    import database
+    database.close_db_pools()
+
+    generate(args.db, products=args.products, sales=args.sales, lines=args.lines, years=args.years,
+             vendors=args.vendors, customers=args.customers, zipf=args.zipf, seed=args.seed,
+             end_date=args.end_date)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
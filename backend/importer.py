@@ -0,0 +1,346 @@
+"""
+Bulk CSV Import
+
+Loads products, purchases or sales from a CSV file. Rows are read one at a
+time, validated with the same models as the create endpoints and written
+IMPORT_CHUNK_ROWS rows at a time, each chunk as one transaction through
+database.import_products / database.import_documents. Rows that fail
+validation are skipped and listed in the returned report; everything else
+is imported.
+
+Columns (header row required, extra columns are ignored):
+    products:  name, quantity_with_unit, purchase_unit_price, sales_unit_price[, reorder_point]
+    purchases: invoice_number, vendor_name, purchase_date, product_id or product_name, quantity
+               [, unit_price, notes]
+    sales:     invoice_number, customer_name, sale_date, product_id or product_name, quantity
+               [, unit_price, notes]
+
+Purchases and sales have one row per invoice line. The lines of an invoice
+must be on consecutive rows and its header fields are taken from the first
+line; an invoice is imported whole or not at all. Invoice numbers and
+product names that already exist are rejected, so an import that partly
+failed can be re-run with the same file.
+"""
+
+import csv
+import io
+import logging
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from database import get_invoice_numbers, import_documents, import_products, refresh_ledger_balances
+from models import ProductCreate, PurchaseCreate, SaleCreate
+from product_cache import catalog
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# CSV rows validated and written per transaction
+IMPORT_CHUNK_ROWS = int(os.environ.get("IMPORT_CHUNK_ROWS", "5000"))
+# Row errors listed in the report; the counts always cover every row
+MAX_REPORTED_ERRORS = 1000
+
+# entity -> (document kind, party column, date column, model, default price field)
+_DOCUMENTS = {
+    "purchases": ("purchase", "vendor_name", "purchase_date", PurchaseCreate, "purchase_unit_price"),
+    "sales": ("sale", "customer_name", "sale_date", SaleCreate, "sales_unit_price"),
+}
+ENTITIES = ("products", *_DOCUMENTS)
+
+_PRODUCT_COLUMNS = ("name", "quantity_with_unit", "purchase_unit_price", "sales_unit_price")
+
+
+class ImportReport:
+    """Counts and the (capped) list of row errors of one import."""
+
+    def __init__(self, entity: str):
+        self.entity = entity
+        self.rows = 0
+        self.imported = 0
+        self.imported_rows = 0
+        self.failed_rows = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.errors_truncated = False
+        self._started = time.perf_counter()
+
+    def error(self, line: int, message: str, failed_rows: int = 1, **context: Any) -> None:
+        self.failed_rows += failed_rows
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, **context, "error": message})
+        else:
+            self.errors_truncated = True
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "entity": self.entity,
+            "rows": self.rows,
+            "imported": self.imported,
+            "imported_rows": self.imported_rows,
+            "failed_rows": self.failed_rows,
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+            "errors_truncated": self.errors_truncated,
+            "duration_s": round(time.perf_counter() - self._started, 2),
+        }
+
+
+class _ChunkWriter:
+    """Writes one chunk in the background while the next one is parsed.
+
+    At most one chunk is in flight; `done(result, error)` runs on the
+    parsing thread when the chunk has been written or has failed.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="import-writer")
+        self._in_flight: Optional[Tuple[Future, Callable[[Any, Optional[Exception]], None]]] = None
+
+    def submit(self, done: Callable[[Any, Optional[Exception]], None], func: Callable[..., Any],
+               *args: Any, **kwargs: Any) -> None:
+        self.wait()
+        self._in_flight = (self._executor.submit(func, *args, **kwargs), done)
+
+    def wait(self) -> None:
+        if self._in_flight is None:
+            return
+        future, done = self._in_flight
+        self._in_flight = None
+        try:
+            result = future.result()
+        except Exception as e:
+            done(None, e)
+        else:
+            done(result, None)
+
+    def close(self) -> None:
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown()
+
+
+def _clean(row: Dict[Optional[str], Any]) -> Dict[str, Optional[str]]:
+    """Strip values, turn blanks into None and drop overflow fields (key None)."""
+    return {key.strip(): (value.strip() or None) if isinstance(value, str) else None
+            for key, value in row.items() if key is not None}
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in exc.errors())
+
+
+def _require_columns(fieldnames: Optional[List[str]], required: Tuple[str, ...]) -> None:
+    present = {name.strip() for name in fieldnames or []}
+    missing = [column for column in required if column not in present]
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+
+
+def import_csv(entity: str, stream: BinaryIO) -> Dict[str, Any]:
+    """Import an uploaded CSV (binary file object) and return the import report.
+
+    Raises ValueError for an unknown entity or a header without the
+    required columns; problems with individual rows only go to the report.
+    """
+    if entity not in ENTITIES:
+        raise ValueError(f"Unknown import entity '{entity}', expected one of: {', '.join(ENTITIES)}")
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    report = ImportReport(entity)
+    if entity == "products":
+        _import_products(reader, report)
+    else:
+        _import_documents(entity, reader, report)
+    logger.info(f"Imported {report.imported} {entity} from {report.rows} rows "
+                f"({report.failed_rows} rejected)")
+    return report.as_dict()
+
+
+def _import_products(reader: csv.DictReader, report: ImportReport) -> None:
+    _require_columns(reader.fieldnames, _PRODUCT_COLUMNS)
+    names = {product["name"] for product in catalog.list()}
+    writer = _ChunkWriter()
+    pending: List[Dict[str, Any]] = []
+    pending_lines: List[int] = []
+
+    def flush():
+        chunk, lines = list(pending), list(pending_lines)
+
+        def done(imported, error):
+            if error is not None:
+                logger.error(f"Product import chunk failed: {error}")
+                for line in lines:
+                    report.error(line, f"Write failed: {error}")
+            else:
+                report.imported += imported
+                report.imported_rows += len(chunk)
+
+        writer.submit(done, import_products, chunk)
+        pending.clear()
+        pending_lines.clear()
+
+    try:
+        for row in reader:
+            report.rows += 1
+            line = reader.line_num
+            try:
+                product = ProductCreate(**_clean(row))
+            except ValidationError as e:
+                report.error(line, _describe(e))
+                continue
+            if product.name in names:
+                report.error(line, f"Product '{product.name}' already exists")
+                continue
+            names.add(product.name)
+            pending.append(product.model_dump())
+            pending_lines.append(line)
+            if len(pending) >= IMPORT_CHUNK_ROWS:
+                flush()
+        if pending:
+            flush()
+    finally:
+        writer.close()
+
+
+def _import_documents(entity: str, reader: csv.DictReader, report: ImportReport) -> None:
+    kind, party_column, date_column, model, price_field = _DOCUMENTS[entity]
+    _require_columns(reader.fieldnames, ("invoice_number", party_column, date_column, "quantity"))
+    if not {"product_id", "product_name"} & {name.strip() for name in reader.fieldnames}:
+        raise ValueError("CSV needs a product_id or a product_name column")
+
+    products = catalog.list()
+    by_id = {product["id"]: product for product in products}
+    by_name: Dict[str, Dict[str, Any]] = {}
+    for product in products:
+        by_name.setdefault(product["name"], product)
+    existing = get_invoice_numbers(kind)
+    seen = set()
+    touched_products = set()
+
+    writer = _ChunkWriter()
+    pending: List[Dict[str, Any]] = []
+    pending_lines: List[Tuple[int, int]] = []  # (first line, line count) per pending invoice
+    pending_rows = 0
+
+    def flush():
+        nonlocal pending_rows
+        chunk, lines, rows = list(pending), list(pending_lines), pending_rows
+
+        def done(_, error):
+            if error is not None:
+                logger.error(f"{entity.capitalize()} import chunk failed: {error}")
+                for document, (line, count) in zip(chunk, lines):
+                    report.error(line, f"Write failed: {error}", count, invoice_number=document["invoice_number"])
+            else:
+                touched_products.update(item["product_id"] for document in chunk for item in document["items"])
+                report.imported += len(chunk)
+                report.imported_rows += rows
+
+        # Ledger balances are recomputed once for the whole file below
+        writer.submit(done, import_documents, kind, chunk, refresh_balances=False)
+        pending.clear()
+        pending_lines.clear()
+        pending_rows = 0
+
+    def resolve(row: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        """Catalog product for one line, or raise ValueError."""
+        if row.get("product_id"):
+            try:
+                product = by_id.get(int(row["product_id"]))
+            except ValueError:
+                raise ValueError(f"Invalid product_id '{row['product_id']}'")
+            if product is None:
+                raise ValueError(f"Product {row['product_id']} not found")
+            return product
+        if row.get("product_name"):
+            product = by_name.get(row["product_name"])
+            if product is None:
+                raise ValueError(f"Product '{row['product_name']}' not found")
+            return product
+        raise ValueError("product_id or product_name is required")
+
+    def finish(invoice_number: str, lines: List[Tuple[int, Dict[str, Optional[str]]]]) -> None:
+        nonlocal pending_rows
+        first_line, first = lines[0]
+        if invoice_number in existing:
+            report.error(first_line, f"Invoice {invoice_number} already exists", len(lines),
+                         invoice_number=invoice_number)
+            return
+        if invoice_number in seen:
+            report.error(first_line, f"Invoice {invoice_number} appears more than once; "
+                         "its lines must be on consecutive rows", len(lines), invoice_number=invoice_number)
+            return
+        seen.add(invoice_number)
+
+        line_errors, items, resolved = [], [], []
+        for line, row in lines:
+            try:
+                product = resolve(row)
+            except ValueError as e:
+                line_errors.append((line, str(e)))
+                continue
+            resolved.append(product)
+            items.append({"product_id": product["id"], "quantity": row.get("quantity"),
+                          "unit_price": row.get("unit_price")})
+        if not line_errors:
+            try:
+                document = model(**{party_column: first.get(party_column), "invoice_number": invoice_number,
+                                    date_column: first.get(date_column), "notes": first.get("notes"),
+                                    "items": items})
+            except ValidationError as e:
+                for err in e.errors():
+                    loc = err["loc"]
+                    line = lines[loc[1]][0] if loc[0] == "items" and len(loc) > 1 else first_line
+                    line_errors.append((line, f"{'.'.join(str(part) for part in loc)}: {err['msg']}"))
+            else:
+                for (line, _), item in zip(lines, document.items):
+                    if item.quantity <= 0:
+                        line_errors.append((line, "quantity must be positive"))
+        if line_errors:
+            # The whole invoice is rejected; its error lines carry the reasons
+            for line, message in line_errors:
+                report.error(line, message, 0, invoice_number=invoice_number)
+            report.failed_rows += len(lines)
+            return
+
+        pending.append({
+            party_column: getattr(document, party_column),
+            "invoice_number": invoice_number,
+            date_column: getattr(document, date_column).isoformat(),
+            "notes": document.notes,
+            "items": [
+                {"product_id": product["id"], "product_name": product["name"], "quantity": item.quantity,
+                 "unit_price": item.unit_price if item.unit_price else product.get(price_field, 0)}
+                for item, product in zip(document.items, resolved)
+            ],
+        })
+        pending_lines.append((first_line, len(lines)))
+        pending_rows += len(lines)
+        if pending_rows >= IMPORT_CHUNK_ROWS:
+            flush()
+
+    current_number: Optional[str] = None
+    current_lines: List[Tuple[int, Dict[str, Optional[str]]]] = []
+    try:
+        for row in reader:
+            report.rows += 1
+            line, row = reader.line_num, _clean(row)
+            invoice_number = row.get("invoice_number")
+            if not invoice_number:
+                report.error(line, "invoice_number is required")
+                continue
+            if invoice_number != current_number and current_lines:
+                finish(current_number, current_lines)
+                current_lines = []
+            current_number = invoice_number
+            current_lines.append((line, row))
+        if current_lines:
+            finish(current_number, current_lines)
+        if pending:
+            flush()
+    finally:
+        writer.close()
+        # Also after a failure part-way through: earlier chunks are committed
+        refresh_ledger_balances(sorted(touched_products))
@@ -0,0 +1,215 @@
+"""
+Incremental KPI Engine
+
+Keeps the dashboard KPIs (GET /reports/kpis) in memory and up to date from
+the events write jobs publish on commit, instead of recomputing them with
+database queries on every request:
+
+- "document" events (a sale's signed contribution per day and product)
+  adjust the daily sales amounts and this month's quantity per product
+- "stock" events adjust the stock of the affected products and their place
+  in the low-stock set
+- "products" and "rollups" events mark the product or sales figures stale
+
+State is loaded with database.load_kpi_state(), which runs on the writer and
+publishes its snapshot in the same event stream, so events committed after
+the snapshot are applied on top of it and none are missed or counted twice.
+Stale parts are reloaded on the next request; so are the sales figures when
+the month rolls over (a new day within the month needs no reload, the daily
+amounts of both months are kept). Like the product catalog, the engine only
+sees writes made through this process.
+"""
+
+import logging
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from database import KPI_STATE_PARTS, add_event_listener, get_kpis, load_kpi_state
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _change_pct(value: float, previous: float) -> Optional[float]:
+    return (value - previous) / previous * 100 if previous != 0 else None
+
+
+class KPIEngine:
+    """Process-local, event-maintained dashboard KPIs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stale: Set[str] = set(KPI_STATE_PARTS)
+        self._month: Optional[str] = None
+        self._prev_month: Optional[str] = None
+        # day -> [amount, invoice count] for the previous and current month
+        self._days: Dict[str, List[float]] = {}
+        # product_id -> [quantity, line count] this month, and the best seller among them
+        self._month_products: Dict[int, List[float]] = {}
+        self._best: Optional[int] = None
+        # product_id -> [name, reorder_point, available_stock], and the ids below their reorder point
+        self._products: Dict[int, List[Any]] = {}
+        self._low: Set[int] = set()
+        self._events = 0
+        self._hits = 0
+        self._loads = 0
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def peek(self, today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        """The KPIs in get_kpis() format, or None if part of the state must be reloaded first."""
+        today = today or date.today()
+        with self._lock:
+            if self._month != today.strftime("%Y-%m"):
+                self._stale.add("sales")
+            if self._stale:
+                return None
+            self._hits += 1
+            return self._kpis(today)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The KPIs, reloading stale state first. Blocks on the writer; call it off the event loop."""
+        today = date.today()
+        kpis = self.peek(today)
+        if kpis is not None:
+            return kpis
+        with self._lock:
+            parts = tuple(part for part in KPI_STATE_PARTS if part in self._stale)
+            self._loads += 1
+        load_kpi_state(today, parts)
+        kpis = self.peek(today)
+        if kpis is None:
+            # Made stale again by a write committed right after the load
+            return get_kpis()
+        return kpis
+
+    def _kpis(self, today: date) -> Dict[str, Any]:
+        day = today.isoformat()
+        yesterday = date.fromordinal(today.toordinal() - 1).isoformat()
+        todays_sales = float(self._days.get(day, (0,))[0])
+        yest_sales = float(self._days.get(yesterday, (0,))[0])
+        month_revenue = prev_month_revenue = 0.0
+        for key in sorted(self._days):
+            if key.startswith(self._month):
+                month_revenue += self._days[key][0]
+            elif key.startswith(self._prev_month):
+                prev_month_revenue += self._days[key][0]
+        best = self._products.get(self._best) if self._best is not None else None
+        return {
+            'todays_sales': {'value': todays_sales, 'change_pct': _change_pct(todays_sales, yest_sales)},
+            'month_revenue': {'value': month_revenue, 'change_pct': _change_pct(month_revenue, prev_month_revenue)},
+            'low_stock_count': {'value': len(self._low)},
+            'best_selling_product': best[0] if best else None,
+            'profit_today': {'value': None, 'change_pct': None}
+        }
+
+    # ------------------------------------------------------------------
+    # Event handling (writer thread)
+    # ------------------------------------------------------------------
+
+    def on_events(self, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        with self._lock:
+            for event_type, data in events:
+                self._events += 1
+                if event_type == "document":
+                    if data["kind"] == "sale" and "sales" not in self._stale:
+                        self._apply_sale(data)
+                elif event_type == "stock":
+                    if "products" not in self._stale:
+                        self._apply_stock(data["balances"])
+                elif event_type == "products":
+                    self._stale.add("products")
+                elif event_type == "rollups":
+                    self._stale.add("sales")
+                elif event_type == "kpi_state":
+                    self._load(data)
+
+    def _load(self, state: Dict[str, Any]) -> None:
+        if "sales" in state["parts"]:
+            self._month, self._prev_month = state["month"], state["prev_month"]
+            self._days = state["days"]
+            self._month_products = state["month_products"]
+            self._best = None
+            self._find_best()
+            self._stale.discard("sales")
+        if "products" in state["parts"]:
+            self._products = state["products"]
+            self._low = {pid for pid, product in self._products.items() if self._is_low(product)}
+            self._stale.discard("products")
+
+    def _apply_sale(self, contribution: Dict[str, Any]) -> None:
+        day = contribution["day"]
+        month = day[:7]
+        if month != self._month and month != self._prev_month:
+            return
+        totals = self._days.get(day)
+        if totals is None:
+            totals = self._days[day] = [0, 0]
+        totals[0] += contribution["amount"]
+        totals[1] += contribution["invoices"]
+        if totals[1] <= 0:
+            # Same as the rollup: the row goes when its last invoice does
+            del self._days[day]
+        if month != self._month:
+            return
+        for product_id, quantity, _, count in contribution["lines"]:
+            totals = self._month_products.get(product_id)
+            if totals is None:
+                totals = self._month_products[product_id] = [0, 0]
+            totals[0] += quantity
+            totals[1] += count
+            if totals[1] <= 0:
+                del self._month_products[product_id]
+            if product_id == self._best and (quantity < 0 or totals[1] <= 0):
+                # The best seller lost ground; only now is a full pass needed
+                self._best = None
+                self._find_best()
+            elif totals[1] > 0 and self._ranks_above(product_id, self._best):
+                self._best = product_id
+
+    def _ranks_above(self, product_id: int, other: Optional[int]) -> bool:
+        # Higher quantity first, then lower product id (get_kpis' ORDER BY qty DESC, product_id)
+        if other is None:
+            return True
+        quantity, other_quantity = self._month_products[product_id][0], self._month_products[other][0]
+        return quantity > other_quantity or (quantity == other_quantity and product_id < other)
+
+    def _find_best(self) -> None:
+        for product_id in self._month_products:
+            if self._ranks_above(product_id, self._best):
+                self._best = product_id
+
+    def _apply_stock(self, balances: Dict[int, float]) -> None:
+        for product_id, balance in balances.items():
+            product = self._products.get(product_id)
+            if product is None:
+                continue
+            product[2] = balance
+            if self._is_low(product):
+                self._low.add(product_id)
+            else:
+                self._low.discard(product_id)
+
+    @staticmethod
+    def _is_low(product: List[Any]) -> bool:
+        reorder_point, stock = product[1], product[2]
+        return reorder_point is not None and (stock is None or stock < reorder_point)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stale": sorted(self._stale),
+                "month": self._month,
+                "products": len(self._products),
+                "low_stock": len(self._low),
+                "events": self._events,
+                "hits": self._hits,
+                "loads": self._loads,
+            }
+
+
+kpi_engine = KPIEngine()
+add_event_listener(kpi_engine.on_events)
@@ -1,14 +1,33 @@
 
-from fastapi import FastAPI, HTTPException, Form
+from fastapi import FastAPI, HTTPException, Form, Query, Request, UploadFile, File
 from sheets import append_employee, update_employee, delete_employee, find_employee_row, list_employees
-from products import append_product, update_product, delete_product, find_product_row, list_products
-from purchases import create_purchase, list_purchases, update_purchase, delete_purchase, find_purchase_row
-from sales import create_sale, list_sales, delete_sale, find_sale_row, update_sale as svc_update_sale
-from stock import get_stock, list_all_stock, get_low_stock_alerts
+from products import append_product, update_product, delete_product, find_product_row, list_products, get_product as get_cached_product, get_products
+from product_cache import catalog
+from kpi_engine import kpi_engine
+from stock_events import broadcaster as stock_broadcaster
+from purchases import create_purchase, create_purchases_batch, list_purchases, update_purchase, delete_purchase, find_purchase_row
+from sales import create_sale, create_sales_batch, list_sales, delete_sale, find_sale_row, update_sale as svc_update_sale
+from stock import get_stock, list_all_stock, get_low_stock_alerts, get_stock_as_of
 from stock_ledger import get_current_balance, get_opening_stock, get_closing_stock, list_ledger_entries
-from database import get_kpis, get_current_stock_report, get_monthly_opening_closing, get_monthly_sales_summary, get_yearly_sales_summary, get_product_wise_sales, get_top_selling_products, get_dead_stock, get_monthly_purchase_summary, get_vendor_wise_purchases, get_price_variation_per_product, get_sale_by_id, get_product_by_id
+from database import get_current_stock_report, get_monthly_opening_closing, get_monthly_sales_summary, get_yearly_sales_summary, get_product_wise_sales, get_top_selling_products, get_dead_stock, get_monthly_purchase_summary, get_vendor_wise_purchases, get_price_variation_per_product, get_sale_by_id, get_pool_stats, close_db_pools, get_low_stock_alerts as db_get_low_stock_alerts, count_report_rows, fetch_report_columns, list_sales_page, list_purchases_page, list_ledger_page
+from database import (
+    current_stock_report_query, low_stock_alerts_query, monthly_opening_closing_query, monthly_sales_summary_query,
+    yearly_sales_summary_query, product_wise_sales_query, top_selling_products_query, dead_stock_query,
+    monthly_purchase_summary_query, vendor_wise_purchases_query, price_variation_per_product_query, ledger_export_query,
+    add_statement_hook,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from models import EmployeeUpdate, ProductCreate, ProductUpdate, PurchaseCreate, SaleCreate
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from db_executor import run_read, run_write, get_executor_stats, shutdown_executors
+from report_cache import cached_report, report_cache
+from etags import ConditionalGetMiddleware
+from metrics import MetricsMiddleware, count_statement, registry as metrics_registry
+from sql_profiler import profiler as sql_profiler
+from csv_stream import csv_response
+from fast_json import FastJSONResponse, check_layout, columns_payload
+from importer import import_csv, ENTITIES as IMPORT_ENTITIES
+from models import EmployeeUpdate, ProductCreate, ProductUpdate, PurchaseCreate, SaleCreate, PurchaseBatchCreate, SaleBatchCreate
+from pydantic import ValidationError
 import logging
 
 # Timesheet helpers
@@ -25,12 +44,23 @@ except Exception as e:
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
+# Added before CORS so 304 responses still pass through the CORS middleware
+app.add_middleware(ConditionalGetMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["*"],
 )
+# Added last so it is outermost and times everything, including 304s and CORS preflights
+app.add_middleware(MetricsMiddleware)
+add_statement_hook(count_statement)
+
+
+@app.on_event("shutdown")
+async def close_database_connections():
+    shutdown_executors()
+    close_db_pools()
 
 
 @app.post("/employees/")
@@ -53,10 +83,10 @@ async def create_employee(
     }
 
     # Duplicate email check
-    if find_employee_row(email):
+    if await run_read(find_employee_row, email):
         raise HTTPException(400, "Employee already exists")
 
-    row_no = append_employee(data)
+    row_no = await run_write(append_employee, data)
     if not row_no:
         raise HTTPException(500, "Could not append to sheet")
 
@@ -75,12 +105,12 @@ async def create_employee(
 @app.put("/employees/{email}")
 async def edit_employee(email: str, payload: EmployeeUpdate):
     # Find the existing row
-    row = find_employee_row(email)
+    row = await run_read(find_employee_row, email)
     if not row:
         raise HTTPException(404, "Employee not found")
 
     # Update row in Sheets
-    update_employee(email, payload.dict(exclude_none=True))
+    await run_write(update_employee, email, payload.dict(exclude_none=True))
 
     return {"status": "updated", "row": row}
 
@@ -94,7 +124,7 @@ async def edit_employee(email: str, payload: EmployeeUpdate):
 @app.get("/employees/{email}")
 async def get_employee(email: str):
     """Return a single employee record looked-up by email (case-insensitive)."""
-    employees = list_employees()
+    employees = await run_read(list_employees)
     match = next((e for e in employees if e["email"].lower() == email.lower()), None)
     if not match:
         raise HTTPException(404, "Employee not found")
@@ -108,12 +138,12 @@ async def get_employee(email: str):
 
 @app.delete("/employees/{email}")
 async def remove_employee(email: str):
-    row = find_employee_row(email)
+    row = await run_read(find_employee_row, email)
     if not row:
         raise HTTPException(404, "Employee not found")
 
     # Delete row in Sheets
-    result = delete_employee(email)
+    result = await run_write(delete_employee, email)
 
     return {"status": "deleted", "row": result["row"]}
 
@@ -124,7 +154,7 @@ async def remove_employee(email: str):
 
 @app.get("/employees/")
 async def list_all_employees():
-    return list_employees()
+    return await run_read(list_employees)
 
 
 
@@ -160,7 +190,7 @@ async def create_product(payload: ProductCreate):
     }
 
     try:
-        result = append_product(data)
+        result = await run_write(append_product, data)
         if not result:
             raise HTTPException(500, "Could not create product")
 
@@ -181,9 +211,21 @@ async def create_product(payload: ProductCreate):
 
 
 @app.get("/sales/")
-async def list_sales_endpoint():
+async def list_sales_endpoint(limit: int | None = None, after: str | None = None, before: str | None = None,
+                              start_date: str | None = None, end_date: str | None = None):
+    """List sales with their items.
+
+    Without paging parameters the full history is returned as a list. Passing
+    any of limit/after/before/start_date/end_date returns one keyset page:
+    {"items": [...], "next_cursor": ..., "prev_cursor": ...}.
+    """
     try:
-        return list_sales()
+        if limit is None and not any((after, before, start_date, end_date)):
+            return FastJSONResponse(await run_read(list_sales))
+        return FastJSONResponse(await run_read(list_sales_page, limit=limit or 50, after=after, before=before,
+                                               start_date=start_date, end_date=end_date))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to list sales")
         raise HTTPException(500, f"Failed to list sales: {str(e)}")
@@ -192,7 +234,7 @@ async def list_sales_endpoint():
 @app.get("/sales/{sale_id}")
 async def get_sale(sale_id: int):
     try:
-        sale = get_sale_by_id(sale_id)
+        sale = await run_read(get_sale_by_id, sale_id)
         if not sale:
             raise HTTPException(404, "Sale not found")
         return sale
@@ -219,8 +261,9 @@ async def edit_sale(sale_id: int, payload: SaleCreate):
 
         # Convert items payload to DB item shape
         items = []
+        products = await run_read(get_products, [it.product_id for it in payload.items])
         for it in payload.items:
-            prod = get_product_by_id(it.product_id)
+            prod = products.get(it.product_id)
             prod_name = prod["name"] if prod else ""
             items.append({
                 "product_id": it.product_id,
@@ -231,8 +274,8 @@ async def edit_sale(sale_id: int, payload: SaleCreate):
 
         updates["items"] = items
 
-        svc_update_sale(sale_id, updates)
-        updated = get_sale_by_id(sale_id)
+        await run_write(svc_update_sale, sale_id, updates)
+        updated = await run_read(get_sale_by_id, sale_id)
         return updated
     except Exception as e:
         logger.exception("Failed to update sale")
@@ -243,7 +286,7 @@ async def edit_sale(sale_id: int, payload: SaleCreate):
 async def list_all_products():
     """Get all products."""
     try:
-        return list_products()
+        return await run_read(list_products)
     except Exception as e:
         logger.exception("Failed to list products")
         raise HTTPException(500, f"Failed to list products: {str(e)}")
@@ -253,8 +296,7 @@ async def list_all_products():
 async def get_product(product_id: int):
     """Get a single product by ID."""
     try:
-        products = list_products()
-        product = next((p for p in products if p["id"] == product_id), None)
+        product = await run_read(get_cached_product, product_id)
         if not product:
             raise HTTPException(404, "Product not found")
         return product
@@ -269,15 +311,15 @@ async def get_product(product_id: int):
 async def edit_product(product_id: int, payload: ProductUpdate):
     """Update a product."""
     try:
-        row = find_product_row(product_id)
+        row = await run_read(find_product_row, product_id)
         if not row:
             raise HTTPException(404, "Product not found")
 
         update_data = payload.dict(exclude_none=True)
-        update_product(product_id, update_data)
+        await run_write(update_product, product_id, update_data)
 
         # Return updated product with combined format
-        updated_product = next((p for p in list_products() if p["id"] == product_id), None)
+        updated_product = await run_read(get_cached_product, product_id)
         if updated_product:
             return updated_product
         
@@ -297,11 +339,11 @@ async def edit_product(product_id: int, payload: ProductUpdate):
 async def remove_product(product_id: int):
     """Delete a product."""
     try:
-        row = find_product_row(product_id)
+        row = await run_read(find_product_row, product_id)
         if not row:
             raise HTTPException(404, "Product not found")
 
-        result = delete_product(product_id)
+        result = await run_write(delete_product, product_id)
         return {
             "id": product_id,
             "status": "success",
@@ -325,10 +367,10 @@ async def create_purchase_order(payload: PurchaseCreate):
     try:
         # Prepare items data
         items_data = []
+        # Resolve product names and default prices from the catalog cache
+        products = await run_read(get_products, [item.product_id for item in payload.items])
         for item in payload.items:
-            # Get product info to include product name
-            products = list_products()
-            product = next((p for p in products if p["id"] == item.product_id), None)
+            product = products.get(item.product_id)
             if not product:
                 raise HTTPException(404, f"Product {item.product_id} not found")
             
@@ -342,7 +384,8 @@ async def create_purchase_order(payload: PurchaseCreate):
                 "unit_price": unit_price
             })
         
-        result = create_purchase(
+        result = await run_write(
+            create_purchase,
             vendor_name=payload.vendor_name,
             invoice_number=payload.invoice_number,
             purchase_date=payload.purchase_date,
@@ -373,11 +416,11 @@ async def create_sale_order(payload: SaleCreate):
         # Prepare items data
         items_data = []
         
-        # Fetch all products once
-        products_all = list_products()
+        # Resolve product names and default prices from the catalog cache
+        products = await run_read(get_products, [item.product_id for item in payload.items])
         
         for item in payload.items:
-            product = next((p for p in products_all if p["id"] == item.product_id), None)
+            product = products.get(item.product_id)
             if not product:
                 raise HTTPException(404, f"Product {item.product_id} not found")
 
@@ -390,7 +433,8 @@ async def create_sale_order(payload: SaleCreate):
             })
 
         # Create sale
-        result = create_sale(
+        result = await run_write(
+            create_sale,
             customer_name=payload.customer_name,
             invoice_number=payload.invoice_number,
             sale_date=payload.sale_date,
@@ -406,19 +450,10 @@ async def create_sale_order(payload: SaleCreate):
         raise HTTPException(500, f"Failed to create sale: {str(e)}")
 
 
-@app.get("/sales/")
-async def list_all_sales():
-    try:
-        return list_sales()
-    except Exception as e:
-        logger.exception("Failed to list sales")
-        raise HTTPException(500, f"Failed to list sales: {str(e)}")
-
-
 @app.get("/sales/{sale_id}")
 async def get_sale(sale_id: int):
     try:
-        sales = list_sales()
+        sales = await run_read(list_sales)
         match = next((s for s in sales if s["id"] == sale_id), None)
         if not match:
             raise HTTPException(404, "Sale not found")
@@ -430,45 +465,232 @@ async def get_sale(sale_id: int):
         raise HTTPException(500, f"Failed to fetch sale: {str(e)}")
 
 
+# ---------------------------------------------------------------------------
+# Batch order endpoints
+# ---------------------------------------------------------------------------
+
+
+def _validation_error(error: ValidationError) -> str:
+    """One-line summary of a document's validation errors."""
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc']) or 'document'}: {e['msg']}"
+                     for e in error.errors())
+
+
+async def create_batch(payload, model, create_documents, party_column: str, date_column: str, price_field: str,
+                       label: str):
+    """Shared body of POST /sales/batch and POST /purchases/batch.
+
+    Each document is validated as `model` on its own, so one malformed
+    document fails (or, with mode=atomic, rejects the batch) with a per-index
+    error. Products of every valid document are resolved with one catalog
+    lookup; the documents that pass are written by `create_documents` in one
+    write job. Returns per-document results in request order.
+    """
+    atomic = payload.mode == "atomic"
+    results: list[dict] = [{"index": index} for index in range(len(payload.documents))]
+    valid = []
+    for index, raw in enumerate(payload.documents):
+        try:
+            valid.append((index, model.model_validate(raw)))
+        except ValidationError as e:
+            results[index].update(status="failed", error=_validation_error(e))
+    products = await run_read(get_products, {item.product_id for _, doc in valid for item in doc.items})
+
+    documents, positions = [], []
+    for index, doc in valid:
+        missing = [item.product_id for item in doc.items if item.product_id not in products]
+        if missing:
+            results[index].update(status="failed", error=f"Product {missing[0]} not found")
+            continue
+        documents.append({
+            party_column: getattr(doc, party_column),
+            "invoice_number": doc.invoice_number,
+            date_column: getattr(doc, date_column),
+            "notes": doc.notes,
+            "items": [
+                {"product_id": item.product_id, "product_name": products[item.product_id]["name"],
+                 "quantity": item.quantity,
+                 "unit_price": item.unit_price if item.unit_price else products[item.product_id].get(price_field, 0)}
+                for item in doc.items
+            ],
+        })
+        positions.append(index)
+
+    if atomic and len(documents) < len(payload.documents):
+        raise HTTPException(400, {
+            "message": f"{label} batch rejected, nothing was created",
+            "errors": [r for r in results if r.get("status") == "failed"],
+        })
+
+    for index, outcome in zip(positions, await run_write(create_documents, documents, atomic=atomic)):
+        if "error" in outcome:
+            results[index].update(status="failed", error=outcome["error"])
+        else:
+            results[index].update(status="created", **outcome)
+
+    created = sum(r["status"] == "created" for r in results)
+    return {
+        "status": "success" if created == len(results) else "partial",
+        "mode": payload.mode,
+        "created": created,
+        "failed": len(results) - created,
+        "results": results,
+    }
+
+
+@app.post("/sales/batch")
+async def create_sales_batch_endpoint(payload: SaleBatchCreate):
+    """Create up to 1000 sales in one transaction (e.g. an offline POS sync).
+
+    mode=atomic creates all of them or none; mode=best_effort skips the
+    documents that fail, including ones that fail validation, and reports
+    why in their result.
+    """
+    try:
+        return await create_batch(payload, SaleCreate, create_sales_batch, "customer_name", "sale_date",
+                                  "sales_unit_price", "Sale")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Failed to create sales batch")
+        raise HTTPException(500, f"Failed to create sales batch: {str(e)}")
+
+
+@app.post("/purchases/batch")
+async def create_purchases_batch_endpoint(payload: PurchaseBatchCreate):
+    """Create up to 1000 purchase orders in one transaction (see /sales/batch)."""
+    try:
+        return await create_batch(payload, PurchaseCreate, create_purchases_batch, "vendor_name", "purchase_date",
+                                  "purchase_unit_price", "Purchase")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Failed to create purchases batch")
+        raise HTTPException(500, f"Failed to create purchases batch: {str(e)}")
+
+
+# ---------------------------------------------------------------------------
+# Bulk import endpoint
+# ---------------------------------------------------------------------------
+
+
+@app.post("/import/{entity}")
+async def import_entity(entity: str, file: UploadFile = File(...)):
+    """Bulk-load products, purchases or sales from an uploaded CSV file.
+
+    Rows are validated and written in chunks, each chunk in one transaction.
+    Invalid rows are skipped; the response reports counts and the line
+    number and reason of every rejected row (see importer.py for columns).
+    """
+    if entity not in IMPORT_ENTITIES:
+        raise HTTPException(404, f"Unknown import entity '{entity}'")
+    try:
+        return await run_write(import_csv, entity, file.file)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        logger.exception(f"Failed to import {entity}")
+        raise HTTPException(500, f"Failed to import {entity}: {str(e)}")
+    finally:
+        await file.close()
+
+
 @app.get("/stock/")
 async def list_stock():
     """Get all stock entries."""
     try:
-        return list_all_stock()
+        return await run_read(list_all_stock)
     except Exception as e:
         logger.exception("Failed to list stock")
         raise HTTPException(500, f"Failed to list stock: {str(e)}")
 
 
+@app.get("/stock/as-of")
+async def stock_as_of(as_of: date = Query(..., alias="date")):
+    """Get every product's stock balance at the end of the given date (YYYY-MM-DD)."""
+    try:
+        stock = await run_read(get_stock_as_of, as_of.isoformat())
+        return {"date": as_of.isoformat(), "stock": stock}
+    except Exception as e:
+        logger.exception("Failed to get stock as of date")
+        raise HTTPException(500, f"Failed to get stock as of date: {str(e)}")
+
+
 @app.get("/stock/{product_id}")
 async def get_product_stock(product_id: int):
     """Get stock for a specific product."""
     try:
-        stock = get_stock(product_id)
+        stock = await run_read(get_stock, product_id)
         return {"product_id": product_id, "available_stock": stock}
     except Exception as e:
         logger.exception(f"Failed to get stock for product {product_id}")
         raise HTTPException(500, f"Failed to get stock: {str(e)}")
 
 
+@app.get("/events/stock")
+async def stock_event_stream(request: Request):
+    """Server-Sent Events stream of stock changes and reorder point crossings.
+
+    Event types: stock, low_stock, restocked and resync (refetch the stock
+    lists). Reconnecting clients resume after the Last-Event-ID header.
+    """
+    return StreamingResponse(
+        stock_broadcaster.stream(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/stock-ledger/")
-async def list_stock_ledger(product_id: int = None, limit: int = 100):
-    """Get stock ledger entries, optionally filtered by product_id."""
+async def list_stock_ledger(product_id: int = None, limit: int | None = None, after: str | None = None,
+                            before: str | None = None, start_date: str | None = None, end_date: str | None = None,
+                            layout: str = 'objects', page: bool = False):
+    """Get stock ledger entries, optionally filtered by product_id.
+
+    Without paging parameters the latest `limit` (default 100) entries are
+    returned as a list, as before. page=true, or any of after/before/
+    start_date/end_date, returns one keyset page: {"items": [...],
+    "next_cursor": ..., "prev_cursor": ...}.
+    layout=columns always returns a page, with "columns" and tuple "rows"
+    in place of "items".
+    """
     try:
-        from stock_ledger import list_ledger_entries
-        entries = list_ledger_entries(product_id=product_id, limit=limit)
-        return entries
+        check_layout(layout)
+        if layout == 'objects' and not page and not any((after, before, start_date, end_date)):
+            from stock_ledger import list_ledger_entries
+            return FastJSONResponse(await run_read(list_ledger_entries, product_id=product_id, limit=limit or 100))
+        return FastJSONResponse(await run_read(list_ledger_page, product_id=product_id, limit=limit or 100,
+                                               after=after, before=before, start_date=start_date,
+                                               end_date=end_date, as_columns=layout == 'columns'))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to list stock ledger")
         raise HTTPException(500, f"Failed to list stock ledger: {str(e)}")
 
 
+@app.get("/stock-ledger/export")
+async def export_stock_ledger(request: Request, product_id: int | None = None, start_date: str | None = None,
+                              end_date: str | None = None):
+    """Download stock ledger entries as CSV, oldest first, streamed from the database."""
+    try:
+        return csv_response(
+            request, *ledger_export_query(product_id, start_date, end_date),
+            ["id", "product_id", "product_name", "transaction_date", "transaction_type", "quantity",
+             "balance_after", "reference_type", "reference_id", "notes"],
+            "stock_ledger.csv"
+        )
+    except Exception as e:
+        logger.exception("Failed to export stock ledger")
+        raise HTTPException(500, f"Failed to export stock ledger: {str(e)}")
+
+
 @app.get("/stock-ledger/{product_id}/balance")
 async def get_product_balance_from_ledger(product_id: int):
     """Get current balance for a product from the ledger."""
     try:
         from stock_ledger import get_current_balance
-        balance = get_current_balance(product_id)
+        balance = await run_read(get_current_balance, product_id)
         return {"product_id": product_id, "balance_quantity": balance}
     except Exception as e:
         logger.exception(f"Failed to get balance for product {product_id}")
@@ -480,7 +702,7 @@ async def get_opening_stock_for_month(product_id: int, year: int, month: int):
     """Get opening stock for a product in a given month."""
     try:
         from stock_ledger import get_opening_stock
-        opening = get_opening_stock(product_id, month, year)
+        opening = await run_read(get_opening_stock, product_id, month, year)
         return {"product_id": product_id, "month": month, "year": year, "opening_stock": opening}
     except Exception as e:
         logger.exception(f"Failed to get opening stock for product {product_id}")
@@ -492,7 +714,7 @@ async def get_closing_stock_for_month(product_id: int, year: int, month: int):
     """Get closing stock for a product in a given month."""
     try:
         from stock_ledger import get_closing_stock
-        closing = get_closing_stock(product_id, month, year)
+        closing = await run_read(get_closing_stock, product_id, month, year)
         return {"product_id": product_id, "month": month, "year": year, "closing_stock": closing}
     except Exception as e:
         logger.exception(f"Failed to get closing stock for product {product_id}")
@@ -503,7 +725,7 @@ async def get_closing_stock_for_month(product_id: int, year: int, month: int):
 async def get_low_stock_alerts_endpoint():
     """Get products that are below their reorder point (low stock alerts)."""
     try:
-        alerts = get_low_stock_alerts()
+        alerts = await run_read(get_low_stock_alerts)
         return {
             "alerts": alerts,
             "count": len(alerts),
@@ -514,99 +736,79 @@ async def get_low_stock_alerts_endpoint():
         raise HTTPException(500, f"Failed to get low stock alerts: {str(e)}")
 
 
+async def report_json(get_rows, query, *args, layout: str = 'objects', key: str = "report", sort: str | None = None,
+                      limit: int | None = None, offset: int = 0, **kwargs) -> FastJSONResponse:
+    """One page of a report as JSON with its total row count, both served through the report cache.
+
+    `get_rows` is the report's get_* function and `query` its SQL builder.
+    layout=columns sends {"columns": [...], "rows": [[...]], "count": n}.
+    """
+    check_layout(layout)
+    total = await cached_report(count_report_rows, query, *args, **kwargs)
+    if layout == 'columns':
+        columns, rows = await cached_report(fetch_report_columns, query, *args, sort=sort, limit=limit, offset=offset,
+                                            **kwargs)
+        return FastJSONResponse(columns_payload(columns, rows, count=total))
+    rows = await cached_report(get_rows, *args, sort=sort, limit=limit, offset=offset, **kwargs)
+    return FastJSONResponse({key: rows, "count": total})
+
+
 @app.get("/reports/current-stock")
-async def current_stock_report(start_date: str = None, end_date: str = None, format: str = 'json', limit: int | None = None, offset: int = 0):
+async def current_stock_report(request: Request, start_date: str = None, end_date: str = None, format: str = 'json', sort: str | None = None, layout: str = 'objects', limit: int | None = None, offset: int = 0):
     """Return current stock report per product. Use format=csv to download CSV.
 
     Optional query params:
+    - sort: column to order by, prefixed with "-" for descending (default product_name)
+    - layout: "objects" (default) or "columns" for a column header plus row arrays
     - limit: number of rows to return for JSON preview
     - offset: starting index (default 0)
 
     CSV downloads return the full dataset (ignore limit/offset for CSV exports).
     """
     try:
-        rows = get_current_stock_report(start_date=start_date, end_date=end_date)
-        total = len(rows)
         if format == 'csv':
-            import io, csv
-            from fastapi.responses import StreamingResponse
-            si = io.StringIO()
-            writer = csv.writer(si)
-            writer.writerow(["product_id", "product_name", "opening", "purchased", "sold", "closing"])
-            for r in rows:
-                writer.writerow([r.get('product_id'), r.get('product_name'), r.get('opening', 0), r.get('purchased', 0), r.get('sold', 0), r.get('closing', 0)])
-            si.seek(0)
-            return StreamingResponse(iter([si.getvalue()]), media_type='text/csv', headers={"Content-Disposition": "attachment; filename=current_stock_report.csv"})
-
-        # Apply pagination for JSON preview
-        if limit is not None:
-            rows = rows[offset: offset + limit]
-        else:
-            rows = rows[offset:]
+            return csv_response(request, *current_stock_report_query(start_date=start_date, end_date=end_date, sort=sort), ["product_id", "product_name", "opening", "purchased", "sold", "closing"], "current_stock_report.csv")
 
-        return {"report": rows, "count": total}
+        return await report_json(get_current_stock_report, current_stock_report_query, layout=layout, start_date=start_date, end_date=end_date, sort=sort, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to generate current stock report")
         raise HTTPException(500, f"Failed to generate current stock report: {str(e)}")
 
 
 @app.get("/reports/low-stock")
-async def report_low_stock(format: str = 'json', limit: int | None = None, offset: int = 0):
+async def report_low_stock(request: Request, format: str = 'json', sort: str | None = None, layout: str = 'objects', limit: int | None = None, offset: int = 0):
     """Return low stock alerts. Use format=csv to download CSV."""
     try:
-        rows = get_low_stock_alerts()
-        total = len(rows)
         if format == 'csv':
-            import io, csv
-            from fastapi.responses import StreamingResponse
-            si = io.StringIO()
-            writer = csv.writer(si)
-            writer.writerow(["product_id", "product_name", "current_stock", "reorder_point", "shortage"])
-            for r in rows:
-                writer.writerow([r.get('product_id'), r.get('product_name'), r.get('current_stock'), r.get('reorder_point'), r.get('shortage')])
-            si.seek(0)
-            return StreamingResponse(iter([si.getvalue()]), media_type='text/csv', headers={"Content-Disposition": "attachment; filename=low_stock_report.csv"})
-
-        # Apply pagination for JSON preview
-        if limit is not None:
-            rows = rows[offset: offset + limit]
-        else:
-            rows = rows[offset:]
+            return csv_response(request, *low_stock_alerts_query(sort=sort), ["product_id", "product_name", "current_stock", "reorder_point", "shortage"], "low_stock_report.csv")
 
-        return {"alerts": rows, "count": total}
+        # database-level function: the stock.py wrapper hides errors as [], which must not be cached
+        return await report_json(db_get_low_stock_alerts, low_stock_alerts_query, layout=layout, key="alerts", sort=sort, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to generate low stock report")
         raise HTTPException(500, f"Failed to generate low stock report: {str(e)}")
 
 
 @app.get("/reports/monthly")
-async def report_monthly(year: int, month: int, format: str = 'json', limit: int | None = None, offset: int = 0):
+async def report_monthly(request: Request, year: int, month: int, format: str = 'json', sort: str | None = None, layout: str = 'objects', limit: int | None = None, offset: int = 0):
     """Return opening/closing stock for a given month.
 
     Optional query params:
+    - sort: column to order by, prefixed with "-" for descending (default product_name)
+    - layout: "objects" (default) or "columns" for a column header plus row arrays
     - limit/offset for JSON preview paging
     """
     try:
-        rows = get_monthly_opening_closing(year, month)
-        total = len(rows)
         if format == 'csv':
-            import io, csv
-            from fastapi.responses import StreamingResponse
-            si = io.StringIO()
-            writer = csv.writer(si)
-            writer.writerow(["product_id", "product_name", "opening", "closing"])
-            for r in rows:
-                writer.writerow([r.get('product_id'), r.get('product_name'), r.get('opening', 0), r.get('closing', 0)])
-            si.seek(0)
-            return StreamingResponse(iter([si.getvalue()]), media_type='text/csv', headers={"Content-Disposition": f"attachment; filename=stock_monthly_{year}_{month}.csv"})
-
-        # Apply pagination for JSON preview
-        if limit is not None:
-            rows = rows[offset: offset + limit]
-        else:
-            rows = rows[offset:]
+            return csv_response(request, *monthly_opening_closing_query(year, month, sort=sort), ["product_id", "product_name", "opening", "closing"], f"stock_monthly_{year}_{month}.csv")
 
-        return {"report": rows, "count": total}
+        return await report_json(get_monthly_opening_closing, monthly_opening_closing_query, year, month, layout=layout, sort=sort, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to generate monthly stock report")
         raise HTTPException(500, f"Failed to generate monthly stock report: {str(e)}")
@@ -616,7 +818,9 @@ async def report_monthly(year: int, month: int, format: str = 'json', limit: int
 async def report_kpis():
     """Return KPIs for the dashboard."""
     try:
-        kpis = get_kpis()
+        kpis = kpi_engine.peek()
+        if kpis is None:
+            kpis = await run_write(kpi_engine.snapshot)
         return {"kpis": kpis}
     except Exception as e:
         logger.exception("Failed to generate KPIs report")
@@ -624,216 +828,120 @@ async def report_kpis():
 
 
 @app.get("/reports/sales/monthly-summary")
-async def report_sales_monthly(start_date: str = None, end_date: str = None, format: str = 'json', limit: int | None = None, offset: int = 0):
+async def report_sales_monthly(request: Request, start_date: str = None, end_date: str = None, format: str = 'json', sort: str | None = None, layout: str = 'objects', limit: int | None = None, offset: int = 0):
     """Return monthly sales summary (month, total_sales, total_quantity_sold, avg_sale_value)."""
     try:
-        rows = get_monthly_sales_summary(start_date=start_date, end_date=end_date)
-        total = len(rows)
         if format == 'csv':
-            import io, csv
-            from fastapi.responses import StreamingResponse
-            si = io.StringIO()
-            writer = csv.writer(si)
-            writer.writerow(["month", "total_sales", "total_quantity_sold", "avg_sale_value"])
-            for r in rows:
-                writer.writerow([r.get('month'), r.get('total_sales'), r.get('total_quantity_sold'), r.get('avg_sale_value')])
-            si.seek(0)
-            return StreamingResponse(iter([si.getvalue()]), media_type='text/csv', headers={"Content-Disposition": "attachment; filename=monthly_sales_summary.csv"})
-
-        if limit is not None:
-            rows = rows[offset: offset + limit]
-        else:
-            rows = rows[offset:]
-        return {"report": rows, "count": total}
+            return csv_response(request, *monthly_sales_summary_query(start_date=start_date, end_date=end_date, sort=sort), ["month", "total_sales", "total_quantity_sold", "avg_sale_value"], "monthly_sales_summary.csv")
+
+        return await report_json(get_monthly_sales_summary, monthly_sales_summary_query, layout=layout, start_date=start_date, end_date=end_date, sort=sort, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to generate monthly sales summary")
         raise HTTPException(500, f"Failed to generate monthly sales summary: {str(e)}")
 
 
 @app.get("/reports/sales/yearly-summary")
-async def report_sales_yearly(start_date: str = None, end_date: str = None, format: str = 'json', limit: int | None = None, offset: int = 0):
+async def report_sales_yearly(request: Request, start_date: str = None, end_date: str = None, format: str = 'json', sort: str | None = None, layout: str = 'objects', limit: int | None = None, offset: int = 0):
     """Return yearly sales summary (year, total_sales, total_quantity_sold, avg_sale_value)."""
     try:
-        rows = get_yearly_sales_summary(start_date=start_date, end_date=end_date)
-        total = len(rows)
         if format == 'csv':
-            import io, csv
-            from fastapi.responses import StreamingResponse
-            si = io.StringIO()
-            writer = csv.writer(si)
-            writer.writerow(["year", "total_sales", "total_quantity_sold", "avg_sale_value"])
-            for r in rows:
-                writer.writerow([r.get('year'), r.get('total_sales'), r.get('total_quantity_sold'), r.get('avg_sale_value')])
-            si.seek(0)
-            return StreamingResponse(iter([si.getvalue()]), media_type='text/csv', headers={"Content-Disposition": "attachment; filename=yearly_sales_summary.csv"})
-
-        if limit is not None:
-            rows = rows[offset: offset + limit]
-        else:
-            rows = rows[offset:]
-        return {"report": rows, "count": total}
+            return csv_response(request, *yearly_sales_summary_query(start_date=start_date, end_date=end_date, sort=sort), ["year", "total_sales", "total_quantity_sold", "avg_sale_value"], "yearly_sales_summary.csv")
+
+        return await report_json(get_yearly_sales_summary, yearly_sales_summary_query, layout=layout, start_date=start_date, end_date=end_date, sort=sort, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to generate yearly sales summary")
         raise HTTPException(500, f"Failed to generate yearly sales summary: {str(e)}")
 
 
 @app.get("/reports/sales/product-wise")
-async def report_sales_product_wise(start_date: str = None, end_date: str = None, format: str = 'json', limit: int | None = None, offset: int = 0):
+async def report_sales_product_wise(request: Request, start_date: str = None, end_date: str = None, format: str = 'json', sort: str | None = None, layout: str = 'objects', limit: int | None = None, offset: int = 0):
     """Return product-wise sales (product_name, quantity_sold, revenue)."""
     try:
-        rows = get_product_wise_sales(start_date=start_date, end_date=end_date)
-        total = len(rows)
         if format == 'csv':
-            import io, csv
-            from fastapi.responses import StreamingResponse
-            si = io.StringIO()
-            writer = csv.writer(si)
-            writer.writerow(["product_id", "product_name", "quantity_sold", "revenue"])
-            for r in rows:
-                writer.writerow([r.get('product_id'), r.get('product_name'), r.get('quantity_sold'), r.get('revenue')])
-            si.seek(0)
-            return StreamingResponse(iter([si.getvalue()]), media_type='text/csv', headers={"Content-Disposition": "attachment; filename=product_wise_sales.csv"})
-
-        if limit is not None:
-            rows = rows[offset: offset + limit]
-        else:
-            rows = rows[offset:]
-        return {"report": rows, "count": total}
+            return csv_response(request, *product_wise_sales_query(start_date=start_date, end_date=end_date, sort=sort), ["product_id", "product_name", "quantity_sold", "revenue"], "product_wise_sales.csv")
+
+        return await report_json(get_product_wise_sales, product_wise_sales_query, layout=layout, start_date=start_date, end_date=end_date, sort=sort, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to generate product-wise sales report")
         raise HTTPException(500, f"Failed to generate product-wise sales report: {str(e)}")
 
 
 @app.get("/reports/sales/top-selling")
-async def report_sales_top_selling(start_date: str = None, end_date: str = None, limit: int = 10, format: str = 'json', offset: int = 0):
+async def report_sales_top_selling(request: Request, start_date: str = None, end_date: str = None, limit: int = 10, format: str = 'json', sort: str | None = None, layout: str = 'objects', offset: int = 0):
     """Return top-selling products by quantity (limit applies)."""
     try:
-        rows = get_top_selling_products(start_date=start_date, end_date=end_date, limit=limit)
-        total = len(rows)
         if format == 'csv':
-            import io, csv
-            from fastapi.responses import StreamingResponse
-            si = io.StringIO()
-            writer = csv.writer(si)
-            writer.writerow(["product_id", "product_name", "qty_sold"])
-            for r in rows:
-                writer.writerow([r.get('product_id'), r.get('product_name'), r.get('qty_sold')])
-            si.seek(0)
-            return StreamingResponse(iter([si.getvalue()]), media_type='text/csv', headers={"Content-Disposition": "attachment; filename=top_selling_products.csv"})
-
-        if limit is not None:
-            rows = rows[offset: offset + limit]
-        else:
-            rows = rows[offset:]
-        return {"report": rows, "count": total}
+            return csv_response(request, *top_selling_products_query(start_date=start_date, end_date=end_date, limit=limit, sort=sort), ["product_id", "product_name", "qty_sold"], "top_selling_products.csv")
+
+        return await report_json(get_top_selling_products, top_selling_products_query, layout=layout, start_date=start_date, end_date=end_date, limit=limit, sort=sort, offset=offset)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to generate top-selling report")
         raise HTTPException(500, f"Failed to generate top-selling report: {str(e)}")
 
 
 @app.get("/reports/sales/dead-stock")
-async def report_sales_dead_stock(days: int = 60, format: str = 'json', limit: int | None = None, offset: int = 0):
+async def report_sales_dead_stock(request: Request, days: int = 60, format: str = 'json', sort: str | None = None, layout: str = 'objects', limit: int | None = None, offset: int = 0):
     """Return products not sold in the last `days` days."""
     try:
-        rows = get_dead_stock(days=days, limit=limit)
-        total = len(rows)
         if format == 'csv':
-            import io, csv
-            from fastapi.responses import StreamingResponse
-            si = io.StringIO()
-            writer = csv.writer(si)
-            writer.writerow(["product_id", "product_name", "last_sold_date", "stock_remaining"])
-            for r in rows:
-                writer.writerow([r.get('product_id'), r.get('product_name'), r.get('last_sold_date'), r.get('stock_remaining')])
-            si.seek(0)
-            return StreamingResponse(iter([si.getvalue()]), media_type='text/csv', headers={"Content-Disposition": "attachment; filename=dead_stock_report.csv"})
-
-        if limit is not None:
-            rows = rows[offset: offset + limit]
-        else:
-            rows = rows[offset:]
-        return {"report": rows, "count": total}
+            return csv_response(request, *dead_stock_query(days=days, limit=limit, sort=sort), ["product_id", "product_name", "last_sold_date", "stock_remaining"], "dead_stock_report.csv")
+
+        return await report_json(get_dead_stock, dead_stock_query, layout=layout, days=days, limit=limit, sort=sort, offset=offset)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to generate dead-stock report")
         raise HTTPException(500, f"Failed to generate dead-stock report: {str(e)}")
 
 
 @app.get("/reports/purchases/monthly-summary")
-async def report_purchases_monthly(start_date: str = None, end_date: str = None, format: str = 'json', limit: int | None = None, offset: int = 0):
+async def report_purchases_monthly(request: Request, start_date: str = None, end_date: str = None, format: str = 'json', sort: str | None = None, layout: str = 'objects', limit: int | None = None, offset: int = 0):
     """Return monthly purchase summary (month, total_purchase, avg_cost)."""
     try:
-        rows = get_monthly_purchase_summary(start_date=start_date, end_date=end_date)
-        total = len(rows)
         if format == 'csv':
-            import io, csv
-            from fastapi.responses import StreamingResponse
-            si = io.StringIO()
-            writer = csv.writer(si)
-            writer.writerow(["month", "total_purchase", "avg_cost"])
-            for r in rows:
-                writer.writerow([r.get('month'), r.get('total_purchase'), r.get('avg_cost')])
-            si.seek(0)
-            return StreamingResponse(iter([si.getvalue()]), media_type='text/csv', headers={"Content-Disposition": "attachment; filename=monthly_purchase_summary.csv"})
-
-        if limit is not None:
-            rows = rows[offset: offset + limit]
-        else:
-            rows = rows[offset:]
-        return {"report": rows, "count": total}
+            return csv_response(request, *monthly_purchase_summary_query(start_date=start_date, end_date=end_date, sort=sort), ["month", "total_purchase", "avg_cost"], "monthly_purchase_summary.csv")
+
+        return await report_json(get_monthly_purchase_summary, monthly_purchase_summary_query, layout=layout, start_date=start_date, end_date=end_date, sort=sort, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to generate monthly purchase summary")
         raise HTTPException(500, f"Failed to generate monthly purchase summary: {str(e)}")
 
 
 @app.get("/reports/purchases/vendor-wise")
-async def report_purchases_vendor_wise(start_date: str = None, end_date: str = None, format: str = 'json', limit: int | None = None, offset: int = 0):
+async def report_purchases_vendor_wise(request: Request, start_date: str = None, end_date: str = None, format: str = 'json', sort: str | None = None, layout: str = 'objects', limit: int | None = None, offset: int = 0):
     """Return vendor-wise purchase report (vendor, total_purchase_value, items_bought)."""
     try:
-        rows = get_vendor_wise_purchases(start_date=start_date, end_date=end_date)
-        total = len(rows)
         if format == 'csv':
-            import io, csv
-            from fastapi.responses import StreamingResponse
-            si = io.StringIO()
-            writer = csv.writer(si)
-            writer.writerow(["vendor", "total_purchase_value", "items_bought"])
-            for r in rows:
-                writer.writerow([r.get('vendor'), r.get('total_purchase_value'), r.get('items_bought')])
-            si.seek(0)
-            return StreamingResponse(iter([si.getvalue()]), media_type='text/csv', headers={"Content-Disposition": "attachment; filename=vendor_wise_purchases.csv"})
-
-        if limit is not None:
-            rows = rows[offset: offset + limit]
-        else:
-            rows = rows[offset:]
-        return {"report": rows, "count": total}
+            return csv_response(request, *vendor_wise_purchases_query(start_date=start_date, end_date=end_date, sort=sort), ["vendor", "total_purchase_value", "items_bought"], "vendor_wise_purchases.csv")
+
+        return await report_json(get_vendor_wise_purchases, vendor_wise_purchases_query, layout=layout, start_date=start_date, end_date=end_date, sort=sort, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to generate vendor-wise purchase report")
         raise HTTPException(500, f"Failed to generate vendor-wise purchase report: {str(e)}")
 
 
 @app.get("/reports/purchases/price-variations")
-async def report_purchases_price_variation(start_date: str = None, end_date: str = None, format: str = 'json', limit: int | None = None, offset: int = 0):
+async def report_purchases_price_variation(request: Request, start_date: str = None, end_date: str = None, format: str = 'json', sort: str | None = None, layout: str = 'objects', limit: int | None = None, offset: int = 0):
     """Return purchase price variation per product (product_id, product_name, min_price, max_price, avg_price)."""
     try:
-        rows = get_price_variation_per_product(start_date=start_date, end_date=end_date)
-        total = len(rows)
         if format == 'csv':
-            import io, csv
-            from fastapi.responses import StreamingResponse
-            si = io.StringIO()
-            writer = csv.writer(si)
-            writer.writerow(["product_id", "product_name", "min_price", "max_price", "avg_price"])
-            for r in rows:
-                writer.writerow([r.get('product_id'), r.get('product_name'), r.get('min_price'), r.get('max_price'), r.get('avg_price')])
-            si.seek(0)
-            return StreamingResponse(iter([si.getvalue()]), media_type='text/csv', headers={"Content-Disposition": "attachment; filename=price_variations.csv"})
-
-        if limit is not None:
-            rows = rows[offset: offset + limit]
-        else:
-            rows = rows[offset:]
-        return {"report": rows, "count": total}
+            return csv_response(request, *price_variation_per_product_query(start_date=start_date, end_date=end_date, sort=sort), ["product_id", "product_name", "min_price", "max_price", "avg_price"], "price_variations.csv")
+
+        return await report_json(get_price_variation_per_product, price_variation_per_product_query, layout=layout, start_date=start_date, end_date=end_date, sort=sort, limit=limit, offset=offset)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to generate price variation report")
         raise HTTPException(500, f"Failed to generate price variation report: {str(e)}")
@@ -842,11 +950,11 @@ async def report_purchases_price_variation(start_date: str = None, end_date: str
 @app.delete("/sales/{sale_id}")
 async def remove_sale_order(sale_id: int):
     try:
-        row = find_sale_row_in_sheet(sale_id)
+        row = await run_read(find_sale_row, sale_id)
         if not row:
             raise HTTPException(404, "Sale not found")
 
-        delete_sale(sale_id)
+        await run_write(delete_sale, sale_id)
         return {"id": sale_id, "status": "success", "message": "Sale deleted successfully"}
     except HTTPException:
         raise
@@ -856,10 +964,21 @@ async def remove_sale_order(sale_id: int):
 
 
 @app.get("/purchases/")
-async def list_all_purchases():
-    """Get all purchases with their items."""
+async def list_all_purchases(limit: int | None = None, after: str | None = None, before: str | None = None,
+                             start_date: str | None = None, end_date: str | None = None):
+    """Get purchases with their items.
+
+    Without paging parameters the full history is returned as a list. Passing
+    any of limit/after/before/start_date/end_date returns one keyset page:
+    {"items": [...], "next_cursor": ..., "prev_cursor": ...}.
+    """
     try:
-        return list_purchases()
+        if limit is None and not any((after, before, start_date, end_date)):
+            return FastJSONResponse(await run_read(list_purchases))
+        return FastJSONResponse(await run_read(list_purchases_page, limit=limit or 50, after=after, before=before,
+                                               start_date=start_date, end_date=end_date))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         logger.exception("Failed to list purchases")
         raise HTTPException(500, f"Failed to list purchases: {str(e)}")
@@ -869,16 +988,16 @@ async def list_all_purchases():
 async def edit_purchase_order(purchase_id: int, payload: PurchaseCreate):
     """Update a purchase order."""
     try:
-        row = find_purchase_row(purchase_id)
+        row = await run_read(find_purchase_row, purchase_id)
         if not row:
             raise HTTPException(404, "Purchase not found")
 
         # Prepare items data
         items_data = []
+        # Resolve product names and default prices from the catalog cache
+        products = await run_read(get_products, [item.product_id for item in payload.items])
         for item in payload.items:
-            # Get product info to include product name
-            products = list_products()
-            product = next((p for p in products if p["id"] == item.product_id), None)
+            product = products.get(item.product_id)
             if not product:
                 raise HTTPException(404, f"Product {item.product_id} not found")
             
@@ -892,7 +1011,8 @@ async def edit_purchase_order(purchase_id: int, payload: PurchaseCreate):
                 "unit_price": unit_price
             })
         
-        result = update_purchase(
+        result = await run_write(
+            update_purchase,
             purchase_id=purchase_id,
             vendor_name=payload.vendor_name,
             invoice_number=payload.invoice_number,
@@ -902,7 +1022,8 @@ async def edit_purchase_order(purchase_id: int, payload: PurchaseCreate):
         )
         
         # Return updated purchase
-        updated_purchase = next((p for p in list_purchases() if p["id"] == purchase_id), None)
+        purchases = await run_read(list_purchases)
+        updated_purchase = next((p for p in purchases if p["id"] == purchase_id), None)
         if updated_purchase:
             return updated_purchase
         
@@ -918,11 +1039,11 @@ async def edit_purchase_order(purchase_id: int, payload: PurchaseCreate):
 async def remove_purchase_order(purchase_id: int):
     """Delete a purchase order."""
     try:
-        row = find_purchase_row(purchase_id)
+        row = await run_read(find_purchase_row, purchase_id)
         if not row:
             raise HTTPException(404, "Purchase not found")
 
-        result = delete_purchase(purchase_id)
+        result = await run_write(delete_purchase, purchase_id)
         return {
             "id": purchase_id,
             "status": "success",
@@ -933,3 +1054,90 @@ async def remove_purchase_order(purchase_id: int):
     except Exception as e:
         logger.exception("Failed to delete purchase")
         raise HTTPException(500, f"Failed to delete purchase: {str(e)}")
+
+
+# ---------------------------------------------------------------------------
+# Diagnostics endpoints
+# ---------------------------------------------------------------------------
+
+
+def _database_metrics():
+    """Executor and write queue gauges for GET /metrics."""
+    lanes = get_executor_stats()
+    writer = get_pool_stats()["writer"]
+    yield ("db_executor_queue_depth", "Database calls waiting for an executor thread.", "gauge",
+           [({"lane": lane}, stats["queue_depth"]) for lane, stats in lanes.items()])
+    yield ("db_executor_active", "Database calls running on an executor thread.", "gauge",
+           [({"lane": lane}, stats["active"]) for lane, stats in lanes.items()])
+    yield ("db_executor_completed_total", "Database calls completed.", "counter",
+           [({"lane": lane}, stats["completed"]) for lane, stats in lanes.items()])
+    yield ("db_write_queue_depth", "Write jobs waiting for the writer thread.", "gauge",
+           [({}, writer["queue_depth"])])
+    yield ("db_write_batches_total", "Write transactions committed by the writer thread.", "counter",
+           [({}, writer["batches"])])
+    yield ("stock_event_clients", "Connected GET /events/stock streams.", "gauge",
+           [({}, stock_broadcaster.stats()["clients"])])
+
+
+metrics_registry.add_collector(_database_metrics)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request, latency and database metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/db-pool")
+async def db_pool_stats():
+    """Return connection pool size, checkout and wait statistics."""
+    return get_pool_stats()
+
+
+@app.get("/debug/db-executor")
+async def db_executor_stats():
+    """Return read/write executor queue depth and wait time statistics."""
+    return get_executor_stats()
+
+
+@app.get("/debug/product-cache")
+async def product_cache_stats():
+    """Return product catalog cache size, hit and reload counters."""
+    return catalog.stats()
+
+
+@app.get("/debug/kpi-engine")
+async def kpi_engine_stats():
+    """Return the KPI engine's stale parts, event and reload counters."""
+    return kpi_engine.stats()
+
+
+@app.get("/debug/stock-events")
+async def stock_events_stats():
+    """Return connected stock event streams, history size and resync count."""
+    return stock_broadcaster.stats()
+
+
+@app.get("/debug/report-cache")
+async def report_cache_stats():
+    """Return report cache size, hit/miss and eviction counters."""
+    return report_cache.stats()
+
+
+@app.get("/debug/sql-profile")
+async def sql_profile(limit: int = Query(50, ge=1, le=1000), sort: str = "total_ms"):
+    """Return the hottest SQL statements recorded by the profiler, per database.py function and route."""
+    try:
+        return sql_profiler.report(limit=limit, sort=sort)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+@app.post("/debug/sql-profile")
+async def configure_sql_profile(enabled: bool | None = None, reset: bool = False):
+    """Turn the SQL profiler on or off and/or clear what it has recorded."""
+    if enabled is not None:
+        sql_profiler.enable(enabled)
+    if reset:
+        sql_profiler.reset()
+    return {"enabled": sql_profiler.enabled, "since": sql_profiler.since.isoformat(timespec="seconds")}
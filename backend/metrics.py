@@ -0,0 +1,266 @@
+"""
+Request Metrics
+
+ASGI middleware that records, per route template (e.g. "/products/{product_id}"):
+
+- request count by status code and unhandled exceptions
+- latency and response size histograms
+- database time and number of SQL statements executed for the request
+
+plus the number of requests in flight, and renders everything, together with
+registered collector callbacks, in the Prometheus text exposition format for
+GET /metrics.
+
+Database figures are gathered through a per-request RequestStats object held
+in a context variable: the database executor adds the time each call took
+and database.py's statement hook counts statements, including statements a
+write job runs on the writer thread on the request's behalf.
+
+Updates are plain dict and list operations on the event loop thread (the
+statement counter is a single attribute increment), cheap enough to leave on
+in production; see benchmarks/metrics_overhead.py.
+"""
+
+import contextvars
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Histogram upper bounds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+# Label used for requests that did not match any route (keeps label cardinality bounded)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestStats:
+    """Database work done on behalf of one HTTP request."""
+
+    __slots__ = ("scope", "db_time", "queries")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.db_time = 0.0
+        self.queries = 0
+
+    @property
+    def route(self) -> str:
+        return route_label(self.scope) if self.scope is not None else UNMATCHED_ROUTE
+
+
+_current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request", default=None)
+
+
+def current_request() -> Optional[RequestStats]:
+    """Stats of the request being served in this context, if any."""
+    return _current_request.get()
+
+
+def count_statement(sql: str) -> None:
+    """database.py statement hook: count one executed statement for the current request."""
+    stats = _current_request.get()
+    if stats is not None:
+        stats.queries += 1
+
+
+# endpoint -> route template
+_route_templates: Dict[Any, str] = {}
+
+
+def route_label(scope) -> str:
+    """Route template of the request, e.g. "/sales/{sale_id}"."""
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        route = _route_templates.get(endpoint)
+        if route is not None:
+            return route
+    # Not routed yet (answered by an outer middleware such as a 304) or first time seen
+    from starlette.routing import Match
+    app = scope.get("app")
+    for candidate in getattr(app, "routes", ()):
+        match, child = candidate.matches(scope)
+        if match == Match.FULL:
+            path = getattr(candidate, "path", UNMATCHED_ROUTE)
+            if endpoint is not None and child.get("endpoint") is endpoint:
+                _route_templates[endpoint] = path
+            return path
+    return UNMATCHED_ROUTE
+
+
+# ---------------------------------------------------------------------------
+# Metric types
+# ---------------------------------------------------------------------------
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+                  for labels, value in sorted(self.values.items())]
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (non-cumulative, last one is +Inf), sum]
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+# (name, help, type, [(labels dict, value), ...]) produced by a collector at scrape time
+Sample = Tuple[str, str, str, Iterable[Tuple[Dict[str, str], float]]]
+
+
+class Registry:
+    """HTTP request metrics plus collector callbacks for state owned by other modules."""
+
+    def __init__(self):
+        route = ("method", "route")
+        self.requests = Counter("http_requests_total", "HTTP requests by route and status code.",
+                                ("method", "route", "status"))
+        self.exceptions = Counter("http_request_exceptions_total", "Requests that raised an unhandled exception.",
+                                  route)
+        self.in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served.", ("method",))
+        self.latency = Histogram("http_request_duration_seconds", "Time to the last byte of the response.",
+                                 route, LATENCY_BUCKETS)
+        self.size = Histogram("http_response_size_bytes", "Response body size.", route, SIZE_BUCKETS)
+        self.db_time = Histogram("http_request_db_seconds", "Time spent in database calls per request.",
+                                 route, LATENCY_BUCKETS)
+        self.db_queries = Histogram("http_request_db_queries", "SQL statements executed per request.",
+                                    route, QUERY_BUCKETS)
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self.started = time.time()
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Register `collector()`, called on every scrape to report gauges it owns."""
+        self._collectors.append(collector)
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int,
+                stats: RequestStats, failed: bool) -> None:
+        labels = (method, route)
+        self.requests.inc((method, route, str(status)))
+        if failed:
+            self.exceptions.inc(labels)
+        self.latency.observe(labels, seconds)
+        self.size.observe(labels, size)
+        self.db_time.observe(labels, stats.db_time)
+        self.db_queries.observe(labels, stats.queries)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (self.requests, self.exceptions, self.in_flight, self.latency, self.size,
+                       self.db_time, self.db_queries):
+            lines += metric.render()
+        lines += ["# HELP process_start_time_seconds Start time of the process since the epoch.",
+                  "# TYPE process_start_time_seconds gauge",
+                  f"process_start_time_seconds {self.started}"]
+        for collector in self._collectors:
+            for name, help, kind, samples in collector():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+class MetricsMiddleware:
+    """ASGI middleware that times every HTTP request and records it in `registry`."""
+
+    def __init__(self, app, registry: Registry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = RequestStats(scope)
+        token = _current_request.set(stats)
+        in_flight = self.registry.in_flight
+        in_flight.inc((method,))
+        status, size, failed = 500, 0, False
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec((method,))
+            _current_request.reset(token)
+            self.registry.observe(method, route_label(scope), status, elapsed, size, stats, failed)
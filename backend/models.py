@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import date
-from typing import Optional
+from typing import Any, Literal, Optional
 from enum import Enum
 
 class EmployeeCreate(BaseModel):
@@ -53,6 +53,14 @@ class PurchaseCreate(BaseModel):
     items: list[PurchaseItemCreate]
 
 
+class PurchaseBatchCreate(BaseModel):
+    # "atomic": all documents or none; "best_effort": skip the ones that fail.
+    # Documents are validated one by one as PurchaseCreate by the endpoint, so
+    # a malformed one fails on its own instead of rejecting the whole body.
+    mode: Literal["atomic", "best_effort"] = "atomic"
+    documents: list[Any] = Field(min_length=1, max_length=1000)
+
+
 class PurchaseItemResponse(BaseModel):
     id: int
     product_id: int
@@ -87,6 +95,12 @@ class SaleCreate(BaseModel):
     items: list[SaleItemCreate]
 
 
+class SaleBatchCreate(BaseModel):
+    # Documents are validated one by one as SaleCreate (see PurchaseBatchCreate)
+    mode: Literal["atomic", "best_effort"] = "atomic"
+    documents: list[Any] = Field(min_length=1, max_length=1000)
+
+
 class SaleItemResponse(BaseModel):
     id: int
     product_id: int
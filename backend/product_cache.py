@@ -0,0 +1,82 @@
+"""
+Product Catalog Cache
+
+Keeps the product table in memory, indexed by id, so order entry and product
+lookups resolve names and default prices without a database round trip. The
+catalog is loaded on first use and dropped whenever a committed write touches
+the products table; the next lookup reloads it.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from database import add_change_listener, list_all_products
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ProductCatalog:
+    """Process-local, id-indexed copy of the products table."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (products by id, products in list_all_products() order), or None if not loaded
+        self._data: Optional[Tuple[Dict[int, Dict[str, Any]], List[Dict[str, Any]]]] = None
+        # Bumped on every invalidation so a load that raced a write is not kept
+        self._generation = 0
+        self._hits = 0
+        self._loads = 0
+
+    def _snapshot(self) -> Tuple[Dict[int, Dict[str, Any]], List[Dict[str, Any]]]:
+        with self._lock:
+            if self._data is not None:
+                self._hits += 1
+                return self._data
+            generation = self._generation
+
+        rows = list_all_products()
+        data = ({row["id"]: row for row in rows}, rows)
+        with self._lock:
+            self._loads += 1
+            if generation == self._generation:
+                self._data = data
+        return data
+
+    def get(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """Return a copy of one product, or None if it does not exist."""
+        product = self._snapshot()[0].get(product_id)
+        return dict(product) if product else None
+
+    def get_many(self, product_ids) -> Dict[int, Dict[str, Any]]:
+        """Return copies of the requested products that exist, keyed by id."""
+        by_id = self._snapshot()[0]
+        return {pid: dict(by_id[pid]) for pid in product_ids if pid in by_id}
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Return copies of all products ordered by name."""
+        return [dict(p) for p in self._snapshot()[1]]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data = None
+
+    def on_change(self, tables: Set[str]) -> None:
+        if "products" in tables:
+            self.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loaded": self._data is not None,
+                "products": len(self._data[0]) if self._data else 0,
+                "hits": self._hits,
+                "loads": self._loads,
+                "generation": self._generation,
+            }
+
+
+catalog = ProductCatalog()
+add_change_listener(catalog.on_change)
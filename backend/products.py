@@ -9,12 +9,11 @@ import re
 from typing import Optional, List, Dict, Any
 from database import (
     create_product as db_create_product,
-    get_product_by_id,
     update_product as db_update_product,
     delete_product as db_delete_product,
-    list_all_products,
     get_db_connection
 )
+from product_cache import catalog
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -67,10 +66,20 @@ def append_product(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
 
 def find_product_row(product_id: int) -> Optional[int]:
     """Find product row number by ID"""
-    product = get_product_by_id(product_id)
+    product = catalog.get(product_id)
     return product["id"] if product else None
 
 
+def get_product(product_id: int) -> Optional[Dict[str, Any]]:
+    """Get a product by ID from the in-memory catalog"""
+    return catalog.get(product_id)
+
+
+def get_products(product_ids) -> Dict[int, Dict[str, Any]]:
+    """Get several products by ID from the in-memory catalog, keyed by ID"""
+    return catalog.get_many(product_ids)
+
+
 def update_product(product_id: int, updates: Dict[str, Any]) -> bool:
     """Update product"""
     try:
@@ -96,8 +105,7 @@ def delete_product(product_id: int) -> bool:
 def list_products() -> List[Dict[str, Any]]:
     """List all products"""
     try:
-        products = list_all_products()
-        return products
+        return catalog.list()
     except Exception as e:
         logger.error(f"Failed to list products: {e}")
         return []
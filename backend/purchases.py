@@ -8,6 +8,7 @@ import logging
 from typing import Optional, List, Dict, Any
 from database import (
     create_purchase as db_create_purchase,
+    create_documents_batch,
     get_purchase_by_id,
     list_all_purchases,
     update_purchase as db_update_purchase,
@@ -36,6 +37,17 @@ def create_purchase(vendor_name: str, invoice_number: str, purchase_date: str,
         raise
 
 
+def create_purchases_batch(purchases: List[Dict[str, Any]], atomic: bool = True) -> List[Dict[str, Any]]:
+    """Create many purchase orders in one transaction"""
+    try:
+        results = create_documents_batch("purchase", purchases, atomic=atomic)
+        logger.info(f"Purchase batch created: {sum('id' in r for r in results)} of {len(purchases)}")
+        return results
+    except Exception as e:
+        logger.error(f"Failed to create purchase batch: {e}")
+        raise
+
+
 def find_purchase_row(purchase_id: int) -> Optional[int]:
     """Find purchase by ID"""
     purchase = get_purchase_by_id(purchase_id)
@@ -0,0 +1,148 @@
+"""
+Report Result Cache
+
+Keeps recently computed report results in memory, keyed by report and
+parameters and tagged with the data generation they were computed at. Every
+committed write bumps the generation (see database.get_data_generation), so
+an entry is served only while nothing has been written since it was
+computed. That includes commits from other processes (other uvicorn workers,
+`python rollups.py rebuild`, generate_data.py), which the generation picks up
+through PRAGMA data_version. Entries are evicted least-recently-used once either the entry
+count or the approximate memory cap is exceeded.
+"""
+
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Hashable
+
+from database import get_data_generation
+from db_executor import run_read
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+REPORT_CACHE_MAX_ENTRIES = int(os.environ.get("REPORT_CACHE_MAX_ENTRIES", "256"))
+REPORT_CACHE_MAX_BYTES = int(os.environ.get("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Rows of a list or tuple sized by estimate_size(); the rest are assumed alike
+_SIZE_SAMPLE = 16
+
+_MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a report result.
+
+    Containers are sized from an evenly spread sample of their items, so the
+    cost does not grow with the number of rows; put() runs on the event loop.
+    """
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return sys.getsizeof(value)
+        step = max(1, len(value) // _SIZE_SAMPLE)
+        sample = value[::step][:_SIZE_SAMPLE]
+        return sys.getsizeof(value) + len(value) * sum(map(estimate_size, sample)) // len(sample)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class ReportCache:
+    """A thread-safe LRU of report results validated by data generation.
+
+    Cached values are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (generation, value, size)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+
+        # Counters
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, generation: int) -> Any:
+        """Return the cached value for `key` if it is current, else the _MISSING sentinel."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            if entry is not None:
+                self._stale += 1
+                self._drop(key)
+            self._misses += 1
+            return _MISSING
+
+    def put(self, key: Hashable, generation: int, value: Any) -> None:
+        """Store `value` computed at `generation`, evicting LRU entries over the caps."""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                if self._entries[key][0] > generation:
+                    # A newer result was stored while this one was computed
+                    return
+                self._drop(key)
+            self._entries[key] = (generation, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size, hit/miss and eviction counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "evictions": self._evictions,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else None,
+            }
+
+
+report_cache = ReportCache(REPORT_CACHE_MAX_ENTRIES, REPORT_CACHE_MAX_BYTES)
+
+
+async def cached_report(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Await `func(*args, **kwargs)` on the read lane, reusing a current cached result.
+
+    The key includes today's date because reports default their date
+    windows to "today".
+    """
+    key = (func.__name__, date.today().isoformat(), args, tuple(sorted(kwargs.items())))
+    # Read before computing: a write that lands mid-computation makes the entry stale
+    generation = get_data_generation()
+    value = report_cache.get(key, generation)
+    if value is _MISSING:
+        value = await run_read(func, *args, **kwargs)
+        report_cache.put(key, generation, value)
+    return value
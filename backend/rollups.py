@@ -0,0 +1,203 @@
+"""
+Daily Sales/Purchase Rollups
+
+Per-day totals (amount, quantity, invoice count) and per-day x product totals
+for sales and purchases. Write paths add or subtract a document's
+contribution inside the same transaction that changes the document, so
+the summary reports read a handful of rows per month instead of
+re-aggregating every invoice line.
+
+Regenerate the tables from raw data (from backend/):
+    python rollups.py rebuild
+"""
+
+import argparse
+import logging
+import sqlite3
+import sys
+from typing import Any, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# kind -> (header table, item table, item foreign key, date column, day table, day x product table)
+_KINDS = {
+    "sale": ("sales", "sale_items", "sale_id", "sale_date", "daily_sales", "daily_product_sales"),
+    "purchase": ("purchases", "purchase_items", "purchase_id", "purchase_date", "daily_purchases", "daily_product_purchases"),
+}
+
+ROLLUP_TABLES = ("daily_sales", "daily_product_sales", "daily_purchases", "daily_product_purchases")
+
+
+def create_rollup_tables(conn: sqlite3.Connection) -> None:
+    for kind in _KINDS.values():
+        day_table, product_table = kind[4], kind[5]
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {day_table} (
+                day TEXT PRIMARY KEY,
+                amount REAL NOT NULL DEFAULT 0,
+                quantity REAL NOT NULL DEFAULT 0,
+                invoice_count INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {product_table} (
+                day TEXT NOT NULL,
+                product_id INTEGER NOT NULL,
+                quantity REAL NOT NULL DEFAULT 0,
+                amount REAL NOT NULL DEFAULT 0,
+                line_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, product_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{product_table}_product ON {product_table}(product_id, day)")
+
+
+def record_document(conn: sqlite3.Connection, kind: str, document_id: int, sign: int) -> Optional[Dict[str, Any]]:
+    """Add (sign=1) or remove (sign=-1) one sale or purchase's contribution.
+
+    Reads the document as it currently is, so call it with -1 before a
+    document is changed or deleted and with +1 after it is created or changed.
+    Returns the signed contribution (see document_range_contributions), or
+    None if the document does not exist.
+    """
+    header, items, fk, date_column, day_table, product_table = _KINDS[kind]
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT substr({date_column}, 1, 10), COALESCE(total_amount, 0) FROM {header} WHERE id = ?",
+                   (document_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    day, amount = row[0], row[1]
+
+    cursor.execute(f"""
+        SELECT product_id, COALESCE(SUM(quantity), 0), COALESCE(SUM(total_price), 0), COUNT(*)
+        FROM {items} WHERE {fk} = ? GROUP BY product_id
+    """, (document_id,))
+    lines = cursor.fetchall()
+    quantity = sum(line[1] for line in lines)
+
+    cursor.execute(f"""
+        INSERT INTO {day_table} (day, amount, quantity, invoice_count) VALUES (?, ?, ?, ?)
+        ON CONFLICT(day) DO UPDATE SET
+            amount = amount + excluded.amount,
+            quantity = quantity + excluded.quantity,
+            invoice_count = invoice_count + excluded.invoice_count
+    """, (day, sign * amount, sign * quantity, sign))
+    cursor.executemany(f"""
+        INSERT INTO {product_table} (day, product_id, quantity, amount, line_count) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(day, product_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            amount = amount + excluded.amount,
+            line_count = line_count + excluded.line_count
+    """, [(day, line[0], sign * line[1], sign * line[2], sign * line[3]) for line in lines])
+
+    if sign < 0:
+        cursor.execute(f"DELETE FROM {day_table} WHERE day = ? AND invoice_count <= 0", (day,))
+        cursor.execute(f"DELETE FROM {product_table} WHERE day = ? AND line_count <= 0", (day,))
+    return {"kind": kind, "day": day, "amount": sign * amount, "invoices": sign,
+            "lines": [(line[0], sign * line[1], sign * line[2], sign * line[3]) for line in lines]}
+
+
+def record_document_range(conn: sqlite3.Connection, kind: str, first_id: int, last_id: int) -> None:
+    """Add the contribution of every document with first_id <= id <= last_id.
+
+    Set-based counterpart of record_document(kind, id, 1) for bulk imports,
+    where the documents were just inserted with consecutive ids.
+    """
+    header, items, fk, date_column, day_table, product_table = _KINDS[kind]
+    conn.execute(f"""
+        INSERT INTO {day_table} (day, amount, quantity, invoice_count)
+        SELECT substr(h.{date_column}, 1, 10), COALESCE(SUM(h.total_amount), 0),
+               COALESCE(SUM(i.quantity), 0), COUNT(*)
+        FROM {header} h
+        LEFT JOIN (SELECT {fk}, SUM(quantity) AS quantity FROM {items}
+                   WHERE {fk} BETWEEN ? AND ? GROUP BY {fk}) i ON i.{fk} = h.id
+        WHERE h.id BETWEEN ? AND ?
+        GROUP BY 1
+        ON CONFLICT(day) DO UPDATE SET
+            amount = amount + excluded.amount,
+            quantity = quantity + excluded.quantity,
+            invoice_count = invoice_count + excluded.invoice_count
+    """, (first_id, last_id, first_id, last_id))
+    conn.execute(f"""
+        INSERT INTO {product_table} (day, product_id, quantity, amount, line_count)
+        SELECT substr(h.{date_column}, 1, 10), i.product_id, COALESCE(SUM(i.quantity), 0),
+               COALESCE(SUM(i.total_price), 0), COUNT(*)
+        FROM {items} i
+        JOIN {header} h ON h.id = i.{fk}
+        WHERE i.{fk} BETWEEN ? AND ?
+        GROUP BY 1, 2
+        ON CONFLICT(day, product_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            amount = amount + excluded.amount,
+            line_count = line_count + excluded.line_count
+    """, (first_id, last_id))
+
+
+def document_range_contributions(conn: sqlite3.Connection, kind: str, first_id: int,
+                                 last_id: int) -> List[Dict[str, Any]]:
+    """Per-day contribution of the documents with first_id <= id <= last_id.
+
+    Each is {"kind", "day", "amount", "invoices", "lines"} with lines as
+    (product_id, quantity, amount, line count), the same shape
+    record_document() returns for a single document.
+    """
+    header, items, fk, date_column, day_table, product_table = _KINDS[kind]
+    days: Dict[str, Dict[str, Any]] = {}
+    for day, amount, invoices in conn.execute(f"""
+        SELECT substr({date_column}, 1, 10), COALESCE(SUM(total_amount), 0), COUNT(*)
+        FROM {header} WHERE id BETWEEN ? AND ? GROUP BY 1
+    """, (first_id, last_id)):
+        days[day] = {"kind": kind, "day": day, "amount": amount, "invoices": invoices, "lines": []}
+    for day, product_id, quantity, amount, count in conn.execute(f"""
+        SELECT substr(h.{date_column}, 1, 10), i.product_id, COALESCE(SUM(i.quantity), 0),
+               COALESCE(SUM(i.total_price), 0), COUNT(*)
+        FROM {items} i
+        JOIN {header} h ON h.id = i.{fk}
+        WHERE i.{fk} BETWEEN ? AND ?
+        GROUP BY 1, 2
+    """, (first_id, last_id)):
+        days[day]["lines"].append((product_id, quantity, amount, count))
+    return list(days.values())
+
+
+def rebuild_rollups(conn: sqlite3.Connection) -> None:
+    """Regenerate all rollup tables from the raw sales and purchases."""
+    create_rollup_tables(conn)
+    for header, items, fk, date_column, day_table, product_table in _KINDS.values():
+        conn.execute(f"DELETE FROM {day_table}")
+        conn.execute(f"""
+            INSERT INTO {day_table} (day, amount, quantity, invoice_count)
+            SELECT substr(h.{date_column}, 1, 10), COALESCE(SUM(h.total_amount), 0),
+                   COALESCE(SUM(i.quantity), 0), COUNT(*)
+            FROM {header} h
+            LEFT JOIN (SELECT {fk}, SUM(quantity) AS quantity FROM {items} GROUP BY {fk}) i ON i.{fk} = h.id
+            GROUP BY 1
+        """)
+        conn.execute(f"DELETE FROM {product_table}")
+        conn.execute(f"""
+            INSERT INTO {product_table} (day, product_id, quantity, amount, line_count)
+            SELECT substr(h.{date_column}, 1, 10), i.product_id, COALESCE(SUM(i.quantity), 0),
+                   COALESCE(SUM(i.total_price), 0), COUNT(*)
+            FROM {items} i
+            JOIN {header} h ON h.id = i.{fk}
+            GROUP BY 1, 2
+        """)
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description="Maintain the daily sales/purchase rollup tables.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from database import DB_PATH, rebuild_rollup_tables, close_db_pools
+    logger.info(f"Rebuilding rollups in {DB_PATH}")
+    rebuild_rollup_tables()
+    close_db_pools()
+    logger.info("Rollups rebuilt")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
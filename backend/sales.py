@@ -8,6 +8,7 @@ import logging
 from typing import Optional, List, Dict, Any
 from database import (
     create_sale as db_create_sale,
+    create_documents_batch,
     get_sale_by_id,
     list_all_sales,
     delete_sale as db_delete_sale
@@ -36,6 +37,17 @@ def create_sale(customer_name: str, invoice_number: str, sale_date: str,
         raise
 
 
+def create_sales_batch(sales: List[Dict[str, Any]], atomic: bool = True) -> List[Dict[str, Any]]:
+    """Create many sale orders in one transaction"""
+    try:
+        results = create_documents_batch("sale", sales, atomic=atomic)
+        logger.info(f"Sale batch created: {sum('id' in r for r in results)} of {len(sales)}")
+        return results
+    except Exception as e:
+        logger.error(f"Failed to create sale batch: {e}")
+        raise
+
+
 def find_sale_row(sale_id: int) -> Optional[int]:
     """Find sale by ID"""
     sale = get_sale_by_id(sale_id)
@@ -0,0 +1,304 @@
+"""
+SQL Statement Profiler
+
+Opt-in per-statement profiling for the data-access layer (SQL_PROFILE=1, or
+POST /debug/sql-profile?enabled=true at runtime). Every statement reported by
+the sqlite3 trace callback is normalized (literals and bound NULLs become ?,
+IN lists and multi-row VALUES collapse) and aggregated per statement,
+calling database.py function and HTTP route template: count, total and max
+time, rows and SQLite VM steps.
+
+A statement's time runs from its trace callback until the next statement on
+the same thread or until the connection goes back to the pool, so it
+includes stepping through and converting its rows. Rows are the rows fetched
+through the connection's row factory plus the rows it changed; VM steps come
+from the progress handler. Only connections checked out through
+get_db_connection or running a write job are timed; other statements (e.g.
+the writer's BEGIN/COMMIT, iter_query) are counted only.
+
+assert_max_queries() is the test helper: it fails when a request made inside
+the block runs more statements than allowed, to catch N+1 query patterns.
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from metrics import RequestStats, current_request
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SQL_PROFILE = os.environ.get("SQL_PROFILE", "0") == "1"
+# SQLite VM instructions between progress handler calls
+SQL_PROFILE_STEPS = int(os.environ.get("SQL_PROFILE_STEPS", "1000"))
+
+SORT_KEYS = ("total_ms", "count", "max_ms", "avg_ms", "rows", "vm_steps")
+NO_REQUEST = "(no request)"
+OUTSIDE_DATABASE = "(outside database.py)"
+
+_BLOB = re.compile(r"\b[xX]'[0-9a-fA-F]*'")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?")
+# A NULL bound parameter, but not the IS [NOT] NULL operator
+_NULL = re.compile(r"(?<!\bIS )(?<!\bNOT )\bNULL\b", re.IGNORECASE)
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_SPACE = re.compile(r"\s+")
+# Transaction control and connection setup; not counted by assert_max_queries
+_CONTROL = re.compile(r"\s*(BEGIN|COMMIT|END|ROLLBACK|SAVEPOINT|RELEASE|PRAGMA)\b", re.IGNORECASE)
+# database.py frames that only pass statements through
+_PASS_THROUGH = {"get_db_connection", "_run_write", "_trace_statement"}
+
+
+@lru_cache(maxsize=4096)
+def normalize_sql(sql: str) -> str:
+    """Statement text with literal values replaced by ?, e.g. "SELECT * FROM sales WHERE id = ?"."""
+    sql = _BLOB.sub("?", sql)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _NULL.sub("?", sql)
+    sql = _VALUES_ROWS.sub(r"\1, ...", sql)
+    sql = _IN_LIST.sub("IN (?, ...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def _caller() -> str:
+    """The database.py function running the statement, as "outer > inner" when nested."""
+    frame = sys._getframe(1)
+    inner = outer = None
+    while frame is not None:
+        code = frame.f_code
+        if os.path.basename(code.co_filename) == "database.py":
+            # Write jobs are closures; name them after the function that defines them
+            name = code.co_qualname.split(".<locals>", 1)[0]
+            if name not in _PASS_THROUGH:
+                outer = name
+                if inner is None:
+                    inner = name
+        frame = frame.f_back
+    if inner is None:
+        return OUTSIDE_DATABASE
+    return outer if inner == outer else f"{outer} > {inner}"
+
+
+class _Entry:
+    __slots__ = ("count", "timed", "total_time", "max_time", "rows", "steps")
+
+    def __init__(self):
+        self.count = 0
+        self.timed = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.rows = 0
+        self.steps = 0
+
+
+class QueryCapture:
+    """Statements executed while the capture is active, grouped by request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # id(RequestStats) or None -> (stats, normalized statements)
+        self._requests: Dict[Optional[int], Tuple[Optional[RequestStats], List[str]]] = {}
+
+    def add(self, stats: Optional[RequestStats], sql: str) -> None:
+        if _CONTROL.match(sql):
+            return
+        key = id(stats) if stats is not None else None
+        with self._lock:
+            entry = self._requests.get(key)
+            if entry is None:
+                entry = self._requests[key] = (stats, [])
+            entry[1].append(normalize_sql(sql))
+
+    def requests(self) -> List[Tuple[str, List[str]]]:
+        """(route, statements) per captured request; statements outside a request form one entry."""
+        with self._lock:
+            return [(stats.route if stats is not None else NO_REQUEST, list(statements))
+                    for stats, statements in self._requests.values()]
+
+
+class SQLProfiler:
+    """Aggregates statement timings per (statement, database.py function, route)."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.since = datetime.now()
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str, str], _Entry] = {}
+        self._captures: List[QueryCapture] = []
+        self._local = threading.local()
+
+    def enable(self, enabled: bool = True) -> None:
+        if enabled and not self.enabled:
+            logger.info("SQL profiler enabled")
+        self.enabled = enabled
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.since = datetime.now()
+
+    # ------------------------------------------------------------------
+    # Connection tracking (called by database.get_db_connection and write jobs)
+    # ------------------------------------------------------------------
+
+    def attach(self, conn) -> None:
+        """Start timing statements run on `conn` from this thread; pair with detach()."""
+        local = self._local
+        attached = getattr(local, "attached", None)
+        if attached is None:
+            attached = local.attached = []
+            local.rows = local.steps = 0
+            local.open = None
+        if attached and attached[-1][0] is conn:
+            attached[-1][1] += 1
+            return
+        factory = conn.row_factory
+
+        def counting_row(cursor, row):
+            local.rows += 1
+            return factory(cursor, row) if factory is not None else row
+
+        def progress():
+            local.steps += 1
+            return 0
+
+        conn.row_factory = counting_row
+        conn.set_progress_handler(progress, SQL_PROFILE_STEPS)
+        attached.append([conn, 1, factory])
+
+    def detach(self, conn) -> None:
+        local = self._local
+        attached = getattr(local, "attached", None)
+        if not attached or attached[-1][0] is not conn:
+            return
+        entry = attached[-1]
+        entry[1] -= 1
+        if entry[1]:
+            return
+        if local.open is not None:
+            self._close(local, time.perf_counter())
+        attached.pop()
+        conn.row_factory = entry[2]
+        conn.set_progress_handler(None, 0)
+
+    def on_statement(self, sql: str) -> None:
+        """database.py statement hook."""
+        if not self.enabled and not self._captures:
+            # Anything still open is closed when its connection is detached
+            return
+        local = self._local
+        if getattr(local, "open", None) is not None:
+            self._close(local, time.perf_counter())
+        stats = current_request()
+        for capture in list(self._captures):
+            capture.add(stats, sql)
+        if not self.enabled:
+            return
+        key = (normalize_sql(sql), _caller(), stats.route if stats is not None else NO_REQUEST)
+        attached = getattr(local, "attached", None)
+        if attached:
+            conn = attached[-1][0]
+            local.open = (key, local.rows, local.steps, conn.total_changes, conn, time.perf_counter())
+        else:
+            self._add(key, None, 0, 0)
+
+    def _close(self, local, now: float) -> None:
+        key, rows, steps, changes, conn, started = local.open
+        local.open = None
+        rows = local.rows - rows + max(0, conn.total_changes - changes)
+        self._add(key, now - started, rows, (local.steps - steps) * SQL_PROFILE_STEPS)
+
+    def _add(self, key: Tuple[str, str, str], elapsed: Optional[float], rows: int, steps: int) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            entry.count += 1
+            entry.rows += rows
+            entry.steps += steps
+            if elapsed is not None:
+                entry.timed += 1
+                entry.total_time += elapsed
+                entry.max_time = max(entry.max_time, elapsed)
+
+    # ------------------------------------------------------------------
+    # Reporting and captures
+    # ------------------------------------------------------------------
+
+    def report(self, limit: int = 50, sort: str = "total_ms") -> Dict[str, Any]:
+        """The `limit` hottest statements by `sort`, plus totals."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Invalid sort '{sort}', expected one of: {', '.join(SORT_KEYS)}")
+        with self._lock:
+            items = list(self._entries.items())
+        statements = [
+            {
+                "sql": sql,
+                "function": function,
+                "route": route,
+                "count": entry.count,
+                "total_ms": round(entry.total_time * 1000, 3),
+                "avg_ms": round(entry.total_time / entry.timed * 1000, 3) if entry.timed else 0.0,
+                "max_ms": round(entry.max_time * 1000, 3),
+                "rows": entry.rows,
+                "vm_steps": entry.steps,
+            }
+            for (sql, function, route), entry in items
+        ]
+        statements.sort(key=lambda s: s[sort], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "since": self.since.isoformat(timespec="seconds"),
+            "statements_executed": sum(s["count"] for s in statements),
+            "total_ms": round(sum(s["total_ms"] for s in statements), 3),
+            "distinct": len(statements),
+            "statements": statements[:max(0, limit)],
+        }
+
+    @contextmanager
+    def capture(self) -> Iterator[QueryCapture]:
+        """Record the statements of every request made inside the block."""
+        capture = QueryCapture()
+        self._captures.append(capture)
+        try:
+            yield capture
+        finally:
+            self._captures.remove(capture)
+
+
+profiler = SQLProfiler(enabled=SQL_PROFILE)
+
+
+@contextmanager
+def assert_max_queries(limit: int, route: Optional[str] = None) -> Iterator[QueryCapture]:
+    """Fail if a request made inside the block runs more than `limit` SQL statements.
+
+        with assert_max_queries(3):
+            client.get("/sales/")
+
+    Requests are told apart through metrics.MetricsMiddleware, so go through
+    main.app; statements run outside any request (e.g. calling list_all_sales
+    directly) count as one request. Transaction control and PRAGMA
+    statements are not counted. With `route`, only requests for that route
+    template (e.g. "/sales/{sale_id}") are checked.
+    """
+    with profiler.capture() as capture:
+        yield capture
+    for label, statements in capture.requests():
+        if route is not None and label != route:
+            continue
+        if len(statements) > limit:
+            repeated = "\n".join(f"  {count} x {sql}" for sql, count in Counter(statements).most_common(5))
+            raise AssertionError(f"{label} ran {len(statements)} SQL statements, expected at most {limit}:\n"
+                                 f"{repeated}")
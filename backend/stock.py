@@ -9,7 +9,8 @@ from typing import Optional, List, Dict, Any
 from database import (
     get_stock as db_get_stock,
     list_all_stock as db_list_all_stock,
-    get_low_stock_alerts as db_get_low_stock_alerts
+    get_low_stock_alerts as db_get_low_stock_alerts,
+    get_stock_as_of as db_get_stock_as_of
 )
 
 logging.basicConfig(level=logging.INFO)
@@ -44,3 +45,12 @@ def get_low_stock_alerts() -> List[Dict[str, Any]]:
     except Exception as e:
         logger.error(f"Failed to get low stock alerts: {e}")
         return []
+
+
+def get_stock_as_of(as_of_date: str) -> List[Dict[str, Any]]:
+    """Get every product's stock balance as of a date"""
+    try:
+        return db_get_stock_as_of(as_of_date)
+    except Exception as e:
+        logger.error(f"Failed to get stock as of {as_of_date}: {e}")
+        return []
@@ -0,0 +1,193 @@
+"""
+Live Stock Events
+
+Publishes stock changes to dashboards over Server-Sent Events (GET
+/events/stock), so they no longer have to poll /stock/ and
+/stock/alerts/low-stock to notice them. Events come from the "stock" events
+apply_stock_movements() (and so update_stock()) publishes on commit:
+
+    stock      {"product_id", "product_name", "available_stock", "change",
+                "reorder_point", "date"} for every product whose stock changed
+    low_stock  the same plus "shortage", when a product drops below its
+               reorder point
+    restocked  the same, when it gets back to its reorder point or above
+    resync     {"reason"}: the client missed events (or products were
+               created, changed or deleted) and should refetch the full lists
+
+Each event is encoded once, kept in a bounded history and handed to every
+connected client from there, so fan-out costs one frame per client and
+memory does not grow with the number of clients. A client that reads
+slower than events arrive (the response's send() blocks while its socket
+is full) falls behind in the history rather than buffering; once the
+events it needs have been dropped it gets a resync and continues from the
+latest event. A reconnecting client resumes after its Last-Event-ID while
+that event is still in the history, and gets a resync otherwise (event ids
+are only valid for this process).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from itertools import islice
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from database import add_event_listener
+from fast_json import dumps
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Events kept for resuming and for clients that fall behind
+STOCK_EVENTS_HISTORY = int(os.environ.get("STOCK_EVENTS_HISTORY", "1000"))
+# Seconds between keep-alive comments on an idle stream
+STOCK_EVENTS_HEARTBEAT = float(os.environ.get("STOCK_EVENTS_HEARTBEAT", "15"))
+# Reconnect delay suggested to clients, in milliseconds
+STOCK_EVENTS_RETRY_MS = 3000
+
+
+def _frame(event_id: str, event_type: str, data: Dict[str, Any]) -> bytes:
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode(), event_type.encode(), dumps(data))
+
+
+def stock_events(event: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """(type, data) stream events for one "stock" database event."""
+    events = []
+    for product_id, balance in event["balances"].items():
+        change = event["deltas"].get(product_id, 0)
+        name, reorder_point = event["products"].get(product_id, (None, None))
+        data = {"product_id": product_id, "product_name": name, "available_stock": balance,
+                "change": change, "reorder_point": reorder_point, "date": event["date"]}
+        events.append(("stock", data))
+        if reorder_point is None or not change:
+            continue
+        was_low = balance - change < reorder_point
+        is_low = balance < reorder_point
+        if is_low and not was_low:
+            events.append(("low_stock", {**data, "shortage": reorder_point - balance}))
+        elif was_low and not is_low:
+            events.append(("restocked", data))
+    return events
+
+
+class StockEventBroadcaster:
+    """Fans committed stock events out to any number of SSE streams."""
+
+    def __init__(self, history: int = STOCK_EVENTS_HISTORY, heartbeat: float = STOCK_EVENTS_HEARTBEAT):
+        self.heartbeat = heartbeat
+        self._lock = threading.Lock()
+        self._boot = os.urandom(4).hex()
+        # (sequence number, encoded frame), oldest first
+        self._history: Deque[Tuple[int, bytes]] = deque(maxlen=max(1, history))
+        self._last = 0
+        # One wake-up event per connected stream, all on self._loop
+        self._streams: Set[asyncio.Event] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._resyncs = 0
+
+    # ------------------------------------------------------------------
+    # Publishing (writer thread)
+    # ------------------------------------------------------------------
+
+    def publish(self, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Append (type, data) events to the history and wake the streams."""
+        if not events:
+            return
+        with self._lock:
+            for event_type, data in events:
+                self._last += 1
+                self._history.append((self._last, _frame(f"{self._boot}-{self._last}", event_type, data)))
+        loop = self._loop
+        if loop is not None and self._streams:
+            try:
+                loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                pass  # event loop already closed
+
+    def on_events(self, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """database.py event listener."""
+        published = []
+        for event_type, data in events:
+            if event_type == "stock":
+                published += stock_events(data)
+            elif event_type == "products":
+                published.append(("resync", {"reason": "products changed"}))
+        self.publish(published)
+
+    def _wake(self) -> None:
+        for wake in self._streams:
+            wake.set()
+
+    # ------------------------------------------------------------------
+    # Streaming (event loop)
+    # ------------------------------------------------------------------
+
+    def _resume_point(self, last_event_id: Optional[str]) -> Tuple[int, bool]:
+        """Sequence number to continue after, and whether the client must resync first."""
+        with self._lock:
+            last = self._last
+            oldest = self._history[0][0] if self._history else last + 1
+        if last_event_id is None:
+            return last, False
+        boot, _, number = last_event_id.partition("-")
+        if boot == self._boot and number.isdigit() and oldest - 1 <= int(number) <= last:
+            return int(number), False
+        return last, True
+
+    def _since(self, position: int) -> Tuple[List[bytes], int, bool]:
+        """Frames after `position`, the new position and whether events in between were dropped."""
+        with self._lock:
+            if position >= self._last:
+                return [], position, False
+            oldest = self._history[0][0]
+            missed = position < oldest - 1
+            start = 0 if missed else position - oldest + 1
+            frames = [frame for _, frame in islice(self._history, start, None)]
+            return frames, self._last, missed
+
+    def _resync(self, position: int) -> bytes:
+        self._resyncs += 1
+        return _frame(f"{self._boot}-{position}", "resync", {"reason": "missed events"})
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """SSE body for one client; pass the request's Last-Event-ID header to resume."""
+        self._loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        self._streams.add(wake)
+        try:
+            position, missed = self._resume_point(last_event_id)
+            yield b"retry: %d\n\n" % STOCK_EVENTS_RETRY_MS
+            if missed:
+                yield self._resync(position)
+            while True:
+                wake.clear()
+                frames, end, missed = self._since(position)
+                if missed:
+                    # Fell behind the history: skip to the latest event
+                    frames = [self._resync(end)]
+                    logger.info("Stock event stream fell behind; sent resync")
+                if frames:
+                    position = end
+                    yield b"".join(frames)
+                    continue
+                try:
+                    await asyncio.wait_for(wake.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+        finally:
+            self._streams.discard(wake)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": len(self._streams),
+                "last_event_id": f"{self._boot}-{self._last}",
+                "history": len(self._history),
+                "history_limit": self._history.maxlen,
+                "resyncs": self._resyncs,
+            }
+
+
+broadcaster = StockEventBroadcaster()
+add_event_listener(broadcaster.on_events)
@@ -0,0 +1,110 @@
+"""
+Tests that the state maintained incrementally on every write matches a
+recomputation from the raw tables: kpi_engine's KPIs against get_kpis(), and
+the daily_* rollup tables against rebuild_rollup_tables().
+
+Run from backend/:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="test_incremental_state_"), "test.db")
+os.environ["ENTERPRISE_DB_PATH"] = DB_PATH
+
+import database  # noqa: E402
+from kpi_engine import kpi_engine  # noqa: E402
+from rollups import ROLLUP_TABLES  # noqa: E402
+
+TODAY = date.today().isoformat()
+YESTERDAY = (date.today() - timedelta(days=1)).isoformat()
+
+
+def _item(product, quantity, unit_price):
+    return {"product_id": product["id"], "product_name": product["name"],
+            "quantity": quantity, "unit_price": unit_price}
+
+
+def _rollups():
+    with database.get_db_connection(readonly=True) as conn:
+        return {table: sorted(tuple(row) for row in conn.execute(f"SELECT * FROM {table}"))
+                for table in ROLLUP_TABLES}
+
+
+class IncrementalStateTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # database may already have been imported by another test module
+        database.DB_PATH = DB_PATH
+        database.init_db()
+        cls.rice = database.create_product("Rice", "1 kg", 10, 50)
+        cls.sugar = database.create_product("Sugar", "1 kg", 5, 40)
+        database.create_purchase("Mill", "PO-0", YESTERDAY, [_item(cls.rice, 20, 40), _item(cls.sugar, 6, 30)])
+        kpi_engine.snapshot()
+
+    @classmethod
+    def tearDownClass(cls):
+        database.close_db_pools()
+
+    def assertConsistent(self, step):
+        with self.subTest(step):
+            kpis = kpi_engine.peek()
+            self.assertIsNotNone(kpis, "engine state went stale")
+            self.assertEqual(kpis, database.get_kpis())
+            maintained = _rollups()
+            database.rebuild_rollup_tables()
+            self.assertEqual(maintained, _rollups())
+        # The rebuild marks the engine's sales figures stale; reload them so
+        # the next step checks its own events only
+        kpi_engine.snapshot()
+
+    def test_writes_keep_state_consistent(self):
+        sale = database.create_sale("Walk-in", "INV-1", TODAY, [_item(self.rice, 3, 50), _item(self.sugar, 2, 40)])
+        self.assertConsistent("create_sale")
+
+        yesterdays = database.create_sale("Walk-in", "INV-2", YESTERDAY, [_item(self.sugar, 1, 40)])
+        self.assertConsistent("create_sale yesterday")
+
+        purchase = database.create_purchase("Mill", "PO-1", TODAY, [_item(self.sugar, 4, 30)])
+        self.assertConsistent("create_purchase")
+
+        database.update_sale(sale["id"], {"items": [_item(self.rice, 12, 50)]})
+        self.assertConsistent("update_sale items")
+
+        database.update_sale(yesterdays["id"], {"sale_date": TODAY})
+        self.assertConsistent("update_sale date")
+
+        database.update_purchase(purchase["id"], {"purchase_date": YESTERDAY})
+        self.assertConsistent("update_purchase")
+
+        database.delete_sale(sale["id"])
+        self.assertConsistent("delete_sale")
+
+        database.delete_purchase(purchase["id"])
+        self.assertConsistent("delete_purchase")
+
+        results = database.create_documents_batch("sale", [
+            {"customer_name": "Walk-in", "invoice_number": "INV-3", "sale_date": TODAY,
+             "items": [_item(self.rice, 2, 50)]},
+            {"customer_name": None, "invoice_number": "INV-4", "sale_date": TODAY,
+             "items": [_item(self.sugar, 9, 40)]},
+            {"customer_name": "Walk-in", "invoice_number": "INV-5", "sale_date": YESTERDAY,
+             "items": [_item(self.sugar, 1, 40), _item(self.rice, 1, 50)]},
+        ], atomic=False)
+        self.assertEqual(["id" in result for result in results], [True, False, True])
+        self.assertConsistent("best_effort batch")
+
+        database.create_documents_batch("purchase", [
+            {"vendor_name": "Mill", "invoice_number": "PO-2", "purchase_date": TODAY,
+             "items": [_item(self.rice, 5, 40)]},
+        ], atomic=False)
+        self.assertConsistent("best_effort purchase batch")
+
+
+if __name__ == "__main__":
+    unittest.main()
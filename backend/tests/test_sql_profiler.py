@@ -0,0 +1,74 @@
+"""
+Tests for sql_profiler's assert_max_queries() and normalize_sql().
+
+Run from backend/:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="test_sql_profiler_"), "test.db")
+os.environ["ENTERPRISE_DB_PATH"] = DB_PATH
+
+import database  # noqa: E402
+from sql_profiler import assert_max_queries, normalize_sql  # noqa: E402
+
+SALES = 5
+
+
+class AssertMaxQueriesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # database may already have been imported by another test module
+        database.DB_PATH = DB_PATH
+        database.init_db()
+        product = database.create_product("Rice", "1 kg", 40, 50)
+        items = [{"product_id": product["id"], "product_name": "Rice", "quantity": 1, "unit_price": 50}]
+        for i in range(SALES):
+            database.create_sale("Walk-in", f"INV-{i}", "2026-01-01", items)
+
+    @classmethod
+    def tearDownClass(cls):
+        database.close_db_pools()
+
+    def test_list_all_sales_does_not_query_per_sale(self):
+        with assert_max_queries(2) as capture:
+            sales = database.list_all_sales()
+        self.assertEqual(len(sales), SALES)
+        self.assertTrue(all(sale["items"] for sale in sales))
+        [(_, statements)] = capture.requests()
+        self.assertEqual(len(statements), 2)
+
+    def test_fails_above_the_limit(self):
+        with self.assertRaises(AssertionError) as raised:
+            with assert_max_queries(1):
+                for sale_id in range(1, SALES + 1):
+                    database.get_sale_by_id(sale_id)
+        self.assertIn("SELECT * FROM sales WHERE id = ?", str(raised.exception))
+
+
+class NormalizeSqlTest(unittest.TestCase):
+    def test_bound_null_is_a_parameter(self):
+        with_null = "INSERT INTO sales (customer_name, notes, total_amount) VALUES ('A', NULL, 10.5)"
+        with_value = "INSERT INTO sales (customer_name, notes, total_amount) VALUES ('A', 'paid', 10.5)"
+        self.assertEqual(normalize_sql(with_null), normalize_sql(with_value))
+        self.assertEqual(normalize_sql(with_null),
+                         "INSERT INTO sales (customer_name, notes, total_amount) VALUES (?, ?, ?)")
+
+    def test_is_null_operator_is_kept(self):
+        self.assertEqual(normalize_sql("SELECT 1 FROM stock WHERE a IS NULL OR b IS NOT NULL"),
+                         "SELECT ? FROM stock WHERE a IS NULL OR b IS NOT NULL")
+
+    def test_in_lists_and_values_rows_collapse(self):
+        self.assertEqual(normalize_sql("SELECT * FROM products WHERE id IN (1, 2, 3)"),
+                         "SELECT * FROM products WHERE id IN (?, ...)")
+        self.assertEqual(normalize_sql("INSERT INTO t (a, b) VALUES (1, 2), (3, 4)"),
+                         "INSERT INTO t (a, b) VALUES (?, ?), ...")
+
+
+if __name__ == "__main__":
+    unittest.main()
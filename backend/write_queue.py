@@ -0,0 +1,326 @@
+"""
+Single-Writer Queue
+
+Serializes every database mutation onto one writer thread that owns the only
+write connection, so in-process writers never compete for SQLite's write
+lock. Jobs that queue up while a transaction is being committed are applied
+together in the next transaction (group commit). Each job runs inside its own
+SAVEPOINT, so a failing job is rolled back on its own and the caller still
+receives its individual result or exception.
+
+Jobs can record which tables they changed with `touch()` and describe what
+they changed with `emit()`; after a successful commit the union of those
+tables and the events of the committed jobs, in commit order, are passed to
+the `on_commit` callback before any caller is released, so caches are
+invalidated before a writer can read its own change back.
+
+A job raising a BaseException (KeyboardInterrupt, SystemExit...) stops the
+writer thread: the queue is closed and every job not yet resolved fails, so
+no caller is left waiting on a thread that is gone.
+"""
+
+import contextvars
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, TypeVar
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class _Job:
+    __slots__ = ("func", "context", "future", "submitted", "tables", "events")
+
+    def __init__(self, func: Callable[[sqlite3.Connection], Any]):
+        self.func = func
+        # The job runs in the submitter's context so per-request state
+        # (e.g. statement counting) follows it onto the writer thread
+        self.context = contextvars.copy_context()
+        self.future: Future = Future()
+        self.submitted = time.perf_counter()
+        self.tables: Set[str] = set()
+        self.events: List[Any] = []
+
+
+class WriteQueue:
+    """Runs write jobs on a dedicated thread and commits them in batches."""
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], max_batch: int = 64,
+                 name: str = "db-writer",
+                 on_commit: Optional[Callable[[Set[str], List[Any]], None]] = None,
+                 around_commit: Optional[Callable[[bool], None]] = None):
+        self.max_batch = max(1, max_batch)
+        self._connect = connect
+        self._on_commit = on_commit
+        # Called with False just before COMMIT, while the write lock is held,
+        # and with True right after a successful COMMIT
+        self._around_commit = around_commit
+        self._current: Optional[_Job] = None
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn: Optional[sqlite3.Connection] = None
+
+        # Counters
+        self._jobs = 0
+        self._failed = 0
+        self._batches = 0
+        self._max_batch_seen = 0
+        self._commit_time_total = 0.0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def in_writer_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    @property
+    def connection(self) -> Optional[sqlite3.Connection]:
+        """The writer's connection; only valid on the writer thread."""
+        return self._conn
+
+    def touch(self, *tables: str) -> None:
+        """Record that the running job changed `tables`; only valid on the writer thread."""
+        if self._current is not None:
+            self._current.tables.update(tables)
+
+    def emit(self, event: Any) -> None:
+        """Queue `event` for the commit callback of the running job; only valid on the writer thread.
+
+        Events of a job that fails or is rolled back are dropped.
+        """
+        if self._current is not None:
+            self._current.events.append(event)
+
+    @contextmanager
+    def savepoint(self, name: str) -> Iterator[sqlite3.Connection]:
+        """Run the block in a SAVEPOINT of the running job; only valid on the writer thread.
+
+        If the block raises, its statements are rolled back and the tables and
+        events it recorded are dropped with them before the exception
+        propagates, so a job can recover from a failed step without
+        publishing what that step emitted.
+        """
+        conn, job = self._conn, self._current
+        events, tables = (len(job.events), set(job.tables)) if job is not None else (0, set())
+        conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+            if job is not None:
+                del job.events[events:]
+                job.tables = tables
+            raise
+        conn.execute(f"RELEASE {name}")
+
+    def submit(self, func: Callable[[sqlite3.Connection], T]) -> "Future[T]":
+        """Queue `func(conn)` for the writer thread and return a future for its result."""
+        job = _Job(func)
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Write queue is closed")
+            self._queue.put(job)
+        return job.future
+
+    def run(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """Run `func(conn)` in a write transaction and wait until it is committed.
+
+        Called from the writer thread itself (i.e. from inside another job),
+        `func` runs inline as part of the current transaction.
+        """
+        if self.in_writer_thread():
+            return func(self._conn)
+        return self.submit(func).result()
+
+    def close(self, timeout: float | None = None) -> None:
+        """Finish queued jobs, then stop the writer thread and close its connection."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        if not self.in_writer_thread():
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, batch sizes and commit timings."""
+        with self._lock:
+            batches = self._batches or 1
+            jobs = self._jobs or 1
+            return {
+                "queue_depth": self._queue.qsize(),
+                "jobs": self._jobs,
+                "failed": self._failed,
+                "batches": self._batches,
+                "avg_batch_size": round(self._jobs / batches, 2),
+                "max_batch_size": self._max_batch_seen,
+                "commit_time_avg_ms": round(self._commit_time_total / batches * 1000, 3),
+                "wait_time_avg_ms": round(self._wait_time_total / jobs * 1000, 3),
+                "wait_time_max_ms": round(self._wait_time_max * 1000, 3),
+            }
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            job = self._queue.get()
+            if job is None:
+                break
+            batch = [job]
+            # Everything that queued up meanwhile joins this transaction
+            while len(batch) < self.max_batch:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            try:
+                self._apply(batch)
+            except BaseException as e:
+                self._abort(batch, e)
+                raise
+
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _apply(self, batch: List[_Job]) -> None:
+        started = time.perf_counter()
+        results: List[tuple] = []
+        try:
+            if self._conn is None:
+                self._conn = self._connect()
+                # Transactions are managed explicitly below
+                self._conn.isolation_level = None
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            logger.error(f"Database error: {e}")
+            self._discard_connection()
+            for job in batch:
+                job.future.set_exception(e)
+            return
+
+        try:
+            for job in batch:
+                conn.execute("SAVEPOINT write_job")
+                self._current = job
+                try:
+                    value = job.context.run(job.func, conn)
+                    conn.execute("RELEASE write_job")
+                    results.append((job, value, None))
+                except Exception as e:
+                    logger.error(f"Database error: {e}")
+                    job.tables.clear()
+                    job.events.clear()
+                    # Fails if SQLite already aborted the whole transaction
+                    conn.execute("ROLLBACK TO write_job")
+                    conn.execute("RELEASE write_job")
+                    results.append((job, None, e))
+                finally:
+                    self._current = None
+        except Exception as e:
+            logger.error(f"Database error: transaction aborted: {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                self._discard_connection()
+            for job in batch:
+                job.future.set_exception(e)
+            return
+
+        self._call_around_commit(False)
+        try:
+            conn.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"Database error: commit failed: {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                self._discard_connection()
+            results = [(job, None, error or e) for job, _, error in results]
+        else:
+            self._call_around_commit(True)
+
+        committed = [job for job, _, error in results if error is None]
+        changed = set().union(*(job.tables for job in committed))
+        events = [event for job in committed for event in job.events]
+        if (changed or events) and self._on_commit is not None:
+            try:
+                self._on_commit(changed, events)
+            except Exception:
+                logger.exception("Commit callback failed")
+
+        finished = time.perf_counter()
+        with self._lock:
+            self._batches += 1
+            self._jobs += len(batch)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            self._commit_time_total += finished - started
+            for job, _, error in results:
+                waited = started - job.submitted
+                self._wait_time_total += waited
+                self._wait_time_max = max(self._wait_time_max, waited)
+                self._failed += error is not None
+
+        for job, value, error in results:
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(value)
+
+    def _abort(self, batch: List[_Job], error: BaseException) -> None:
+        """The writer thread is dying: refuse new jobs and fail every unresolved one."""
+        logger.error(f"Database error: writer thread stopped: {error!r}")
+        with self._lock:
+            self._closed = True
+        self._current = None
+        # Closing the connection rolls back whatever the batch left uncommitted
+        self._discard_connection()
+        failure = sqlite3.ProgrammingError(f"Write queue stopped: {error!r}")
+        pending = list(batch)
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                pending.append(job)
+        for job in pending:
+            if not job.future.done():
+                job.future.set_exception(failure)
+
+    def _call_around_commit(self, committed: bool) -> None:
+        if self._around_commit is not None:
+            try:
+                self._around_commit(committed)
+            except Exception:
+                logger.exception("Commit hook failed")
+
+    def _discard_connection(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None